@@ -15,6 +15,15 @@ $SystemInfo = @{
 $ownerName = Read-Host "Please enter the owner name"
 $SystemInfo.OwnerName = $ownerName
 
+# Time each section so slow providers show up in the record's CollectionStats
+$collectionTimer = [System.Diagnostics.Stopwatch]::StartNew()
+$sectionTimer = [System.Diagnostics.Stopwatch]::StartNew()
+$sectionSeconds = [ordered]@{}
+function Complete-Section($name) {
+    $script:sectionSeconds[$name] = [math]::Round($script:sectionTimer.Elapsed.TotalSeconds, 3)
+    $script:sectionTimer.Restart()
+}
+
 # Get basic system info
 $cs = Get-CimInstance Win32_ComputerSystem
 $os = Get-CimInstance Win32_OperatingSystem
@@ -55,6 +64,7 @@ $SystemInfo.AssetInformation = @{
     Antivirus = if ($defender) { "Windows Defender ($(if ($defender.AntispywareEnabled) { 'Enabled' } else { 'Disabled' }))" } else { "Unknown" }
     Firewall = ($firewallProfiles | ForEach-Object { "$($_.Name): $($_.Enabled)" }) -join ", "
 }
+Complete-Section "AssetInformation"
 
 # === Memory Information ===
 function Get-RAMTypeName($type) {
@@ -120,6 +130,7 @@ foreach ($ram in $ramModules) {
     }
 }
 $SystemInfo.MemoryInformation.TotalMemoryGB = [math]::Round(($ramModules | Measure-Object -Property Capacity -Sum).Sum / 1GB, 2)
+Complete-Section "MemoryInformation"
 
 # === Physical Disks ===
 $physicalDisks = Get-PhysicalDisk
@@ -134,6 +145,7 @@ foreach ($disk in $physicalDisks) {
         Status = $disk.HealthStatus  
     }
 }
+Complete-Section "PhysicalDisks"
 
 
 # === Logical Drives ===
@@ -155,6 +167,7 @@ foreach ($drive in $logicalDrives) {
         }
     }
 }
+Complete-Section "LogicalDrives"
 
 # === Network Interfaces ===
 $vendorList = @{
@@ -180,6 +193,7 @@ foreach ($adapter in $adapters) {
         Vendor = $vendor
     }
 }
+Complete-Section "NetworkInterfaces"
 
 function Get-BatterySummary {
     $fields = @{
@@ -243,6 +257,7 @@ function Get-BatterySummary {
 if ($assetType -eq "Laptop") {
     $SystemInfo.BatteryInformation = Get-BatterySummary
 }
+Complete-Section "BatteryInformation"
 
 
 
@@ -322,6 +337,7 @@ if ($monitorIDs) {
         }
     }
 }
+Complete-Section "MonitorInformation"
 
 # === Installed Software ===
 function Get-InstalledSoftware {
@@ -369,22 +385,49 @@ function Get-InstalledSoftware {
 }
 
 $SystemInfo.InstalledSoftware = Get-InstalledSoftware
+Complete-Section "InstalledSoftware"
+
+$SystemInfo.CollectionStats = @{
+    Seconds = [math]::Round($collectionTimer.Elapsed.TotalSeconds, 3)
+    Sections = $sectionSeconds
+}
 
 # Sanitize owner name for filename (remove invalid characters)
 $safeOwnerName = $ownerName -replace '[<>:"/\\|?*]', '_'
 
-# Define remote folder path
+# Server ingest endpoint, e.g. "http://wis-server:8000/api/records"; taken from the
+# WIS_SERVER_URL environment variable when set. Empty means only write to the remote folder.
+$serverUrl = $env:WIS_SERVER_URL
+
+# Define remote folder path (used when the server cannot be reached)
 $remotePath = "D:\Projects\Windows inventory\wis\Records"
 
-# Output as JSON and save to remote folder
+# Output as JSON and post it gzipped to the server, or save to remote folder
 $jsonOutput = $SystemInfo | ConvertTo-Json -Depth 5
 $fileName = "SystemInfo_$($safeOwnerName)_$($SystemInfo.Timestamp -replace '[: ]', '_').json"
 $fullPath = Join-Path -Path $remotePath -ChildPath $fileName
 
+if ($serverUrl) {
+    try {
+        $buffer = New-Object System.IO.MemoryStream
+        $gzip = New-Object System.IO.Compression.GZipStream($buffer, [System.IO.Compression.CompressionMode]::Compress)
+        $bytes = [System.Text.Encoding]::UTF8.GetBytes($jsonOutput)
+        $gzip.Write($bytes, 0, $bytes.Length)
+        $gzip.Close()
+        $result = Invoke-RestMethod -Uri $serverUrl -Method Post -Body $buffer.ToArray() `
+            -ContentType "application/json" -Headers @{ "Content-Encoding" = "gzip" } -ErrorAction Stop
+        Write-Host "System information posted to $serverUrl (accepted: $($result.accepted), duplicates: $($result.duplicates))"
+        return
+    } catch {
+        Write-Host "Error posting to server: $_"
+        Write-Host "Falling back to the remote folder."
+    }
+}
+
 try {
     $jsonOutput | Out-File -FilePath $fullPath -Encoding UTF8 -ErrorAction Stop
     Write-Host "System information saved to $fullPath"
 } catch {
     Write-Host "Error saving to remote folder: $_"
     Write-Host "Please ensure the remote path is accessible and you have write permissions."
-}
\ No newline at end of file
+}
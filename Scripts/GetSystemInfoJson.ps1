@@ -10,6 +10,15 @@ $SystemInfo = @{
     MonitorInformation = @()
 }
 
+# Time each section so slow providers show up in the record's CollectionStats
+$collectionTimer = [System.Diagnostics.Stopwatch]::StartNew()
+$sectionTimer = [System.Diagnostics.Stopwatch]::StartNew()
+$sectionSeconds = [ordered]@{}
+function Complete-Section($name) {
+    $script:sectionSeconds[$name] = [math]::Round($script:sectionTimer.Elapsed.TotalSeconds, 3)
+    $script:sectionTimer.Restart()
+}
+
 # Get basic system info
 $cs = Get-CimInstance Win32_ComputerSystem
 $os = Get-CimInstance Win32_OperatingSystem
@@ -50,6 +59,7 @@ $SystemInfo.AssetInformation = @{
     Antivirus = if ($defender) { "Windows Defender ($(if ($defender.AntispywareEnabled) { 'Enabled' } else { 'Disabled' }))" } else { "Unknown" }
     Firewall = ($firewallProfiles | ForEach-Object { "$($_.Name): $($_.Enabled)" }) -join ", "
 }
+Complete-Section "AssetInformation"
 
 # === Memory Information ===
 function Get-RAMTypeName($type) {
@@ -115,6 +125,7 @@ foreach ($ram in $ramModules) {
     }
 }
 $SystemInfo.MemoryInformation.TotalMemoryGB = [math]::Round(($ramModules | Measure-Object -Property Capacity -Sum).Sum / 1GB, 2)
+Complete-Section "MemoryInformation"
 
 # === Physical Disks ===
 $physicalDisks = Get-PhysicalDisk
@@ -128,6 +139,7 @@ foreach ($disk in $physicalDisks) {
         DriveLetters = ($volumes | Where-Object { $_.DriveLetter } | ForEach-Object { $_.DriveLetter }) -join ", "
     }
 }
+Complete-Section "PhysicalDisks"
 
 # === Logical Drives ===
 $allVolumes = Get-Volume
@@ -148,6 +160,7 @@ foreach ($drive in $logicalDrives) {
         }
     }
 }
+Complete-Section "LogicalDrives"
 
 # === Network Interfaces ===
 $vendorList = @{
@@ -173,6 +186,7 @@ foreach ($adapter in $adapters) {
         Vendor = $vendor
     }
 }
+Complete-Section "NetworkInterfaces"
 
 # === Battery Information (only if Laptop) ===
 if ($assetType -eq "Laptop") {
@@ -210,6 +224,7 @@ if ($assetType -eq "Laptop") {
     }
     $SystemInfo.BatteryInformation = $batteryInfo
 }
+Complete-Section "BatteryInformation"
 
 # === Monitor Information ===
 function Convert-ByteArrayToString([byte[]]$bytes) {
@@ -287,6 +302,12 @@ if ($monitorIDs) {
         }
     }
 }
+Complete-Section "MonitorInformation"
+
+$SystemInfo.CollectionStats = @{
+    Seconds = [math]::Round($collectionTimer.Elapsed.TotalSeconds, 3)
+    Sections = $sectionSeconds
+}
 
 # Output as JSON
 $SystemInfo | ConvertTo-Json -Depth 5
\ No newline at end of file
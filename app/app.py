@@ -1,46 +1,162 @@
-from flask import Flask, jsonify, send_from_directory, render_template
+from flask import Flask, Response, g, jsonify, request, send_from_directory, render_template
 import os
+import sys
 import json
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asset_db import open_store
+from record_cache import RecordCache
+from record_batch import MAX_BATCH_BODY, batch_records, encode_items, parse_batch
+from record_history import asset_history
+from record_ingest import MAX_BODY_SIZE, IngestError, decode_body, open_ingestor, parse_body
+from record_search import SearchIndex
+from http_cache import CachedResponse, choose_encoding, http_date, make_etag, not_modified
+from metrics import CONTENT_TYPE, REGISTRY, RENDER_SECONDS, REQUEST_ERRORS, REQUEST_SECONDS, SlowRequestProfiler
+from record_watch import RecordWatcher
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
+RECORDS_DIR = os.path.abspath(os.path.join(os.getcwd(), '..', 'Records'))
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+# Parsed records that are not the latest per owner, shared by the list and detail routes
+record_cache = RecordCache(max_entries=_env_int('WIS_RECORD_CACHE_ENTRIES', 256),
+                           max_bytes=_env_int('WIS_RECORD_CACHE_BYTES', 64 * 1024 * 1024))
+
+# Rendered list rows and detail pages, keyed by (filename, stamp) like the record cache,
+# so a new or changed snapshot re-renders only its own HTML
+row_cache = RecordCache(max_entries=None, max_bytes=_env_int('WIS_ROW_CACHE_BYTES', 32 * 1024 * 1024))
+detail_cache = RecordCache(max_entries=_env_int('WIS_DETAIL_CACHE_ENTRIES', 512),
+                           max_bytes=_env_int('WIS_DETAIL_CACHE_BYTES', 64 * 1024 * 1024))
+
+# Records are parsed once by the watcher; routes only read the index
+# (a SQLite AssetStore instead of the in-memory RecordIndex when WIS_DB is set)
+record_index = open_store(RECORDS_DIR, cache=record_cache)
+record_watcher = RecordWatcher(record_index)
+
+search_index = SearchIndex(record_index)
+
+# Collectors POST snapshots to /api/records instead of dropping files in Records/;
+# set by start_background() and left None for read-only stores
+record_ingestor = None
+_background_lock = threading.Lock()
+_background_started = False
+
+# Importers that drive the store themselves (benchmarks, tests) set this to False
+app.config.setdefault('WIS_BACKGROUND', True)
+
+def start_background():
+    """Start the Records watcher and open the ingest log, once per process.
+
+    Runs from __main__ or before the first request under another WSGI
+    server, never at import: process-pool parse workers re-import this
+    script under spawn, and tools that only import it should not get a
+    watcher thread, ../Ingest and an fsync thread.
+    """
+    global record_ingestor, _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+        record_watcher.start()
+        record_ingestor = open_ingestor(record_index, RECORDS_DIR)
+
+@app.before_request
+def ensure_background():
+    if not _background_started and app.config['WIS_BACKGROUND']:
+        start_background()
+
+# cProfile dumps of slow requests when WIS_PROFILE_SLOW_MS is set
+profiler = SlowRequestProfiler()
+store_gauge = REGISTRY.gauge('wis_store_info', 'Snapshots in the record store and its data version')
+cache_gauge = REGISTRY.gauge('wis_cache', 'Parsed-record and rendered-fragment cache counters')
+
+class ProfiledApp:
+    """WSGI wrapper that runs each request under the slow-request profiler."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        with profiler.profile(f"{environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')}"):
+            return self.wsgi_app(environ, start_response)
+
+if profiler.threshold is not None:
+    app.wsgi_app = ProfiledApp(app.wsgi_app)
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'static'
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, method=request.method, route=_route())
+    return response
+
+def render_timed(template, **context):
+    with RENDER_SECONDS.time(template=template):
+        return render_template(template, **context)
+
+def cached_fragment(cache, template, filename, load):
+    """Render template for one record, reusing the HTML until the record's stamp changes.
+
+    load() returns the template context, or None if the record is gone.
+    """
+    stamp = record_index.stamp(filename)
+    html = cache.get(filename, stamp) if stamp is not None else None
+    if html is None:
+        context = load()
+        if context is None:
+            return None
+        html = render_timed(template, **context)
+        if stamp is not None:
+            cache.put(filename, stamp, html, len(html))
+    return html
+
+def render_list():
+    assets = [dict(record, filename=filename) for filename, record in record_index.latest_by_owner()]
+    # Only rows whose record is new or changed are rendered; the rest come from row_cache
+    rows = [cached_fragment(row_cache, 'list_row.html', asset['filename'], lambda asset=asset: {'asset': asset})
+            for asset in assets]
+    return render_timed('list.html', assets=assets, rows=rows, asset_count=len(assets)).encode()
+
+# Rendered once per index version and reused, with its compressed variants
+list_page = CachedResponse(render_list)
+
+def cached_page(cached_response):
+    """Serve a CachedResponse with ETag/Last-Modified validation and compression."""
+    version, last_modified = record_index.version, record_index.last_modified
+    etag = make_etag(version)
+    if not_modified(request.headers, etag, last_modified):
+        response = Response(status=304)
+        response.headers['ETag'] = etag
+    else:
+        body, encoding = cached_response.get(version).encoded(choose_encoding(request.headers.get('Accept-Encoding')))
+        response = Response(body, mimetype='text/html')
+        response.headers['ETag'] = make_etag(version, encoding or '')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 # List .json files and prepare data for list view
 @app.route('/')
 def index():
     try:
-        records_dir = os.path.abspath(os.path.join(os.getcwd(), '..', 'Records'))
-        if not os.path.exists(records_dir):
-            return render_template('list.html', assets=[], asset_count=0)
-
-        files = os.listdir(records_dir)
-        json_files = [f for f in files if f.endswith('.json')]
-        
-        # Parse filenames to get latest per owner
-        file_map = {}
-        for filename in json_files:
-            regex = r'^SystemInfo_(.+)_(\d{4}-\d{2}-\d{2}_\d{2}_\d{2}_\d{2})\.json$'
-            import re
-            match = re.match(regex, filename)
-            if match:
-                owner_name = match.group(1).replace('_', ' ')
-                timestamp = match.group(2).replace('_', ':')
-                current = file_map.get(owner_name, {'timestamp': ''})
-                if not current['timestamp'] or timestamp > current['timestamp']:
-                    file_map[owner_name] = {'filename': filename, 'timestamp': timestamp}
-        
-        # Fetch asset data
-        assets = []
-        for owner, info in file_map.items():
-            try:
-                with open(os.path.join(records_dir, info['filename']), 'r') as f:
-                    data = json.load(f)
-                    data['filename'] = info['filename']  # Add filename for detail link
-                    assets.append(data)
-            except Exception as e:
-                print(f"Error reading {info['filename']}: {e}")
-        
-        return render_template('list.html', assets=assets, asset_count=len(assets))
+        return cached_page(list_page)
     except Exception as e:
+        REQUEST_ERRORS.inc(method=request.method, route=_route())
         print(f"Error listing files: {e}")
         return render_template('list.html', assets=[], asset_count=0)
 
@@ -48,14 +164,15 @@ def index():
 @app.route('/asset/<filename>')
 def asset_detail(filename):
     try:
-        records_dir = os.path.abspath(os.path.join(os.getcwd(), '..', 'Records'))
-        file_path = os.path.join(records_dir, filename)
-        if not os.path.exists(file_path):
+        def load():
+            data = record_index.get(filename)
+            return None if data is None else {'asset': data}
+        html = cached_fragment(detail_cache, 'detail.html', filename, load)
+        if html is None:
             return render_template('detail.html', error="Asset not found"), 404
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return render_template('detail.html', asset=data)
+        return html
     except Exception as e:
+        REQUEST_ERRORS.inc(method=request.method, route=_route())
         print(f"Error serving file {filename}: {e}")
         return render_template('detail.html', error="Error loading asset"), 404
 
@@ -63,15 +180,88 @@ def asset_detail(filename):
 @app.route('/records/list')
 def list_files():
     try:
-        records_dir = os.path.abspath(os.path.join(os.getcwd(), '..', 'Records'))
-        if not os.path.exists(records_dir):
-            return jsonify([])
-        files = os.listdir(records_dir)
-        json_files = [f for f in files if f.endswith('.json')]
-        return jsonify(json_files)
+        return jsonify(record_index.filenames())
     except Exception as e:
+        REQUEST_ERRORS.inc(method=request.method, route=_route())
         print(f"Error listing files: {e}")
         return jsonify([])
 
+# Single records, JSON arrays or NDJSON batches, optionally gzipped
+@app.route('/api/records', methods=['POST'])
+def ingest_records():
+    if record_ingestor is None:
+        return jsonify({'error': 'This store is read-only'}), 501
+    if request.content_length is None:
+        return jsonify({'error': 'Content-Length required'}), 411
+    if request.content_length > MAX_BODY_SIZE:
+        return jsonify({'error': 'Request body is too large'}), 413
+    try:
+        items = parse_body(decode_body(request.get_data(), request.headers.get('Content-Encoding')),
+                           request.content_type)
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    result = record_ingestor.ingest(items)
+    if result['accepted']:
+        # Index the new records now rather than in the next search
+        search_index.refresh()
+    status = 400 if result['rejected'] and not (result['accepted'] or result['duplicates']) else 200
+    return jsonify(result), status
+
+# Many records in one streamed response, e.g. the latest per owner for the dashboard
+@app.route('/api/records/batch', methods=['POST'])
+def records_batch():
+    if request.content_length is None:
+        return jsonify({'error': 'Content-Length required'}), 411
+    if request.content_length > MAX_BATCH_BODY:
+        return jsonify({'error': 'Request body is too large'}), 413
+    try:
+        kind, keys, fields = parse_batch(request.get_data())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    ndjson = (request.args.get('format') == 'ndjson'
+              or 'application/x-ndjson' in request.headers.get('Accept', ''))
+    items = batch_records(record_index, kind, keys, fields)
+    return Response(encode_items(items, ndjson), mimetype='application/x-ndjson' if ndjson else 'application/json',
+                    headers={'Cache-Control': 'no-store'})
+
+# Token and prefix search over hostname, owner, serial, model, addresses and software
+@app.route('/api/search')
+def search():
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        return jsonify(search_index.search(request.args.get('q', ''), request.args.get('fields'),
+                                           limit, request.args.get('cursor')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+# Time series of one asset's snapshots, e.g. free disk space or battery wear over time
+@app.route('/api/assets/<serial>/history')
+def asset_history_route(serial):
+    try:
+        result = asset_history(record_index, serial, request.args.get('from'), request.args.get('to'),
+                               request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+# Prometheus text metrics: scan/parse/latest/render/request timers and counters
+@app.route('/metrics')
+def metrics():
+    store_gauge.set(record_index.version, field='version')
+    store_gauge.set(len(record_index.filenames()), field='snapshots')
+    for cache_name, cache in (('records', record_cache), ('rows', row_cache), ('details', detail_cache)):
+        for name, value in cache.stats().items():
+            if isinstance(value, (int, float)):
+                cache_gauge.set(value, cache=cache_name, field=name)
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE, headers={'Cache-Control': 'no-store'})
+
+# Hit/miss/eviction counters for the parsed-record cache and the rendered-fragment caches
+@app.route('/records/cache-stats')
+def cache_stats():
+    return jsonify(dict(record_cache.stats(), rows=row_cache.stats(), details=detail_cache.stats()))
+
 if __name__ == '__main__':
+    start_background()
     app.run(host='0.0.0.0', port=8000, debug=False)
\ No newline at end of file
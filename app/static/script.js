@@ -1,48 +1,8 @@
-async function fetchFileList() {
-    try {
-        const response = await fetch('/records/list', {
-            headers: { 'Accept': 'application/json' }
-        });
-        if (!response.ok) {
-            throw new Error(`Failed to fetch file list: ${response.status} ${response.statusText}`);
-        }
-        const data = await response.json();
-        if (!Array.isArray(data)) {
-            throw new Error('File list response is not an array');
-        }
-        return data.filter(file => file.endsWith('.json'));
-    } catch (error) {
-        console.error('Error fetching file list:', error);
-        return [];
-    }
-}
-
-function parseFilename(filename) {
-    const regex = /^SystemInfo_(.+)_(\d{4}-\d{2}-\d{2}_\d{2}_\d{2}_\d{2})\.json$/;
-    const match = filename.match(regex);
-    if (!match) return null;
-    return {
-        ownerName: match[1].replace(/_/g, ' '),
-        timestamp: match[2].replace(/_/g, ':'),
-        filename: filename
-    };
-}
-
-function getLatestFiles(fileList) {
-    const fileMap = new Map();
-    fileList.forEach(filename => {
-        const parsed = parseFilename(filename);
-        if (parsed) {
-            const current = fileMap.get(parsed.ownerName);
-            if (!current || new Date(parsed.timestamp.replace(/:/g, '-')) > new Date(current.timestamp.replace(/:/g, '-'))) {
-                fileMap.set(parsed.ownerName, parsed);
-            }
-        }
-    });
-    return Array.from(fileMap.values());
-}
+// Only what the list rows, search and header use
+const LIST_FIELDS = 'AssetInformation.Hostname,Manufacturer,Model,OS,OwnerName,Timestamp';
 
-async function syncAssets() {
+// Fetch the latest record per owner in one round trip and hand the list to onAssets
+async function syncAssets(onAssets) {
     const syncDataBtn = document.getElementById('syncDataBtn');
     syncDataBtn.disabled = true;
     syncDataBtn.innerHTML = `
@@ -53,21 +13,19 @@ async function syncAssets() {
     `;
 
     try {
-        const fileList = await fetchFileList();
-        const latestFiles = getLatestFiles(fileList);
-        const assets = [];
-        for (const file of latestFiles) {
-            try {
-                const response = await fetch(`/asset/${file.filename}`);
-                if (response.ok) {
-                    const html = await response.text();
-                    // Update page with new list
-                    document.body.innerHTML = html;
-                }
-            } catch (error) {
-                console.error(`Error fetching ${file.filename}:`, error);
-            }
+        const response = await fetch('/api/records/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+            body: JSON.stringify({ latest: true, fields: LIST_FIELDS })
+        });
+        if (!response.ok) {
+            throw new Error(`Failed to fetch records: ${response.status} ${response.statusText}`);
+        }
+        const assets = await response.json();
+        if (!Array.isArray(assets)) {
+            throw new Error('Batch response is not an array');
         }
+        onAssets(assets.filter(asset => !asset.error));
     } catch (error) {
         console.error('Error syncing assets:', error);
     }
@@ -90,18 +48,20 @@ document.addEventListener('DOMContentLoaded', () => {
     const ownerInitials = document.getElementById('ownerInitials');
     const timestampDisplay = document.getElementById('timestampDisplay');
 
-    // Store initial assets for client-side filtering
-    const initialAssets = Array.from(assetItems.children).map(li => {
+    // Store initial assets for client-side filtering; replaced on sync
+    let initialAssets = Array.from(assetItems.children).filter(li => li.querySelector('h3')).map(li => {
+        const link = (li.getAttribute('onclick') || '').match(/\/asset\/([^']+)/);
         const hostname = li.querySelector('h3').textContent;
         const ownerName = li.querySelector('.font-medium').textContent;
         const manufacturer = li.querySelector('p.text-sm.text-gray-500').textContent.split(' • ')[0].split(' ')[0];
         const model = li.querySelector('p.text-sm.text-gray-500').textContent.split(' • ')[0].split(' ').slice(1).join(' ');
         const os = li.querySelector('p.text-sm.text-gray-500').textContent.split(' • ')[1];
-        return { AssetInformation: { Hostname: hostname, Manufacturer: manufacturer, Model: model, OS: os }, OwnerName: ownerName };
+        return { AssetInformation: { Hostname: hostname, Manufacturer: manufacturer, Model: model, OS: os }, OwnerName: ownerName,
+                 filename: link ? link[1] : null };
     });
 
     // Search functionality
-    searchInput.addEventListener('input', () => {
+    function showAssets() {
         const query = searchInput.value.trim().toLowerCase();
         const filteredAssets = initialAssets.filter(asset => asset.OwnerName.toLowerCase().includes(query));
         
@@ -142,6 +102,9 @@ document.addEventListener('DOMContentLoaded', () => {
                     </div>
                 </div>
             `;
+            if (asset.filename) {
+                li.addEventListener('click', () => { window.location.href = `/asset/${asset.filename}`; });
+            }
             assetItems.appendChild(li);
         });
 
@@ -149,8 +112,12 @@ document.addEventListener('DOMContentLoaded', () => {
         ownerNameDisplay.textContent = filteredAssets[0].OwnerName;
         ownerInitials.textContent = filteredAssets[0].OwnerName.split(' ').map(n => n[0]).join('').slice(0, 2).toUpperCase();
         timestampDisplay.textContent = `Last updated: ${filteredAssets[0].Timestamp || 'Unknown'}`;
-    });
+    }
+    searchInput.addEventListener('input', showAssets);
 
     // Sync button
-    document.getElementById('syncDataBtn').addEventListener('click', syncAssets);
+    document.getElementById('syncDataBtn').addEventListener('click', () => syncAssets(assets => {
+        initialAssets = assets;
+        showAssets();
+    }));
 });
\ No newline at end of file
@@ -0,0 +1,434 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import FILES_CHANGED, LATEST_SECONDS, PARSE_ERRORS, PARSE_SECONDS, SCAN_SECONDS
+from record_archive import ArchiveReader
+from record_index import ChangeLog, RecordIndex, load_record, record_metrics, summarize
+
+# mtime_ns of snapshots that came through the ingest log rather than a file
+INGESTED_MTIME = -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    serial_number TEXT,
+    owner_name TEXT,
+    hostname TEXT,
+    timestamp TEXT NOT NULL,
+    file_owner TEXT,
+    file_timestamp TEXT,
+    total_memory_gb REAL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_serial_ts ON snapshots (serial_number, timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_owner ON snapshots (owner_name);
+CREATE INDEX IF NOT EXISTS idx_snapshots_hostname ON snapshots (hostname);
+CREATE INDEX IF NOT EXISTS idx_snapshots_timestamp ON snapshots (timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_file_owner_ts ON snapshots (file_owner, file_timestamp);
+
+CREATE TABLE IF NOT EXISTS asset_information (
+    snapshot_id INTEGER PRIMARY KEY REFERENCES snapshots (id) ON DELETE CASCADE,
+    asset_type TEXT,
+    last_user TEXT,
+    os TEXT,
+    version TEXT,
+    build TEXT,
+    domain TEXT,
+    manufacturer TEXT,
+    model TEXT,
+    processor TEXT,
+    motherboard TEXT,
+    graphics TEXT,
+    audio TEXT,
+    antivirus TEXT,
+    firewall TEXT
+);
+
+CREATE TABLE IF NOT EXISTS memory_modules (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    capacity_gb REAL,
+    speed_mhz TEXT,
+    ram_type TEXT,
+    module_type TEXT,
+    manufacturer TEXT,
+    part_number TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_memory_modules_snapshot ON memory_modules (snapshot_id);
+
+CREATE TABLE IF NOT EXISTS physical_disks (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    model TEXT,
+    media_type TEXT,
+    bus_type TEXT,
+    size_gb REAL,
+    drive_letters TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_physical_disks_snapshot ON physical_disks (snapshot_id);
+
+CREATE TABLE IF NOT EXISTS logical_drives (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    drive_letter TEXT,
+    volume_label TEXT,
+    file_system TEXT,
+    total_size_gb REAL,
+    used_space_gb REAL,
+    free_space_gb REAL,
+    used_percent REAL
+);
+CREATE INDEX IF NOT EXISTS idx_logical_drives_snapshot ON logical_drives (snapshot_id);
+
+CREATE TABLE IF NOT EXISTS network_interfaces (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    name TEXT,
+    status TEXT,
+    ipv4 TEXT,
+    ipv6 TEXT,
+    mac TEXT,
+    vendor TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_network_interfaces_snapshot ON network_interfaces (snapshot_id);
+
+CREATE TABLE IF NOT EXISTS monitors (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    friendly_name TEXT,
+    manufacturer TEXT,
+    product_code TEXT,
+    serial_number TEXT,
+    screen_size_inch TEXT,
+    native_resolution TEXT,
+    year_of_manufacture TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_monitors_snapshot ON monitors (snapshot_id);
+"""
+
+# (table, record section, [(column, record key), ...]) for the list sections
+SECTION_TABLES = [
+    ('memory_modules', ('MemoryInformation', 'Modules'), [
+        ('capacity_gb', 'CapacityGB'), ('speed_mhz', 'SpeedMHz'), ('ram_type', 'RAMType'),
+        ('module_type', 'ModuleType'), ('manufacturer', 'Manufacturer'), ('part_number', 'PartNumber')]),
+    ('physical_disks', ('PhysicalDisks',), [
+        ('model', 'Model'), ('media_type', 'MediaType'), ('bus_type', 'BusType'),
+        ('size_gb', 'SizeGB'), ('drive_letters', 'DriveLetters'), ('status', 'Status')]),
+    ('logical_drives', ('LogicalDrives',), [
+        ('drive_letter', 'DriveLetter'), ('volume_label', 'VolumeLabel'), ('file_system', 'FileSystem'),
+        ('total_size_gb', 'TotalSizeGB'), ('used_space_gb', 'UsedSpaceGB'),
+        ('free_space_gb', 'FreeSpaceGB'), ('used_percent', 'UsedPercent')]),
+    ('network_interfaces', ('NetworkInterfaces',), [
+        ('name', 'Name'), ('status', 'Status'), ('ipv4', 'IPv4'), ('ipv6', 'IPv6'),
+        ('mac', 'MAC'), ('vendor', 'Vendor')]),
+    ('monitors', ('MonitorInformation',), [
+        ('friendly_name', 'FriendlyName'), ('manufacturer', 'Manufacturer'), ('product_code', 'ProductCode'),
+        ('serial_number', 'SerialNumber'), ('screen_size_inch', 'ScreenSizeInch'),
+        ('native_resolution', 'NativeResolution'), ('year_of_manufacture', 'YearOfManufacture')]),
+]
+
+ASSET_COLUMNS = [
+    ('asset_type', 'AssetType'), ('last_user', 'LastUser'), ('os', 'OS'), ('version', 'Version'),
+    ('build', 'Build'), ('domain', 'Domain'), ('manufacturer', 'Manufacturer'), ('model', 'Model'),
+    ('processor', 'Processor'), ('motherboard', 'Motherboard'), ('graphics', 'Graphics'),
+    ('audio', 'Audio'), ('antivirus', 'Antivirus'), ('firewall', 'Firewall'),
+]
+
+
+def _section_rows(record, path):
+    """Return the list under a nested section path; ConvertTo-Json emits single items unwrapped."""
+    value = record
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    if isinstance(value, dict):
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+def _column_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+class AssetStore:
+    """SQLite-backed store of Records snapshots.
+
+    Sections are normalized into per-section tables for querying, and the
+    compact record document is kept alongside so the frontends get the exact
+    snapshot back. It offers the same read and refresh interface as
+    RecordIndex, so either can back server.py and app/app.py.
+    """
+
+    def __init__(self, db_path, records_dir, cache=None):
+        self.db_path = db_path
+        self.records_dir = records_dir
+        self.cache = cache        # optional RecordCache of decoded documents
+        self.version = 0
+        self.last_modified = time.time()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+        self._failed = {}   # filename -> (mtime, size) of files that did not parse
+        self._changes = ChangeLog()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def refresh(self, batch_size=500):
+        """Import new and changed files from records_dir and drop deleted ones."""
+        with self._refresh_lock:
+            seen = {}
+            with SCAN_SECONDS.time(store='sqlite'):
+                try:
+                    with os.scandir(self.records_dir) as it:
+                        for entry in it:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                st = entry.stat()
+                                seen[entry.name] = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    pass
+
+            with self._lock:
+                known = {filename: (mtime, size) for filename, mtime, size in
+                         self._conn.execute('SELECT filename, mtime_ns, size FROM snapshots WHERE mtime_ns != ?',
+                                            (INGESTED_MTIME,))}
+            removed = [filename for filename in known if filename not in seen]
+            changed = [(filename, stat) for filename, stat in seen.items()
+                       if known.get(filename) != stat and self._failed.get(filename) != stat]
+
+            if removed:
+                self._write(removed, [])
+            for start in range(0, len(changed), batch_size):
+                batch = []
+                for filename, stat in changed[start:start + batch_size]:
+                    record = self._parse(filename, stat)
+                    if record is not None:
+                        batch.append((filename, stat, record))
+                self._write([filename for filename, _ in changed[start:start + batch_size]], batch)
+            FILES_CHANGED.inc(len(removed) + len(changed), store='sqlite')
+            return len(removed) + len(changed)
+
+    def update_path(self, path):
+        """Re-import a single file, e.g. after a filesystem notification."""
+        filename = os.path.basename(path)
+        with self._refresh_lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                self._failed.pop(filename, None)
+                return 1 if self._write([filename], []) else 0
+            stat = (st.st_mtime_ns, st.st_size)
+            with self._lock:
+                row = self._conn.execute('SELECT mtime_ns, size FROM snapshots WHERE filename = ?',
+                                         (filename,)).fetchone()
+            if (row and tuple(row) == stat) or self._failed.get(filename) == stat:
+                return 0
+            record = self._parse(filename, stat)
+            self._write([filename], [(filename, stat, record)] if record else [])
+            return 1
+
+    def ingest(self, items):
+        """Store (filename, record, log_location) items that were written to the ingest log.
+
+        The database keeps the document itself, so the log location is only
+        used for its length; items already stored (e.g. on log replay) are skipped.
+        """
+        filenames = [filename for filename, _, _ in items]
+        existing = set()
+        with self._lock:
+            for start in range(0, len(filenames), 500):
+                chunk = filenames[start:start + 500]
+                existing.update(filename for filename, in self._conn.execute(
+                    'SELECT filename FROM snapshots WHERE filename IN (%s)' % ', '.join('?' * len(chunk)), chunk))
+        loaded = [(filename, (INGESTED_MTIME, location[2]), record)
+                  for filename, record, location in items if filename not in existing]
+        if loaded:
+            self._write([], loaded)
+
+    def has_snapshot(self, serial, timestamp):
+        """Return True if a snapshot of serial taken at timestamp is already stored."""
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM snapshots WHERE serial_number = ? AND timestamp = ? LIMIT 1',
+                                      (serial, timestamp)).fetchone() is not None
+
+    def history(self, serial, start=None, end=None):
+        """Return the summaries of serial's snapshots with start <= Timestamp <= end, oldest first.
+
+        The range is a seek on the (serial_number, timestamp) index; only the
+        documents inside it are decoded, for their metrics.
+        """
+        sql = 'SELECT filename, document FROM snapshots WHERE serial_number = ?'
+        params = [serial]
+        if start:
+            sql += ' AND timestamp >= ?'
+            params.append(start)
+        if end:
+            sql += ' AND timestamp <= ?'
+            params.append(end + '\uffff')
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY timestamp, filename', params).fetchall()
+        return [summarize(filename, json.loads(document)) for filename, document in rows]
+
+    def _parse(self, filename, stat):
+        try:
+            with PARSE_SECONDS.time(store='sqlite'):
+                record = load_record(os.path.join(self.records_dir, filename))
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            # Remember the failure so the file is not re-read until it changes
+            PARSE_ERRORS.inc(store='sqlite')
+            print(f"Error reading {filename}: {str(e)}")
+            self._failed[filename] = stat
+            return None
+        self._failed.pop(filename, None)
+        return record
+
+    def _write(self, removed, loaded):
+        """Delete and insert snapshots in a single transaction; return True if any row changed."""
+        with self._lock, self._conn:
+            changed = set()
+            for start in range(0, len(removed), 500):
+                chunk = removed[start:start + 500]
+                changed.update(serial for serial, in self._conn.execute(
+                    'SELECT serial_number FROM snapshots WHERE filename IN (%s)' % ', '.join('?' * len(chunk)), chunk))
+            deleted = self._conn.executemany('DELETE FROM snapshots WHERE filename = ?',
+                                             [(f,) for f in removed]).rowcount if removed else 0
+            for filename, (mtime, size), record in loaded:
+                self._insert(filename, mtime, size, record)
+                changed.add(record['AssetInformation'].get('SerialNumber'))
+            # Removing a file that was never imported must not invalidate ETags and cached pages
+            if deleted <= 0 and not loaded:
+                return False
+            self.version += 1
+            self._changes.add(self.version, changed)
+            self.last_modified = time.time()
+            return True
+
+    def _insert(self, filename, mtime, size, record):
+        summary = summarize(filename, record)
+        memory = record.get('MemoryInformation') or {}
+        cur = self._conn.execute(
+            'INSERT INTO snapshots (filename, mtime_ns, size, serial_number, owner_name, hostname, timestamp,'
+            ' file_owner, file_timestamp, total_memory_gb, document) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (filename, mtime, size, summary['SerialNumber'], summary['OwnerName'], summary['Hostname'],
+             summary['Timestamp'], summary['FileOwner'], summary['FileTimestamp'],
+             _column_value(memory.get('TotalMemoryGB')), json.dumps(record, separators=(',', ':'))))
+        snapshot_id = cur.lastrowid
+        asset = record['AssetInformation']
+        self._conn.execute(
+            'INSERT INTO asset_information (snapshot_id, %s) VALUES (?%s)' % (
+                ', '.join(column for column, _ in ASSET_COLUMNS), ', ?' * len(ASSET_COLUMNS)),
+            [snapshot_id] + [_column_value(asset.get(key)) for _, key in ASSET_COLUMNS])
+        for table, path, columns in SECTION_TABLES:
+            rows = _section_rows(record, path)
+            if not rows:
+                continue
+            self._conn.executemany(
+                'INSERT INTO %s (snapshot_id, %s) VALUES (?%s)' % (
+                    table, ', '.join(column for column, _ in columns), ', ?' * len(columns)),
+                [[snapshot_id] + [_column_value(row.get(key)) for _, key in columns]
+                 for row in rows if isinstance(row, dict)])
+
+    def latest(self):
+        """Return the latest record per SerialNumber, ordered by asset_sort_key descending."""
+        with LATEST_SECONDS.time(store='sqlite', grouping='serial'):
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT document, MAX(timestamp) AS ts FROM snapshots"
+                    " WHERE serial_number IS NOT NULL AND serial_number != ''"
+                    " GROUP BY serial_number ORDER BY ts DESC, serial_number DESC").fetchall()
+            return [json.loads(document) for document, _ in rows]
+
+    def latest_metrics(self):
+        """Return (record, METRIC_COLUMNS values) for each latest() record."""
+        return [(record, record_metrics(record)) for record in self.latest()]
+
+    def changed_since(self, version):
+        """Return the serials whose latest snapshot may differ from the given version's, or None if unknown."""
+        return self._changes.since(version)
+
+    def latest_by_owner(self):
+        """Return (filename, record) for the latest file per owner in the filename."""
+        with LATEST_SECONDS.time(store='sqlite', grouping='owner'):
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT filename, document, MAX(file_timestamp) AS ts FROM snapshots"
+                    " WHERE file_owner IS NOT NULL GROUP BY file_owner ORDER BY ts DESC").fetchall()
+            return [(filename, json.loads(document)) for filename, document, _ in rows]
+
+    def filenames(self):
+        """Return the names of all imported files."""
+        with self._lock:
+            return [filename for filename, in self._conn.execute('SELECT filename FROM snapshots')]
+
+    def latest_for(self, serial):
+        """Return (filename, record) of serial's latest snapshot, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT filename FROM snapshots WHERE serial_number = ?'
+                                     ' ORDER BY timestamp DESC, filename DESC LIMIT 1', (serial,)).fetchone()
+        record = self.get(row[0]) if row else None
+        return None if record is None else (row[0], record)
+
+    def stamp(self, filename):
+        """Return (mtime_ns, size) of a stored file, which changes whenever its content does, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT mtime_ns, size FROM snapshots WHERE filename = ?',
+                                     (filename,)).fetchone()
+        return tuple(row) if row else None
+
+    def get(self, filename):
+        """Return the record stored for filename, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT mtime_ns, size FROM snapshots WHERE filename = ?',
+                                     (filename,)).fetchone()
+        if row is None:
+            return None
+        mtime, size = row
+        if self.cache is not None:
+            record = self.cache.get(filename, mtime)
+            if record is not None:
+                return record
+        with self._lock:
+            row = self._conn.execute('SELECT document FROM snapshots WHERE filename = ?', (filename,)).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        if self.cache is not None:
+            self.cache.put(filename, mtime, record, size)
+        return record
+
+
+def open_store(records_dir, cache=None):
+    """Return an AssetStore when WIS_DB names a database file, else a RecordIndex.
+
+    WIS_ARCHIVE instead serves a packed record_archive file read-only.
+    WIS_PARSE_WORKERS sets the RecordIndex cold-start parse pool size (1
+    disables it) and WIS_PARSE_POOL=thread swaps its processes for threads.
+    """
+    archive_path = os.environ.get('WIS_ARCHIVE')
+    if archive_path:
+        return ArchiveReader(archive_path)
+    db_path = os.environ.get('WIS_DB')
+    if db_path:
+        return AssetStore(db_path, records_dir, cache=cache)
+    workers = os.environ.get('WIS_PARSE_WORKERS')
+    return RecordIndex(records_dir, cache=cache, workers=int(workers) if workers else None,
+                       use_processes=os.environ.get('WIS_PARSE_POOL', 'process') != 'thread')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-import a Records directory into a SQLite asset store.')
+    parser.add_argument('records_dir', help='directory containing SystemInfo_*.json files')
+    parser.add_argument('db_path', help='SQLite database to create or update')
+    parser.add_argument('--batch-size', type=int, default=500, help='files per transaction')
+    args = parser.parse_args()
+    store = AssetStore(args.db_path, args.records_dir)
+    changed = store.refresh(batch_size=args.batch_size)
+    print(f"Imported {changed} changed files into {args.db_path}")
+    store.close()
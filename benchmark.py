@@ -0,0 +1,331 @@
+import argparse
+import http.client
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from http_cache import compress
+from record_cache import RecordCache
+from record_index import RecordIndex, load_record
+from synthetic_fleet import generate_fleet
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return math.nan
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def _timed(latencies, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    latencies.append(time.perf_counter() - start)
+    return result
+
+
+def _index(records_dir):
+    index = RecordIndex(records_dir, workers=1)
+    index.refresh()
+    return index
+
+
+def _touch_one(index, rng):
+    """Bump one file's mtime and re-read it, so the index version changes as on a new snapshot."""
+    path = os.path.join(index.records_dir, rng.choice(index.filenames()))
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+    index.update_path(path)
+
+
+# Each benchmark takes (records_dir, iterations, rng) and returns (latencies, items per op)
+
+def bench_load_record(records_dir, iterations, rng):
+    """Parse individual record files, as a cold index or the detail view does."""
+    names = sorted(name for name in os.listdir(records_dir) if name.endswith('.json'))
+    latencies = []
+    for name in rng.sample(names, min(len(names), iterations * 20)):
+        _timed(latencies, load_record, os.path.join(records_dir, name))
+    return latencies, 1
+
+
+def bench_index_refresh(records_dir, iterations, rng):
+    """Cold start: scan the directory and summarize every file."""
+    latencies = []
+    count = 0
+    for _ in range(max(1, iterations // 10)):
+        index = RecordIndex(records_dir, workers=1)
+        _timed(latencies, index.refresh)
+        count = len(index.filenames())
+    return latencies, count
+
+
+def bench_latest_per_asset(records_dir, iterations, rng):
+    """latest() and latest_by_owner() after a new snapshot invalidates the sorted views."""
+    index = _index(records_dir)
+    latencies = []
+    for _ in range(iterations):
+        _touch_one(index, rng)
+        _timed(latencies, lambda: (index.latest(), index.latest_by_owner()))
+    return latencies, 1
+
+
+def bench_detail(records_dir, iterations, rng):
+    """get() of random snapshots through a RecordCache, as asset_detail() serves them."""
+    index = RecordIndex(records_dir, cache=RecordCache(max_entries=256), workers=1)
+    index.refresh()
+    names = index.filenames()
+    latencies = []
+    for _ in range(iterations * 20):
+        _timed(latencies, index.get, rng.choice(names))
+    return latencies, 1
+
+
+def bench_serialize_assets(records_dir, iterations, rng):
+    """Encode the /api/assets body (JSON, then gzip) for a fresh index version."""
+    index = _index(records_dir)
+    latest = index.latest()
+    latencies = []
+    for _ in range(iterations):
+        _timed(latencies, lambda: compress(json.dumps(latest).encode(), 'gzip'))
+    return latencies, len(latest)
+
+
+def _serve_in_process(records_dir):
+    """Import server.py against records_dir and serve it on an ephemeral port."""
+    os.chdir(os.path.dirname(os.path.abspath(records_dir)))
+    if os.path.basename(os.path.abspath(records_dir)) != 'Records':
+        raise RuntimeError("server.py serves ./Records; generate the fleet into a directory named Records")
+    sys.path.insert(0, ROOT)
+    import server
+    server.record_index.refresh()
+    server.RequestHandler.protocol_version = 'HTTP/1.1'
+    server.RequestHandler.log_message = lambda *args: None
+    httpd = server.PooledHTTPServer(('127.0.0.1', 0), server.RequestHandler, workers=4)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return server, httpd
+
+
+def _get(connection, path, headers=None):
+    connection.request('GET', path, headers=headers or {})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def bench_http_assets(records_dir, iterations, rng):
+    """GET /api/assets from server.py over keep-alive, rebuilding the body each time."""
+    server, httpd = _serve_in_process(records_dir)
+    connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1])
+    latencies = []
+    for _ in range(iterations):
+        _touch_one(server.record_index, rng)
+        _timed(latencies, _get, connection, '/api/assets', {'Accept-Encoding': 'gzip'})
+    httpd.shutdown()
+    return latencies, 1
+
+
+def bench_http_assets_page(records_dir, iterations, rng):
+    """GET /api/assets?limit=100&fields=... pages from server.py."""
+    server, httpd = _serve_in_process(records_dir)
+    connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1])
+    latencies = []
+    for i in range(iterations * 5):
+        path = f'/api/assets?limit=100&fields=AssetInformation.Hostname,Model,OwnerName&n={i}'
+        _timed(latencies, _get, connection, path)
+    httpd.shutdown()
+    return latencies, 1
+
+
+def _flask_app(records_dir):
+    """Import app/app.py with its ../Records pointing at records_dir."""
+    try:
+        import flask  # noqa: F401
+    except ImportError:
+        raise RuntimeError("flask is not installed") from None
+    if os.path.basename(os.path.abspath(records_dir)) != 'Records':
+        raise RuntimeError("app/app.py serves ../Records; generate the fleet into a directory named Records")
+    workdir = os.path.join(os.path.dirname(os.path.abspath(records_dir)), 'app')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    spec = importlib.util.spec_from_file_location('wis_app', os.path.join(ROOT, 'app', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    # Flask finds templates/ and static/ through the module registered under its import name
+    sys.modules['wis_app'] = module
+    spec.loader.exec_module(module)
+    # The benchmarks refresh and touch the store themselves; no watcher or ingest log
+    module.app.config['WIS_BACKGROUND'] = False
+    module.record_index.refresh()
+    return module
+
+
+def bench_flask_index(records_dir, iterations, rng):
+    """Render the list page (index()) after each new snapshot."""
+    module = _flask_app(records_dir)
+    client = module.app.test_client()
+    latencies = []
+    for _ in range(iterations):
+        _touch_one(module.record_index, rng)
+        _timed(latencies, client.get, '/')
+    return latencies, 1
+
+
+def bench_flask_detail(records_dir, iterations, rng):
+    """Render asset_detail() for random snapshots."""
+    module = _flask_app(records_dir)
+    client = module.app.test_client()
+    names = module.record_index.filenames()
+    latencies = []
+    for _ in range(iterations * 5):
+        _timed(latencies, client.get, '/asset/' + rng.choice(names))
+    return latencies, 1
+
+
+BENCHMARKS = {
+    'load_record': bench_load_record,
+    'index_refresh': bench_index_refresh,
+    'latest_per_asset': bench_latest_per_asset,
+    'detail': bench_detail,
+    'serialize_assets': bench_serialize_assets,
+    'http_assets': bench_http_assets,
+    'http_assets_page': bench_http_assets_page,
+    'flask_index': bench_flask_index,
+    'flask_detail': bench_flask_detail,
+}
+
+
+def _run_child(name, records_dir, iterations, seed, results):
+    try:
+        latencies, items = BENCHMARKS[name](records_dir, iterations, random.Random(seed))
+        results.put((latencies, items, None, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    except Exception as e:
+        results.put((None, None, f'{type(e).__name__}: {e}', None))
+
+
+def run_benchmark(name, records_dir, iterations=50, seed=0):
+    """Run one benchmark in a fresh process so its peak RSS is its own; return its summary."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_child, args=(name, records_dir, iterations, seed, results))
+    process.start()
+    latencies, items, error, max_rss = results.get()
+    process.join()
+    if error:
+        return {'skipped': error}
+    latencies.sort()
+    total = sum(latencies)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss_bytes = max_rss if sys.platform == 'darwin' else max_rss * 1024
+    return {
+        'ops': len(latencies),
+        'seconds': round(total, 6),
+        'ops_per_second': round(len(latencies) / total, 2) if total else None,
+        'items_per_second': round(len(latencies) * items / total, 2) if total else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'mean_ms': round(total / len(latencies) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4),
+        'peak_rss_mb': round(rss_bytes / (1024 * 1024), 1),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print p50/p99 changes against a previous results file; return the names that regressed."""
+    regressed = []
+    print(f"{'benchmark':20} {'p50 before':>11} {'p50 now':>11} {'p99 before':>11} {'p99 now':>11}  ratio")
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or 'p50_ms' not in before or 'p50_ms' not in result:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else math.inf
+        flag = '  REGRESSED' if ratio > threshold else ''
+        if flag:
+            regressed.append(name)
+        print(f"{name:20} {before['p50_ms']:11.3f} {result['p50_ms']:11.3f} "
+              f"{before['p99_ms']:11.3f} {result['p99_ms']:11.3f}  {ratio:.2f}x{flag}")
+    return regressed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark record loading, latest-per-asset, detail and '
+                                                 'serialization paths against a synthetic fleet.')
+    parser.add_argument('--assets', type=int, default=200)
+    parser.add_argument('--snapshots', type=int, default=10, help='snapshots per asset')
+    parser.add_argument('--software-min', type=int, default=20)
+    parser.add_argument('--software-max', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--records-dir', help='existing Records directory to use instead of generating one '
+                                              '(copied to a temporary directory first)')
+    parser.add_argument('--iterations', type=int, default=50, help='base operation count per benchmark')
+    parser.add_argument('--only', help='comma-separated benchmark names (default: all)')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the results JSON')
+    parser.add_argument('--compare', help='previous results JSON to compare p50/p99 against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='p50 ratio above which --compare reports a regression and exits 1')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(',')] if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix='wis-bench-') as workdir:
+        # Benchmarks touch mtimes and the Flask app works next to ../Records, so they only ever see a copy
+        records_dir = os.path.join(workdir, 'Records')
+        start = time.perf_counter()
+        if args.records_dir is None:
+            count = generate_fleet(records_dir, args.assets, args.snapshots,
+                                   (args.software_min, args.software_max), args.seed)
+            print(f"Generated {count} records in {time.perf_counter() - start:.1f}s")
+        else:
+            os.makedirs(records_dir)
+            count = 0
+            for entry in os.scandir(args.records_dir):
+                if entry.name.endswith('.json') and entry.is_file():
+                    shutil.copy2(entry.path, records_dir)
+                    count += 1
+            print(f"Copied {count} records from {args.records_dir} in {time.perf_counter() - start:.1f}s")
+        files = [entry for entry in os.scandir(records_dir) if entry.name.endswith('.json')]
+
+        output = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'config': {'assets': args.assets, 'snapshots': args.snapshots,
+                       'software': [args.software_min, args.software_max], 'seed': args.seed,
+                       'iterations': args.iterations, 'records_dir': args.records_dir,
+                       'files': len(files), 'bytes': sum(entry.stat().st_size for entry in files)},
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+            'results': {},
+        }
+        for name in names:
+            result = run_benchmark(name, records_dir, args.iterations, args.seed)
+            output['results'][name] = result
+            if 'skipped' in result:
+                print(f"{name:20} skipped: {result['skipped']}")
+            else:
+                print(f"{name:20} {result['ops_per_second']:10.1f} ops/s  p50 {result['p50_ms']:9.3f} ms  "
+                      f"p99 {result['p99_ms']:9.3f} ms  peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressed = compare(json.load(f), output, args.threshold)
+        if regressed:
+            print(f"Regressions: {', '.join(regressed)}")
+            sys.exit(1)
@@ -0,0 +1,332 @@
+import math
+import operator
+import re
+import threading
+from array import array
+
+from record_index import METRIC_COLUMNS, record_metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Categorical columns: name -> path into the record
+CATEGORIES = {
+    'model': ('AssetInformation', 'Model'),
+    'manufacturer': ('AssetInformation', 'Manufacturer'),
+    'os': ('AssetInformation', 'OS'),
+    'build': ('AssetInformation', 'Build'),
+    'asset_type': ('AssetInformation', 'AssetType'),
+    'domain': ('AssetInformation', 'Domain'),
+    'owner': ('OwnerName',),
+}
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max')
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+             '==': operator.eq, '!=': operator.ne}
+FILTER_REGEX = re.compile(r'^(\w+)\s*(>=|<=|==|!=|>|<)\s*(.*)$')
+
+
+def _lookup(record, path):
+    value = record
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return 'Unknown' if value is None or value == '' else str(value)
+
+
+class FleetFrame:
+    """Column arrays over the latest record of every asset.
+
+    Categorical columns are dictionary-encoded to integer codes and metrics
+    are float64 with NaN for unknown values, so filters and group-bys run as
+    whole-array operations (NumPy when installed, plain loops otherwise).
+    Rows are (serial, record, metrics) triples; updated() derives a new
+    frame for a few changed assets by copying the arrays rather than
+    re-reading every record, and leaves this one untouched for queries
+    still running on it.
+    """
+
+    def __init__(self, rows=()):
+        self.serials = []
+        self.rows = {}          # serial -> row
+        self.labels = {name: [] for name in CATEGORIES}
+        self._lookup = {name: {} for name in CATEGORIES}
+        self._codes = {name: array('i') for name in CATEGORIES}
+        self._metrics = {name: array('d') for name in METRIC_COLUMNS}
+        for serial, record, metrics in rows:
+            self._set(serial, record, metrics)
+        self._publish()
+
+    def updated(self, changes):
+        """Return a copy with (serial, record, metrics) changes applied; a None record removes the asset."""
+        frame = FleetFrame()
+        frame.serials = list(self.serials)
+        frame.rows = dict(self.rows)
+        frame.labels = {name: list(labels) for name, labels in self.labels.items()}
+        frame._lookup = {name: dict(lookup) for name, lookup in self._lookup.items()}
+        frame._codes = {name: array('i', arr) for name, arr in self._codes.items()}
+        frame._metrics = {name: array('d', arr) for name, arr in self._metrics.items()}
+        for serial, record, metrics in changes:
+            if record is None:
+                frame._remove(serial)
+            else:
+                frame._set(serial, record, metrics)
+        frame._publish()
+        return frame
+
+    def _code(self, name, record):
+        label = _lookup(record, CATEGORIES[name])
+        code = self._lookup[name].get(label)
+        if code is None:
+            code = self._lookup[name][label] = len(self.labels[name])
+            self.labels[name].append(label)
+        return code
+
+    def _set(self, serial, record, metrics):
+        row = self.rows.get(serial)
+        if row is None:
+            self.rows[serial] = len(self.serials)
+            self.serials.append(serial)
+            for name, arr in self._codes.items():
+                arr.append(self._code(name, record))
+            for name, value in zip(METRIC_COLUMNS, metrics):
+                self._metrics[name].append(value)
+        else:
+            for name, arr in self._codes.items():
+                arr[row] = self._code(name, record)
+            for name, value in zip(METRIC_COLUMNS, metrics):
+                self._metrics[name][row] = value
+
+    def _remove(self, serial):
+        # Move the last row into the gap; row order does not matter to any query
+        row = self.rows.pop(serial, None)
+        if row is None:
+            return
+        last = len(self.serials) - 1
+        moved = self.serials.pop()
+        for arr in list(self._codes.values()) + list(self._metrics.values()):
+            value = arr.pop()
+            if row != last:
+                arr[row] = value
+        if row != last:
+            self.serials[row] = moved
+            self.rows[moved] = row
+
+    def _publish(self):
+        self.size = len(self.serials)
+        if np is not None:
+            self.codes = {name: np.frombuffer(arr, dtype=np.int32) if len(arr) else np.zeros(0, np.int32)
+                          for name, arr in self._codes.items()}
+            self.metrics = {name: np.frombuffer(arr, dtype=np.float64) if len(arr) else np.zeros(0)
+                            for name, arr in self._metrics.items()}
+        else:
+            self.codes, self.metrics = self._codes, self._metrics
+
+    def mask(self, filters):
+        """Return a boolean selection for "column op value" filter strings, all ANDed."""
+        selected = np.ones(self.size, dtype=bool) if np is not None else [True] * self.size
+        for spec in filters:
+            match = FILTER_REGEX.match(spec.strip())
+            if not match:
+                raise ValueError(f"invalid filter: {spec}")
+            column, op, value = match.groups()
+            if column in self.metrics:
+                try:
+                    threshold = float(value)
+                except ValueError:
+                    raise ValueError(f"filter value for {column} must be a number") from None
+                selected = self._combine(selected, self._compare(self.metrics[column], op, threshold))
+            elif column in self.codes:
+                if op not in ('==', '!='):
+                    raise ValueError(f"{column} only supports == and !=")
+                code = self._lookup[column].get(value, -1)
+                selected = self._combine(selected, self._compare(self.codes[column], op, code))
+            else:
+                raise ValueError(f"unknown filter column: {column}")
+        return selected
+
+    @staticmethod
+    def _compare(values, op, operand):
+        compare = OPERATORS[op]
+        if np is not None:
+            return compare(values, operand)
+        return [compare(value, operand) for value in values]
+
+    @staticmethod
+    def _combine(a, b):
+        if np is not None:
+            return a & b
+        return [x and y for x, y in zip(a, b)]
+
+    def aggregate(self, mask, metric, agg, group_by=None):
+        """Aggregate a metric over the selected rows, optionally per category."""
+        if agg not in AGGREGATES:
+            raise ValueError(f"unknown aggregate: {agg}")
+        if agg != 'count' and metric not in self.metrics:
+            raise ValueError(f"unknown metric: {metric}")
+        if group_by is not None and group_by not in self.codes:
+            raise ValueError(f"unknown group_by column: {group_by}")
+        groups = len(self.labels[group_by]) if group_by else 1
+        if np is not None:
+            codes = self.codes[group_by][mask] if group_by else np.zeros(int(mask.sum()), dtype=np.int32)
+            values = self.metrics[metric][mask] if agg != 'count' else None
+            counts, result = self._aggregate_numpy(codes, values, agg, groups)
+        else:
+            codes = [c for c, m in zip(self.codes[group_by], mask) if m] if group_by else [0] * sum(mask)
+            values = [v for v, m in zip(self.metrics[metric], mask) if m] if agg != 'count' else None
+            counts, result = self._aggregate_python(codes, values, agg, groups)
+        rows = []
+        for code in range(groups):
+            if counts[code] == 0:
+                continue
+            value = result[code]
+            rows.append({
+                'key': self.labels[group_by][code] if group_by else None,
+                'count': int(counts[code]),
+                'value': None if value is None or math.isnan(value) else round(float(value), 2),
+            })
+        rows.sort(key=lambda row: row['count'] if agg == 'count' else (row['value'] is not None, row['value']),
+                  reverse=True)
+        return rows
+
+    @staticmethod
+    def _aggregate_numpy(codes, values, agg, groups):
+        if values is None:
+            counts = np.bincount(codes, minlength=groups)
+            return counts, counts.astype(np.float64)
+        known = ~np.isnan(values)
+        codes, values = codes[known], values[known]
+        counts = np.bincount(codes, minlength=groups)
+        if agg == 'sum' or agg == 'mean':
+            sums = np.bincount(codes, weights=values, minlength=groups)
+            if agg == 'sum':
+                return counts, sums
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return counts, sums / counts
+        extreme = np.full(groups, np.inf if agg == 'min' else -np.inf)
+        (np.minimum if agg == 'min' else np.maximum).at(extreme, codes, values)
+        return counts, extreme
+
+    @staticmethod
+    def _aggregate_python(codes, values, agg, groups):
+        counts = [0] * groups
+        if values is None:
+            for code in codes:
+                counts[code] += 1
+            return counts, [float(c) for c in counts]
+        result = [None] * groups
+        for code, value in zip(codes, values):
+            if math.isnan(value):
+                continue
+            counts[code] += 1
+            current = result[code]
+            if agg in ('sum', 'mean'):
+                result[code] = value if current is None else current + value
+            elif current is None or (value < current if agg == 'min' else value > current):
+                result[code] = value
+        if agg == 'mean':
+            result = [None if r is None else r / counts[i] for i, r in enumerate(result)]
+        return counts, result
+
+    def histogram(self, mask, metric, bins):
+        """Return equal-width bin edges and counts for a metric over the selected rows."""
+        if metric not in self.metrics:
+            raise ValueError(f"unknown metric: {metric}")
+        if np is not None:
+            values = self.metrics[metric][mask]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                return {'edges': [], 'counts': []}
+            counts, edges = np.histogram(values, bins=bins)
+            return {'edges': [round(float(e), 2) for e in edges], 'counts': [int(c) for c in counts]}
+        values = [v for v, m in zip(self.metrics[metric], mask) if m and not math.isnan(v)]
+        if not values:
+            return {'edges': [], 'counts': []}
+        low, high = min(values), max(values)
+        if low == high:
+            # Same convention as numpy.histogram for a single distinct value
+            low, high = low - 0.5, high + 0.5
+        width = (high - low) / bins
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        return {'edges': [round(low + width * i, 2) for i in range(bins + 1)], 'counts': counts}
+
+
+class FleetStats:
+    """Answers /api/stats queries from a FleetFrame kept in step with the store.
+
+    When the store version moves, only the assets the store reports as
+    changed are re-read into a copy of the frame; the frame is rebuilt from
+    the stored per-snapshot metrics when the store cannot say what changed
+    or most of the fleet did.
+    """
+
+    def __init__(self, store, max_cached_queries=256):
+        self.store = store
+        self.max_cached_queries = max_cached_queries
+        self._lock = threading.Lock()
+        self._version = None
+        self._frame = None
+        self._results = {}
+
+    def frame(self):
+        with self._lock:
+            version = self.store.version
+            if self._version != version:
+                changed = self.store.changed_since(self._version) if self._frame is not None else None
+                if changed is None or len(changed) > self._frame.size // 2:
+                    self._frame = FleetFrame((record['AssetInformation']['SerialNumber'], record, metrics)
+                                             for record, metrics in self.store.latest_metrics())
+                else:
+                    self._frame = self._frame.updated(self._changes(changed))
+                self._version = version
+                self._results = {}
+            return self._frame, version
+
+    def _changes(self, serials):
+        for serial in serials:
+            latest = self.store.latest_for(serial)
+            if latest is None:
+                yield serial, None, None
+            else:
+                yield serial, latest[1], record_metrics(latest[1])
+
+    def query(self, params):
+        """Run a query given as a dict of lists, as parse_qs returns it.
+
+        group_by   category to group on (model, manufacturer, os, build, asset_type, domain, owner)
+        metric     one of METRIC_COLUMNS (required unless agg=count)
+        agg        count, sum, mean, min or max (default count)
+        where      "column op value" filters, repeatable, e.g. max_used_percent>90
+        bins       return a histogram of metric with this many bins instead
+        """
+        frame, version = self.frame()
+        key = tuple(sorted((name, tuple(values)) for name, values in params.items()))
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        metric = params.get('metric', [None])[0]
+        agg = params.get('agg', ['count'])[0]
+        group_by = params.get('group_by', [None])[0]
+        mask = frame.mask(params.get('where', []))
+        matched = int(mask.sum()) if np is not None else sum(mask)
+        result = {'assets': frame.size, 'matched': matched}
+        if 'bins' in params:
+            try:
+                bins = int(params['bins'][0])
+            except ValueError:
+                raise ValueError("bins must be an integer") from None
+            if not 1 <= bins <= 1000:
+                raise ValueError("bins must be between 1 and 1000")
+            result['histogram'] = frame.histogram(mask, metric, bins)
+        else:
+            result['groups'] = frame.aggregate(mask, metric, agg, group_by)
+
+        with self._lock:
+            if self._version == version:
+                if len(self._results) >= self.max_cached_queries:
+                    self._results.clear()
+                self._results[key] = result
+        return result
@@ -0,0 +1,128 @@
+import gzip
+import os
+import threading
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Versions restart at 0 with the process, so tags also carry a per-process token
+_INSTANCE = os.urandom(4).hex()
+ENCODINGS = ('br', 'gzip')
+
+
+def make_etag(version, variant=''):
+    """Return a strong ETag for a data version and optional variant (query, encoding)."""
+    tag = f'{_INSTANCE}-{version}'
+    if variant:
+        tag += f'-{variant}'
+    return f'"{tag}"'
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def choose_encoding(accept_encoding, encodings=ENCODINGS):
+    """Pick the first of encodings allowed by an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in encodings:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def not_modified(headers, etag, last_modified):
+    """Return True when the request's conditional headers match the current data.
+
+    etag is the identity tag; tags of its encoded variants match as well.
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        current = {etag} | {etag[:-1] + f'-{encoding}"' for encoding in ENCODINGS}
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == '*' or tag in current:
+                return True
+        return False
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def gzip_stream(chunks):
+    """Gzip an iterable of byte chunks as it is consumed."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CachedBody:
+    """One rendered body plus its compressed variants, made on first request."""
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        """Return (data, content_encoding) for the negotiated encoding."""
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, None
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = compress(self.body, encoding)
+            return self._encoded[encoding], encoding
+
+
+class CachedResponse:
+    """Build a response body once per data version and share it between requests."""
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self._current = None
+
+    def get(self, version):
+        # Concurrent callers wait here for the one build instead of repeating it
+        with self._lock:
+            if self._current is None or self._current.version != version:
+                self._current = CachedBody(version, self._build())
+            return self._current
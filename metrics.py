@@ -0,0 +1,190 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; covers sub-millisecond parses up to slow full rescans
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram of durations, with a timer context manager."""
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}   # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(key, [("le", repr(bound))])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {series[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {series[-1]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# Shared by the stores and both servers; /metrics renders it
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SCAN_SECONDS = REGISTRY.histogram('wis_scan_seconds', 'Time to list the Records directory')
+PARSE_SECONDS = REGISTRY.histogram('wis_parse_seconds', 'Time to read and decode one record')
+PARSE_ERRORS = REGISTRY.counter('wis_parse_errors_total', 'Records that could not be read or decoded')
+FILES_CHANGED = REGISTRY.counter('wis_files_changed_total', 'New, changed or removed record files picked up')
+LATEST_SECONDS = REGISTRY.histogram('wis_latest_seconds', 'Time to rebuild a latest-per-key listing')
+SERIALIZE_SECONDS = REGISTRY.histogram('wis_serialize_seconds', 'Time to encode a response body')
+RENDER_SECONDS = REGISTRY.histogram('wis_render_seconds', 'Time to render an HTML template')
+REQUEST_SECONDS = REGISTRY.histogram('wis_request_seconds', 'HTTP request handling time')
+REQUEST_ERRORS = REGISTRY.counter('wis_request_errors_total', 'Requests that failed with an exception')
+
+
+class SlowRequestProfiler:
+    """Opt-in cProfile of every request, kept only for requests slower than threshold_ms.
+
+    Enabled by WIS_PROFILE_SLOW_MS; dumps go to WIS_PROFILE_DIR (default
+    ./profiles) as .prof files readable with pstats or snakeviz. Profiling
+    slows every request down, so leave it off outside investigations.
+    """
+
+    def __init__(self, threshold_ms=None, directory=None):
+        if threshold_ms is None:
+            value = os.environ.get('WIS_PROFILE_SLOW_MS')
+            threshold_ms = float(value) if value else None
+        self.threshold = threshold_ms / 1000 if threshold_ms is not None else None
+        self.directory = directory or os.environ.get('WIS_PROFILE_DIR') or 'profiles'
+        self.dumps = 0
+
+    @contextmanager
+    def profile(self, name):
+        if self.threshold is None:
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another thread's request is being profiled (one profiler at a time on 3.12+)
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                os.makedirs(self.directory, exist_ok=True)
+                safe_name = re.sub(r'[^\w.-]+', '_', name).strip('_')[:80] or 'request'
+                path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{elapsed * 1000:.0f}ms-{safe_name}.prof')
+                profiler.dump_stats(path)
+                self.dumps += 1
+                print(f"Slow request {name} took {elapsed * 1000:.0f}ms; profile written to {path}")
@@ -0,0 +1,68 @@
+import re
+
+DISK_NUMBER_REGEX = re.compile(r'Disk #(\d+)')
+DEVICE_ID_REGEX = re.compile(r'DeviceID="((?:[^"\\]|\\.)*)"')
+
+# Win32_LogicalDisk.DriveType for mapped network drives, which are not local volumes
+NETWORK_DRIVE = 4
+
+
+def reference_id(reference):
+    """Return the DeviceID a WMI association end points to.
+
+    References arrive as object paths such as
+    \\\\HOST\\root\\cimv2:Win32_DiskPartition.DeviceID="Disk #0, Partition #1",
+    or as already-resolved objects when the provider hands those out.
+    """
+    if reference is None:
+        return None
+    device_id = getattr(reference, "DeviceID", None)
+    if device_id is not None:
+        return device_id
+    match = DEVICE_ID_REGEX.search(str(reference))
+    if not match:
+        return None
+    # Object paths escape backslashes and quotes inside the key value
+    return re.sub(r'\\(.)', r'\1', match.group(1))
+
+
+class DriveIndex:
+    """Disk -> partition -> logical drive joins built from three bulk WMI queries.
+
+    query(class_name) returns all instances of a class, e.g. WmiSession.query.
+    Each association is read once into a dict, so looking up the drive letters
+    of any disk, or listing the logical drives, costs no further WMI calls.
+    """
+
+    def __init__(self, query):
+        self.logical_disks = {}         # "C:" -> Win32_LogicalDisk row
+        self.partitions_by_disk = {}    # disk number -> [partition DeviceID]
+        self.logical_by_partition = {}  # partition DeviceID -> [logical DeviceID]
+
+        for ld in query("Win32_LogicalDisk"):
+            if ld.DeviceID:
+                self.logical_disks[ld.DeviceID] = ld
+        for link in query("Win32_DiskDriveToDiskPartition"):
+            partition = reference_id(link.Dependent)
+            match = DISK_NUMBER_REGEX.search(partition or "")
+            if match:
+                self.partitions_by_disk.setdefault(int(match.group(1)), []).append(partition)
+        for link in query("Win32_LogicalDiskToPartition"):
+            partition = reference_id(link.Antecedent)
+            logical = reference_id(link.Dependent)
+            if partition and logical:
+                self.logical_by_partition.setdefault(partition, []).append(logical)
+
+    def drive_letters(self, disk_number):
+        """Return the drive letters on a physical disk, e.g. "C, D"."""
+        letters = []
+        for partition in self.partitions_by_disk.get(disk_number, []):
+            for logical in self.logical_by_partition.get(partition, []):
+                if logical in self.logical_disks and logical[0] not in letters:
+                    letters.append(logical[0])
+        return ", ".join(sorted(letters))
+
+    def local_drives(self):
+        """Return mounted, non-network Win32_LogicalDisk rows ordered by drive letter."""
+        return [ld for device_id, ld in sorted(self.logical_disks.items())
+                if ld.Size and ld.DriveType != NETWORK_DRIVE]
@@ -1,22 +1,69 @@
+import argparse
+import contextlib
 import platform
 import socket
 import os
-import psutil
-import wmi
-import screeninfo
-import subprocess
 import math
 import json
+import sys
+import threading
+import time
 from datetime import datetime
+from drive_index import DriveIndex
+from oui_db import vendor_for_mac
+from powershell_host import PowerShellPool
+from section_cache import SectionCache, hardware_fingerprint
+from section_runner import Section, run_sections
+from wmi_session import WmiSession, wmi_connect
+
+# Opens a WMI namespace; each run gets a fresh WmiSession over it
+_wmi_connect = wmi_connect
+
+# One connection per namespace; each class is queried once per run
+wmi_session = WmiSession(_wmi_connect)
+
+# Long-lived PowerShell hosts shared by the sections that need cmdlets
+powershell = PowerShellPool(size=3)
+
+# psutil and screeninfo are imported by the first section that needs them,
+# so importing this module, or a run without those sections, stays cheap
+_psutil = None
+_screeninfo = None
+
+def get_psutil():
+    global _psutil
+    if _psutil is None:
+        import psutil
+        _psutil = psutil
+    return _psutil
+
+def get_screeninfo():
+    global _screeninfo
+    if _screeninfo is None:
+        import screeninfo
+        _screeninfo = screeninfo
+    return _screeninfo
+
+def configure(wmi_connect=None, powershell_runner=None, psutil_module=None, screeninfo_module=None):
+    """Replace the providers the sections read from; None keeps the current one.
+
+    Lets the sections run off Windows against fakes, e.g.
+    configure(wmi_connect=lambda namespace: FakeWmiConnection({...}),
+    powershell_runner=FakePowerShell({...}), psutil_module=..., screeninfo_module=...).
+    """
+    global _wmi_connect, powershell, _psutil, _screeninfo
+    if wmi_connect is not None:
+        _wmi_connect = wmi_connect
+    if powershell_runner is not None:
+        powershell = powershell_runner
+    if psutil_module is not None:
+        _psutil = psutil_module
+    if screeninfo_module is not None:
+        _screeninfo = screeninfo_module
 
 def get_wmi_object(namespace="root\\cimv2", class_name=None):
     """Helper function to safely query WMI objects."""
-    try:
-        c = wmi.WMI(namespace=namespace)
-        return c.query(f"SELECT * FROM {class_name}")
-    except wmi.x_wmi as e:
-        print(f"WMI query failed for {class_name} in {namespace}: {str(e)}")
-        return []
+    return wmi_session.query(class_name, namespace=namespace)
 
 def get_full_manufacturer_name(code):
     """Map monitor manufacturer codes to full names."""
@@ -52,123 +99,6 @@ def get_domain_or_workgroup():
         return cs[0].Domain
     return "WORKGROUP"
 
-# Initialize system info dictionary for JSON export
-system_info = {
-    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    "asset_information": {},
-    "memory_information": {"modules": [], "total_memory_gb": 0},
-    "physical_disks": [],
-    "logical_drives": [],
-    "network_interfaces": [],
-    "battery_information": None,
-    "monitor_information": []
-}
-
-# === Asset Information ===
-print("\n=== Asset Information ===\n")
-
-# Hostname
-hostname = socket.gethostname()
-print(f"Hostname:\t{hostname}")
-system_info["asset_information"]["hostname"] = hostname
-
-# Asset type
-asset_type = get_asset_type()
-print(f"Asset type:\t{asset_type}")
-system_info["asset_information"]["asset_type"] = asset_type
-
-# Last user
-username = os.environ.get("USERNAME", "Unknown")
-userdomain = os.environ.get("USERDOMAIN", "Unknown")
-last_user = f"{userdomain}\\{username}"
-print(f"Last user:\t{last_user}")
-system_info["asset_information"]["last_user"] = last_user
-
-# OS info
-os_info = platform.uname()
-print(f"OS:\t\t{os_info.system} {os_info.release}")
-print(f"Version:\t{os_info.version}")
-print(f"Build:\t\t{platform.win32_ver()[2]}")
-system_info["asset_information"]["os"] = f"{os_info.system} {os_info.release}"
-system_info["asset_information"]["version"] = os_info.version
-system_info["asset_information"]["build"] = platform.win32_ver()[2]
-
-# Domain/Workgroup
-domain = get_domain_or_workgroup()
-print(f"Domain:\t\t{domain}")
-system_info["asset_information"]["domain"] = domain
-
-# Manufacturer and Model
-cs = get_wmi_object(class_name="Win32_ComputerSystem")
-manufacturer = cs[0].Manufacturer if cs else "Unknown"
-model = cs[0].Model if cs else "Unknown"
-print(f"Manufacturer:\t{manufacturer}")
-print(f"Model:\t\t{model}")
-system_info["asset_information"]["manufacturer"] = manufacturer
-system_info["asset_information"]["model"] = model
-
-# Serial Number
-bios = get_wmi_object(class_name="Win32_BIOS")
-serial = bios[0].SerialNumber if bios else "Unknown"
-print(f"Serial Number:\t{serial}")
-system_info["asset_information"]["serial_number"] = serial
-
-# Processor
-cpu = get_wmi_object(class_name="Win32_Processor")
-if cpu:
-    cpu_name = cpu[0].Name
-    cores = cpu[0].NumberOfCores
-    threads = cpu[0].NumberOfLogicalProcessors
-    speed = round(cpu[0].MaxClockSpeed / 1000.0, 2)
-    cpu_info = f"{cpu_name} ({cores} cores / {threads} threads @ {speed} GHz)"
-    print(f"Processor:\t{cpu_info}")
-    system_info["asset_information"]["processor"] = cpu_info
-else:
-    print("Processor:\tUnknown")
-    system_info["asset_information"]["processor"] = "Unknown"
-
-# Motherboard
-mb = get_wmi_object(class_name="Win32_BaseBoard")
-mb_info = f"{mb[0].Manufacturer} {mb[0].Product}" if mb else "Unknown"
-print(f"Motherboard:\t{mb_info}")
-system_info["asset_information"]["motherboard"] = mb_info
-
-# Graphics
-gpu = get_wmi_object(class_name="Win32_VideoController")
-gpu_names = [g.Name for g in gpu] if gpu else ["Unknown"]
-print(f"Graphics:\t{', '.join(gpu_names)}")
-system_info["asset_information"]["graphics"] = gpu_names
-
-# Audio
-audio = get_wmi_object(class_name="Win32_SoundDevice")
-audio_names = [a.Name for a in audio] if audio else ["Unknown"]
-print(f"Audio:\t\t{', '.join(audio_names)}")
-system_info["asset_information"]["audio"] = audio_names
-
-# Antivirus
-try:
-    result = subprocess.run(["powershell", "-Command", "Get-MpComputerStatus | Select-Object -ExpandProperty AntispywareEnabled"], capture_output=True, text=True)
-    av_status = "Enabled" if "True" in result.stdout else "Disabled"
-    av_info = f"Windows Defender ({av_status})"
-    print(f"Antivirus:\t{av_info}")
-    system_info["asset_information"]["antivirus"] = av_info
-except:
-    print("Antivirus:\tUnknown")
-    system_info["asset_information"]["antivirus"] = "Unknown"
-
-# Firewall
-try:
-    result = subprocess.run(["powershell", "-Command", "Get-NetFirewallProfile | Select-Object Name,Enabled | Format-Table -HideTableHeaders | Out-String"], capture_output=True, text=True)
-    firewall_status = ", ".join([line.strip() for line in result.stdout.splitlines() if line.strip()])
-    print(f"Firewall:\t{firewall_status}")
-    system_info["asset_information"]["firewall"] = firewall_status
-except:
-    print("Firewall:\tUnknown")
-    system_info["asset_information"]["firewall"] = "Unknown"
-
-# === Memory Information ===
-print("\n=== Memory Information ===\n")
-
 def get_ram_type(smbios_type):
     """Map SMBIOS memory type to human-readable name."""
     ram_types = {
@@ -219,165 +149,71 @@ def get_module_type(form_factor):
     }
     return module_types.get(form_factor, f"Unknown ({form_factor})")
 
-ram_modules = get_wmi_object(class_name="Win32_PhysicalMemory")
-if ram_modules:
-    print("Capacity (GB)\tSpeed (MHz)\tRAM Type\tModule Type\tManufacturer\tPart Number")
-    print("-" * 80)
-    total_mem = 0
-    for ram in ram_modules:
-        try:
-            capacity = round(int(ram.Capacity) / (1024 ** 3), 2) if ram.Capacity else 0
-            total_mem += capacity
-            speed = ram.Speed if ram.Speed else "Unknown"
-            ram_type = get_ram_type(ram.SMBIOSMemoryType)
-            module_type = get_module_type(ram.FormFactor)
-            manufacturer = ram.Manufacturer if ram.Manufacturer else "Unknown"
-            part_number = ram.PartNumber.strip() if ram.PartNumber else "Unknown"
-            print(f"{capacity:.2f}\t\t{speed}\t\t{ram_type}\t{module_type}\t{manufacturer}\t{part_number}")
-            system_info["memory_information"]["modules"].append({
-                "capacity_gb": capacity,
-                "speed_mhz": speed,
-                "ram_type": ram_type,
-                "module_type": module_type,
-                "manufacturer": manufacturer,
-                "part_number": part_number
-            })
-        except (ValueError, TypeError):
-            print("Invalid RAM module data detected. Skipping.")
-            continue
-    system_info["memory_information"]["total_memory_gb"] = round(total_mem, 2)
-    print(f"\nTotal Memory:\t{round(total_mem, 2)} GB")
-else:
-    print("Memory information not available.")
-    system_info["memory_information"]["modules"] = []
-    system_info["memory_information"]["total_memory_gb"] = "Unknown"
-
-# === Physical Disks ===
-print("\n=== Physical Disks ===\n")
-
 def get_physical_disk_info():
     """Query Get-PhysicalDisk via PowerShell for accurate media and bus types."""
     try:
-        result = subprocess.run([
-            "powershell", "-Command",
-            "Get-PhysicalDisk | Select-Object FriendlyName,MediaType,BusType,Size | ConvertTo-Json"
-        ], capture_output=True, text=True)
-        disks = json.loads(result.stdout)
+        disks = powershell.run_json(
+            "Get-PhysicalDisk | Select-Object DeviceId,FriendlyName,MediaType,BusType,Size | ConvertTo-Json")
         return disks if isinstance(disks, list) else [disks] if disks else []
     except:
         return []
 
-def get_drive_letters(disk_index):
-    """Map physical disk to drive letters using WMI."""
-    try:
-        drive_letters = []
-        # Query disk partitions
-        partitions = get_wmi_object(class_name="Win32_DiskDriveToDiskPartition")
-        for partition in partitions:
-            if f"Disk #{disk_index}" in partition.Antecedent:
-                # Query logical disks linked to partition
-                logical_disks = get_wmi_object(class_name="Win32_LogicalDiskToPartition")
-                for logical in logical_disks:
-                    if partition.Dependent in logical.Antecedent:
-                        # Extract drive letter from logical disk
-                        logical_disk = get_wmi_object(class_name="Win32_LogicalDisk")
-                        for ld in logical_disk:
-                            if ld.DeviceID in logical.Dependent:
-                                drive_letters.append(ld.DeviceID[0])
-        return ", ".join(drive_letters) if drive_letters else ""
-    except:
-        return ""
-
-physical_disks = get_physical_disk_info()
-if physical_disks:
-    print("Model\t\t\tMedia Type\tBus Type\tSize (GB)\tDrive Letters")
-    print("-" * 80)
-    for index, disk in enumerate(physical_disks):
-        model = disk.get("FriendlyName", "Unknown").strip()
-        media_type = disk.get("MediaType", "Unknown")
-        bus_type = disk.get("BusType", "Unknown")
-        size = round(int(disk.get("Size", 0)) / (1024 ** 3), 2)
-        drive_letters = get_drive_letters(index)
-        print(f"{model[:20]:<20}\t{media_type:<15}\t{bus_type:<10}\t{size:.2f}\t\t{drive_letters}")
-        system_info["physical_disks"].append({
-            "model": model,
-            "media_type": media_type,
-            "bus_type": bus_type,
-            "size_gb": size,
-            "drive_letters": drive_letters
-        })
-else:
-    print("Physical disk information not available.")
-    system_info["physical_disks"] = []
-
-# === Logical Drive Usage ===
-print("\n=== Logical Drive Usage ===\n")
-
-disks = psutil.disk_partitions()
-if disks:
-    print("Drive\tLabel\t\tFile System\tTotal (GB)\tUsed (GB)\tFree (GB)\tUsed (%)")
-    print("-" * 80)
-    for disk in disks:
-        if disk.fstype:  # Only include local drives
-            usage = psutil.disk_usage(disk.mountpoint)
-            drive_letter = disk.mountpoint[0]
-            label = disk.opts.split(",")[-1] if disk.opts else "Drive"
-            fs = disk.fstype
-            total = round(usage.total / (1024 ** 3), 2)
-            used = round(usage.used / (1024 ** 3), 2)
-            free = round(usage.free / (1024 ** 3), 2)
-            percent = round(usage.percent, 2)
-            print(f"{drive_letter}\t{label[:12]:<12}\t{fs:<12}\t{total:.2f}\t\t{used:.2f}\t\t{free:.2f}\t\t{percent:.2f}")
-            system_info["logical_drives"].append({
-                "drive_letter": drive_letter,
-                "label": label,
-                "file_system": fs,
-                "total_gb": total,
-                "used_gb": used,
-                "free_gb": free,
-                "used_percent": percent
-            })
-else:
-    print("Logical drive information not available.")
-    system_info["logical_drives"] = []
-
-# === Network Interfaces ===
-print("\n=== Network Interfaces ===\n")
+_drive_index = None
+_drive_index_lock = threading.Lock()
+
+def start_session():
+    """Begin a collection run: a fresh WMI cache and drive index."""
+    global wmi_session, _drive_index
+    with _drive_index_lock:
+        wmi_session = WmiSession(_wmi_connect)
+        _drive_index = None
+
+def get_drive_index():
+    """Disk -> partition -> drive letter joins, built once and shared by the disk sections."""
+    global _drive_index
+    with _drive_index_lock:
+        if _drive_index is None:
+            _drive_index = DriveIndex(lambda class_name: get_wmi_object(class_name=class_name))
+        return _drive_index
+
+def get_hardware_fingerprint():
+    """BIOS serial plus last boot time, from two single-row WMI classes."""
+    bios = get_wmi_object(class_name="Win32_BIOS")
+    os_rows = get_wmi_object(class_name="Win32_OperatingSystem")
+    return hardware_fingerprint(bios[0].SerialNumber if bios else None,
+                                os_rows[0].LastBootUpTime if os_rows else None)
 
 def get_vendor_from_mac(mac):
-    """Simplified MAC vendor lookup (first three bytes)."""
+    """Vendor of a MAC address from the OUI database (first three bytes)."""
     if not mac:
         return "Unknown Vendor"
-    mac_prefix = mac.replace(":", "").replace("-", "")[:6].upper()
-    vendor_list = {
-        "00163E": "Intel",
-        "00FF41": "Unknown Vendor",
-        "00F48D": "Realtek",
-        "025041": "Microsoft",
-        "8C1645": "Unknown Vendor"
-    }
-    return vendor_list.get(mac_prefix, "Unknown Vendor")
+    return vendor_for_mac(mac)
 
 def get_network_adapters():
     """Query Win32_NetworkAdapter for consistent interface details."""
     adapters = get_wmi_object(class_name="Win32_NetworkAdapter")
+    # Fetch configurations once and index them by InterfaceIndex and MAC
+    configs_by_index = {}
+    configs_by_mac = {}
+    for cfg in get_wmi_object(class_name="Win32_NetworkAdapterConfiguration"):
+        if cfg.InterfaceIndex is not None:
+            configs_by_index.setdefault(cfg.InterfaceIndex, cfg)
+        if cfg.MACAddress:
+            configs_by_mac.setdefault(cfg.MACAddress.upper(), cfg)
     result = []
     for adapter in adapters:
         if adapter.NetConnectionID and adapter.MACAddress:  # Exclude null or loopback adapters
             try:
                 # Get IP addresses
-                config = get_wmi_object(class_name="Win32_NetworkAdapterConfiguration")
+                cfg = configs_by_index.get(adapter.InterfaceIndex) or configs_by_mac.get(adapter.MACAddress.upper())
                 ipv4 = ""
                 ipv6 = ""
-                for cfg in config:
-                    if cfg.MACAddress == adapter.MACAddress:
-                        if cfg.IPAddress:
-                            for ip in cfg.IPAddress:
-                                if ":" not in ip:
-                                    ipv4 = ip
-                                else:
-                                    ipv6 = ip
-                        break
+                if cfg and cfg.IPAddress:
+                    for ip in cfg.IPAddress:
+                        if ":" not in ip:
+                            ipv4 = ip
+                        else:
+                            ipv6 = ip
                 status = adapter.NetConnectionStatus
                 if status == 2:
                     status = "Up"
@@ -399,34 +235,164 @@ def get_network_adapters():
                 continue
     return result
 
-network_adapters = get_network_adapters()
-if network_adapters:
-    print("Name\t\t\tStatus\tIPv4\t\t\tIPv6\t\t\tMAC\t\t\tVendor")
-    print("-" * 80)
-    seen_names = set()
-    for adapter in network_adapters:
-        name = adapter["name"]
-        if name in seen_names:
-            continue  # Skip duplicates
-        seen_names.add(name)
-        print(f"{name[:20]:<20}\t{adapter['status']:<10}\t{adapter['ipv4']:<15}\t{adapter['ipv6'][:20]:<20}\t{adapter['mac']:<17}\t{adapter['vendor']}")
-        system_info["network_interfaces"].append({
-            "name": name,
-            "status": adapter["status"],
-            "ipv4": adapter["ipv4"],
-            "ipv6": adapter["ipv6"],
-            "mac": adapter["mac"],
-            "vendor": adapter["vendor"]
+# === Section collectors ===
+# Each fills its result in place and runs on its own thread (see section_runner),
+# so fields gathered before a timeout are kept.
+
+def collect_local_identity(info):
+    """Hostname, user and OS version, read without WMI; also refreshes a cached asset section."""
+    info["hostname"] = socket.gethostname()
+    username = os.environ.get("USERNAME", "Unknown")
+    userdomain = os.environ.get("USERDOMAIN", "Unknown")
+    info["last_user"] = f"{userdomain}\\{username}"
+    os_info = platform.uname()
+    info["os"] = f"{os_info.system} {os_info.release}"
+    info["version"] = os_info.version
+    info["build"] = platform.win32_ver()[2]
+
+def collect_asset_information(info):
+    """Hostname, OS and hardware identity."""
+    collect_local_identity(info)
+    info["asset_type"] = get_asset_type()
+    info["domain"] = get_domain_or_workgroup()
+
+    cs = get_wmi_object(class_name="Win32_ComputerSystem")
+    info["manufacturer"] = cs[0].Manufacturer if cs else "Unknown"
+    info["model"] = cs[0].Model if cs else "Unknown"
+
+    bios = get_wmi_object(class_name="Win32_BIOS")
+    info["serial_number"] = bios[0].SerialNumber if bios else "Unknown"
+
+    cpu = get_wmi_object(class_name="Win32_Processor")
+    if cpu:
+        cpu_name = cpu[0].Name
+        cores = cpu[0].NumberOfCores
+        threads = cpu[0].NumberOfLogicalProcessors
+        speed = round(cpu[0].MaxClockSpeed / 1000.0, 2)
+        info["processor"] = f"{cpu_name} ({cores} cores / {threads} threads @ {speed} GHz)"
+
+    mb = get_wmi_object(class_name="Win32_BaseBoard")
+    info["motherboard"] = f"{mb[0].Manufacturer} {mb[0].Product}" if mb else "Unknown"
+
+    gpu = get_wmi_object(class_name="Win32_VideoController")
+    info["graphics"] = [g.Name for g in gpu] if gpu else ["Unknown"]
+
+    audio = get_wmi_object(class_name="Win32_SoundDevice")
+    info["audio"] = [a.Name for a in audio] if audio else ["Unknown"]
+
+def collect_antivirus(info):
+    """Windows Defender status via PowerShell."""
+    output = powershell.run("Get-MpComputerStatus | Select-Object -ExpandProperty AntispywareEnabled")
+    av_status = "Enabled" if "True" in output else "Disabled"
+    info["antivirus"] = f"Windows Defender ({av_status})"
+
+def collect_firewall(info):
+    """Firewall profile states via PowerShell."""
+    output = powershell.run("Get-NetFirewallProfile | Select-Object Name,Enabled | Format-Table -HideTableHeaders | Out-String")
+    info["firewall"] = ", ".join([line.strip() for line in output.splitlines() if line.strip()])
+
+def collect_memory_information(memory):
+    """Installed RAM modules and their total."""
+    ram_modules = get_wmi_object(class_name="Win32_PhysicalMemory")
+    if not ram_modules:
+        memory["total_memory_gb"] = "Unknown"
+        return
+    total_mem = 0
+    for ram in ram_modules:
+        try:
+            capacity = round(int(ram.Capacity) / (1024 ** 3), 2) if ram.Capacity else 0
+            speed = ram.Speed if ram.Speed else "Unknown"
+            module = {
+                "capacity_gb": capacity,
+                "speed_mhz": speed,
+                "ram_type": get_ram_type(ram.SMBIOSMemoryType),
+                "module_type": get_module_type(ram.FormFactor),
+                "manufacturer": ram.Manufacturer if ram.Manufacturer else "Unknown",
+                "part_number": ram.PartNumber.strip() if ram.PartNumber else "Unknown"
+            }
+        except (ValueError, TypeError):
+            print("Invalid RAM module data detected. Skipping.")
+            continue
+        total_mem += capacity
+        memory["modules"].append(module)
+        memory["total_memory_gb"] = round(total_mem, 2)
+
+def collect_physical_disks(disks):
+    """Physical disks with media/bus type and the drive letters they hold."""
+    physical_disks = get_physical_disk_info()
+    drive_index = get_drive_index() if physical_disks else None
+    for index, disk in enumerate(physical_disks):
+        try:
+            disk_number = int(disk.get("DeviceId", index))
+        except (TypeError, ValueError):
+            disk_number = index
+        disks.append({
+            "model": disk.get("FriendlyName", "Unknown").strip(),
+            "media_type": disk.get("MediaType", "Unknown"),
+            "bus_type": disk.get("BusType", "Unknown"),
+            "size_gb": round(int(disk.get("Size", 0)) / (1024 ** 3), 2),
+            "drive_letters": drive_index.drive_letters(disk_number)
         })
-else:
-    print("Network interface information not available.")
-    system_info["network_interfaces"] = []
 
-# === Battery Information (only if Laptop) ===
-if asset_type == "Laptop":
-    print("\n=== Battery Information ===\n")
-    battery = psutil.sensors_battery()
-    battery_info = {
+def get_logical_drives():
+    """List local drives from the drive index, falling back to psutil without WMI data."""
+    drives = []
+    for ld in get_drive_index().local_drives():
+        total = int(ld.Size)
+        free = int(ld.FreeSpace or 0)
+        drives.append({
+            "drive_letter": ld.DeviceID[0],
+            "label": ld.VolumeName or "Drive",
+            "file_system": ld.FileSystem or "Unknown",
+            "total": total,
+            "used": total - free,
+            "free": free,
+            "percent": (total - free) / total * 100 if total else 0
+        })
+    if drives:
+        return drives
+    psutil = get_psutil()
+    for disk in psutil.disk_partitions():
+        if disk.fstype:  # Only include local drives
+            usage = psutil.disk_usage(disk.mountpoint)
+            drives.append({
+                "drive_letter": disk.mountpoint[0],
+                "label": disk.opts.split(",")[-1] if disk.opts else "Drive",
+                "file_system": disk.fstype,
+                "total": usage.total,
+                "used": usage.used,
+                "free": usage.free,
+                "percent": usage.percent
+            })
+    return drives
+
+def collect_logical_drives(drives):
+    """Usage of each local drive."""
+    for disk in get_logical_drives():
+        drives.append({
+            "drive_letter": disk["drive_letter"],
+            "label": disk["label"],
+            "file_system": disk["file_system"],
+            "total_gb": round(disk["total"] / (1024 ** 3), 2),
+            "used_gb": round(disk["used"] / (1024 ** 3), 2),
+            "free_gb": round(disk["free"] / (1024 ** 3), 2),
+            "used_percent": round(disk["percent"], 2)
+        })
+
+def collect_network_interfaces(interfaces):
+    """Connected network adapters, one entry per connection name."""
+    seen_names = set()
+    for adapter in get_network_adapters():
+        if adapter["name"] in seen_names:
+            continue  # Skip duplicates
+        seen_names.add(adapter["name"])
+        interfaces.append(adapter)
+
+def collect_battery_information(battery_info):
+    """Battery state and identity; left empty on desktops."""
+    if get_asset_type() != "Laptop":
+        return
+    battery_info.update({
         "model": "Unknown",
         "manufacturer": "Unknown",
         "designed_capacity_wh": "Unknown",
@@ -434,17 +400,13 @@ if asset_type == "Laptop":
         "battery_wear_percent": "Unknown",
         "current_state": "Unknown",
         "eta_to_full_empty": "Unknown"
-    }
+    })
+    psutil = get_psutil()
+    battery = psutil.sensors_battery()
     if battery:
-        percent = battery.percent
         battery_info["current_state"] = "Charging" if battery.power_plugged else "Discharging"
         battery_info["eta_to_full_empty"] = "Calculating..." if battery.secsleft == psutil.POWER_TIME_UNLIMITED else f"{battery.secsleft // 60} minutes"
-        battery_info["percent"] = percent
-        print(f"Current State:\t\t{battery_info['current_state']}")
-        print(f"Percent:\t\t{percent}%")
-        print(f"ETA to Full/Empty:\t{battery_info['eta_to_full_empty']}")
-    else:
-        print("Basic battery information not available via psutil.")
+        battery_info["percent"] = battery.percent
 
     try:
         # Try BatteryStaticData (root\wmi)
@@ -460,118 +422,360 @@ if asset_type == "Laptop":
                 battery_info["model"] = wmi_battery[0].Name if wmi_battery[0].Name else "Unknown"
                 battery_info["manufacturer"] = wmi_battery[0].Manufacturer if wmi_battery[0].Manufacturer else "Unknown"
                 battery_info["designed_capacity_wh"] = "Unknown"  # Win32_Battery doesn't provide capacity
-        if battery_info["model"] != "Unknown" or battery_info["manufacturer"] != "Unknown":
-            print(f"Battery Model:\t\t{battery_info['model']}")
-            print(f"Manufacturer:\t\t{battery_info['manufacturer']}")
-            print(f"Designed Capacity:\t{battery_info['designed_capacity_wh']} Wh")
-            print(f"Current Capacity:\t{battery_info['current_capacity_wh']} Wh")
-            print(f"Battery Wear:\t\t{battery_info['battery_wear_percent']} %")
-        else:
-            print("Detailed battery information not available via WMI.")
     except Exception as e:
         print(f"Detailed battery information not available via WMI: {str(e)}")
-    system_info["battery_information"] = battery_info
-else:
-    system_info["battery_information"] = {}
-
-# === Monitor Information ===
-print("\n=== Monitor Information ===\n")
 
-try:
+def collect_monitor_information(monitors):
+    """Monitor identity from WMI, with resolutions from screeninfo."""
     monitor_ids = get_wmi_object(namespace="root\\wmi", class_name="WmiMonitorID")
-except:
-    monitor_ids = []
-    print("WMI query for monitor information failed.")
-
-try:
-    screens = screeninfo.get_monitors()
-except:
-    screens = []
-    print("Screen information not available via screeninfo.")
-
-if monitor_ids and screens:
-    monitor_count = len(monitor_ids)
-    screen_count = len(screens)
-    if monitor_count > 1 and monitor_count != screen_count:
-        print(f"Warning: Number of monitors detected via WMI ({monitor_count}) does not match number of screens ({screen_count}). Resolution assignments may be inaccurate.")
-
-    for index, monitor in enumerate(monitor_ids):
-        manufacturer_code = "".join(chr(c) for c in monitor.ManufacturerName if c != 0)
-        manufacturer = get_full_manufacturer_name(manufacturer_code)
-        product_code = "".join(chr(c) for c in monitor.ProductCodeID if c != 0) if monitor.ProductCodeID else "Unknown"
-        serial_number = "".join(chr(c) for c in monitor.SerialNumberID if c != 0) if monitor.SerialNumberID else "Unknown"
-        friendly_name = "".join(chr(c) for c in monitor.UserFriendlyName if c != 0) if monitor.UserFriendlyName and monitor.UserFriendlyNameLength > 0 else "Unknown"
-        year = monitor.YearOfManufacture if monitor.YearOfManufacture else "Unknown"
-
-        diagonal_inch = "Unknown"
-        try:
-            display_params = get_wmi_object(namespace="root\\wmi", class_name="WmiMonitorBasicDisplayParams")
-            for param in display_params:
-                if param.InstanceName == monitor.InstanceName:
-                    width_cm = param.MaxHorizontalImageSize
-                    height_cm = param.MaxVerticalImageSize
-                    if width_cm and height_cm:
-                        width_inch = round(width_cm / 2.54, 2)
-                        height_inch = round(height_cm / 2.54, 2)
-                        diagonal_inch = round(math.sqrt(width_inch ** 2 + height_inch ** 2), 2)
-                    break
-        except:
-            pass
-
-        native_res = "Unknown"
-        if index < len(screens):
-            screen = screens[index]
-            native_res = f"{screen.width} x {screen.height}"
-
-        monitor_info = {
-            "friendly_name": friendly_name,
-            "manufacturer": manufacturer,
-            "product_code": product_code,
-            "serial_number": serial_number,
-            "screen_size_inch": diagonal_inch,
-            "native_resolution": native_res,
-            "year_of_manufacture": year
-        }
-        system_info["monitor_information"].append(monitor_info)
 
-        print("=" * 49)
-        print(f"Monitor: {friendly_name}")
-        print(f"Manufacturer: {manufacturer}")
-        print(f"Product Code: {product_code}")
-        print(f"Serial Number: {serial_number}")
-        print(f"Screen Size: {diagonal_inch} inches")
-        print(f"Native Resolution: {native_res}")
-        print(f"Year of Manufacture: {year}")
-        print("=" * 49)
+    try:
+        screens = get_screeninfo().get_monitors()
+    except:
+        screens = []
+        print("Screen information not available via screeninfo.")
+
+    if monitor_ids and screens:
+        monitor_count = len(monitor_ids)
+        screen_count = len(screens)
+        if monitor_count > 1 and monitor_count != screen_count:
+            print(f"Warning: Number of monitors detected via WMI ({monitor_count}) does not match number of screens ({screen_count}). Resolution assignments may be inaccurate.")
+
+        # Display parameters for all monitors, by InstanceName
+        display_params = {param.InstanceName: param
+                          for param in get_wmi_object(namespace="root\\wmi", class_name="WmiMonitorBasicDisplayParams")}
+
+        for index, monitor in enumerate(monitor_ids):
+            manufacturer_code = "".join(chr(c) for c in monitor.ManufacturerName if c != 0)
+            manufacturer = get_full_manufacturer_name(manufacturer_code)
+            product_code = "".join(chr(c) for c in monitor.ProductCodeID if c != 0) if monitor.ProductCodeID else "Unknown"
+            serial_number = "".join(chr(c) for c in monitor.SerialNumberID if c != 0) if monitor.SerialNumberID else "Unknown"
+            friendly_name = "".join(chr(c) for c in monitor.UserFriendlyName if c != 0) if monitor.UserFriendlyName and monitor.UserFriendlyNameLength > 0 else "Unknown"
+            year = monitor.YearOfManufacture if monitor.YearOfManufacture else "Unknown"
+
+            diagonal_inch = "Unknown"
+            param = display_params.get(monitor.InstanceName)
+            if param:
+                width_cm = param.MaxHorizontalImageSize
+                height_cm = param.MaxVerticalImageSize
+                if width_cm and height_cm:
+                    width_inch = round(width_cm / 2.54, 2)
+                    height_inch = round(height_cm / 2.54, 2)
+                    diagonal_inch = round(math.sqrt(width_inch ** 2 + height_inch ** 2), 2)
+
+            native_res = "Unknown"
+            if index < len(screens):
+                screen = screens[index]
+                native_res = f"{screen.width} x {screen.height}"
+
+            monitors.append({
+                "friendly_name": friendly_name,
+                "manufacturer": manufacturer,
+                "product_code": product_code,
+                "serial_number": serial_number,
+                "screen_size_inch": diagonal_inch,
+                "native_resolution": native_res,
+                "year_of_manufacture": year
+            })
+
+    elif screens:
+        print("No monitor information available via WMI. Using fallback method for screen detection.")
+        for screen in screens:
+            monitors.append({
+                "friendly_name": "Unknown",
+                "manufacturer": "Unknown",
+                "product_code": "Unknown",
+                "serial_number": "Unknown",
+                "screen_size_inch": "Unknown",
+                "native_resolution": f"{screen.width} x {screen.height}",
+                "year_of_manufacture": "Unknown"
+            })
+
+# Unknown values stand in for anything a section could not collect in time
+ASSET_FALLBACK = {
+    "hostname": "Unknown",
+    "asset_type": "Unknown",
+    "last_user": "Unknown",
+    "os": "Unknown",
+    "version": "Unknown",
+    "build": "Unknown",
+    "domain": "Unknown",
+    "manufacturer": "Unknown",
+    "model": "Unknown",
+    "serial_number": "Unknown",
+    "processor": "Unknown",
+    "motherboard": "Unknown",
+    "graphics": ["Unknown"],
+    "audio": ["Unknown"]
+}
+
+# Antivirus and firewall are separate sections so their PowerShell calls run alongside the rest
+SECTIONS = [
+    Section("asset_information", collect_asset_information, ASSET_FALLBACK, timeout=30,
+            static=True, refresh=collect_local_identity),
+    Section("antivirus", collect_antivirus, {"antivirus": "Unknown"}, timeout=30),
+    Section("firewall", collect_firewall, {"firewall": "Unknown"}, timeout=30),
+    Section("memory_information", collect_memory_information, {"modules": [], "total_memory_gb": 0}, timeout=30,
+            static=True),
+    Section("physical_disks", collect_physical_disks, [], timeout=45, static=True),
+    Section("logical_drives", collect_logical_drives, [], timeout=30),
+    Section("network_interfaces", collect_network_interfaces, [], timeout=30),
+    Section("battery_information", collect_battery_information, {}, timeout=30),
+    Section("monitor_information", collect_monitor_information, [], timeout=30, static=True),
+]
+
+# Static sections are reused from here until the BIOS serial or boot time changes
+DEFAULT_CACHE_PATH = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "WIS", "section_cache.json")
+
+# Short names accepted by --sections, and named groups of sections
+SECTION_ALIASES = {
+    "asset": "asset_information",
+    "memory": "memory_information",
+    "disks": "physical_disks",
+    "drives": "logical_drives",
+    "network": "network_interfaces",
+    "battery": "battery_information",
+    "monitors": "monitor_information",
+}
+SECTION_GROUPS = {
+    "all": [section.name for section in SECTIONS],
+    # Cheap, frequently changing state; skips the hardware inventory probes
+    "volatile": ["logical_drives", "network_interfaces", "battery_information"],
+}
 
-elif screens:
-    print("No monitor information available via WMI. Using fallback method for screen detection.")
-    for screen in screens:
-        native_res = f"{screen.width} x {screen.height}"
-        monitor_info = {
-            "friendly_name": "Unknown",
-            "manufacturer": "Unknown",
-            "product_code": "Unknown",
-            "serial_number": "Unknown",
-            "screen_size_inch": "Unknown",
-            "native_resolution": native_res,
-            "year_of_manufacture": "Unknown"
-        }
-        system_info["monitor_information"].append(monitor_info)
+# Sections whose fields are reported inside another section
+MERGED_SECTIONS = {"antivirus": "asset_information", "firewall": "asset_information"}
+
+def select_sections(names):
+    """Sections for a comma-separated list of names, aliases and groups, in SECTIONS order."""
+    wanted = set()
+    for name in (part.strip().lower() for part in names.split(",")):
+        if not name:
+            continue
+        if name in SECTION_GROUPS:
+            wanted.update(SECTION_GROUPS[name])
+            continue
+        name = SECTION_ALIASES.get(name, name)
+        if name not in SECTION_GROUPS["all"]:
+            raise ValueError(f"unknown section: {name}")
+        wanted.add(name)
+    if not wanted:
+        raise ValueError("no sections selected")
+    return [section for section in SECTIONS if section.name in wanted]
+
+# === Console report ===
+
+def print_asset_information(info):
+    print("\n=== Asset Information ===\n")
+    print(f"Hostname:\t{info['hostname']}")
+    print(f"Asset type:\t{info['asset_type']}")
+    print(f"Last user:\t{info['last_user']}")
+    print(f"OS:\t\t{info['os']}")
+    print(f"Version:\t{info['version']}")
+    print(f"Build:\t\t{info['build']}")
+    print(f"Domain:\t\t{info['domain']}")
+    print(f"Manufacturer:\t{info['manufacturer']}")
+    print(f"Model:\t\t{info['model']}")
+    print(f"Serial Number:\t{info['serial_number']}")
+    print(f"Processor:\t{info['processor']}")
+    print(f"Motherboard:\t{info['motherboard']}")
+    print(f"Graphics:\t{', '.join(info['graphics'])}")
+    print(f"Audio:\t\t{', '.join(info['audio'])}")
+    print(f"Antivirus:\t{info.get('antivirus', 'Not collected')}")
+    print(f"Firewall:\t{info.get('firewall', 'Not collected')}")
+
+def print_memory_information(memory):
+    print("\n=== Memory Information ===\n")
+    if not memory["modules"]:
+        print("Memory information not available.")
+        return
+    print("Capacity (GB)\tSpeed (MHz)\tRAM Type\tModule Type\tManufacturer\tPart Number")
+    print("-" * 80)
+    for module in memory["modules"]:
+        print(f"{module['capacity_gb']:.2f}\t\t{module['speed_mhz']}\t\t{module['ram_type']}\t{module['module_type']}\t{module['manufacturer']}\t{module['part_number']}")
+    print(f"\nTotal Memory:\t{memory['total_memory_gb']} GB")
+
+def print_physical_disks(disks):
+    print("\n=== Physical Disks ===\n")
+    if not disks:
+        print("Physical disk information not available.")
+        return
+    print("Model\t\t\tMedia Type\tBus Type\tSize (GB)\tDrive Letters")
+    print("-" * 80)
+    for disk in disks:
+        print(f"{disk['model'][:20]:<20}\t{disk['media_type']:<15}\t{disk['bus_type']:<10}\t{disk['size_gb']:.2f}\t\t{disk['drive_letters']}")
+
+def print_logical_drives(drives):
+    print("\n=== Logical Drive Usage ===\n")
+    if not drives:
+        print("Logical drive information not available.")
+        return
+    print("Drive\tLabel\t\tFile System\tTotal (GB)\tUsed (GB)\tFree (GB)\tUsed (%)")
+    print("-" * 80)
+    for drive in drives:
+        print(f"{drive['drive_letter']}\t{drive['label'][:12]:<12}\t{drive['file_system']:<12}\t{drive['total_gb']:.2f}\t\t{drive['used_gb']:.2f}\t\t{drive['free_gb']:.2f}\t\t{drive['used_percent']:.2f}")
+
+def print_network_interfaces(interfaces):
+    print("\n=== Network Interfaces ===\n")
+    if not interfaces:
+        print("Network interface information not available.")
+        return
+    print("Name\t\t\tStatus\tIPv4\t\t\tIPv6\t\t\tMAC\t\t\tVendor")
+    print("-" * 80)
+    for adapter in interfaces:
+        print(f"{adapter['name'][:20]:<20}\t{adapter['status']:<10}\t{adapter['ipv4']:<15}\t{adapter['ipv6'][:20]:<20}\t{adapter['mac']:<17}\t{adapter['vendor']}")
+
+def print_battery_information(battery_info):
+    if not battery_info:
+        return
+    print("\n=== Battery Information ===\n")
+    if "percent" in battery_info:
+        print(f"Current State:\t\t{battery_info['current_state']}")
+        print(f"Percent:\t\t{battery_info['percent']}%")
+        print(f"ETA to Full/Empty:\t{battery_info['eta_to_full_empty']}")
+    else:
+        print("Basic battery information not available via psutil.")
+    if battery_info.get("model", "Unknown") != "Unknown" or battery_info.get("manufacturer", "Unknown") != "Unknown":
+        print(f"Battery Model:\t\t{battery_info['model']}")
+        print(f"Manufacturer:\t\t{battery_info['manufacturer']}")
+        print(f"Designed Capacity:\t{battery_info['designed_capacity_wh']} Wh")
+        print(f"Current Capacity:\t{battery_info['current_capacity_wh']} Wh")
+        print(f"Battery Wear:\t\t{battery_info['battery_wear_percent']} %")
+    else:
+        print("Detailed battery information not available via WMI.")
+
+def print_monitor_information(monitors):
+    print("\n=== Monitor Information ===\n")
+    if not monitors:
+        print("Unable to retrieve monitor information via WMI or screeninfo. No displays detected.")
+        return
+    for monitor in monitors:
         print("=" * 49)
-        print("Monitor: Unknown")
-        print("Manufacturer: Unknown")
-        print("Product Code: Unknown")
-        print("Serial Number: Unknown")
-        print("Screen Size: Unknown inches")
-        print(f"Native Resolution: {native_res}")
-        print("Year of Manufacture: Unknown")
+        print(f"Monitor: {monitor['friendly_name']}")
+        print(f"Manufacturer: {monitor['manufacturer']}")
+        print(f"Product Code: {monitor['product_code']}")
+        print(f"Serial Number: {monitor['serial_number']}")
+        print(f"Screen Size: {monitor['screen_size_inch']} inches")
+        print(f"Native Resolution: {monitor['native_resolution']}")
+        print(f"Year of Manufacture: {monitor['year_of_manufacture']}")
         print("=" * 49)
-else:
-    print("Unable to retrieve monitor information via WMI or screeninfo. No displays detected.")
-    system_info["monitor_information"] = []
-
-# Export to JSON
-with open("system_info.json", "w") as f:
-    json.dump(system_info, f, indent=4)
-print("\nSystem information exported to system_info.json")
\ No newline at end of file
+
+def collection_stats(results, seconds):
+    """Per-section status and timing, WMI queries and PowerShell calls for one run."""
+    return {
+        "seconds": round(seconds, 3),
+        "sections": {name: status for name, (_, status) in results.items()},
+        "wmi": wmi_session.stats(),
+        "powershell": powershell.stats()
+    }
+
+def collect_system_info(sections=SECTIONS, cache=None):
+    """Run the given sections concurrently and assemble the system_info document.
+
+    The document has a key per section that ran (antivirus and firewall
+    are reported in asset_information), plus timestamp and collection_stats.
+    With a SectionCache, static sections are taken from it while the
+    hardware fingerprint matches, and fresh results are stored back.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.perf_counter()
+    start_session()
+    fingerprint = None
+    cached = {}
+    if cache is not None and any(section.static for section in sections):
+        fingerprint = get_hardware_fingerprint()
+        for section in sections:
+            hit = cache.get(section.name, fingerprint) if section.static else None
+            if hit is not None:
+                result, age = hit
+                if section.refresh is not None:
+                    section.refresh(result)
+                cached[section.name] = (result, {"state": "cached", "seconds": 0.0, "age": round(age)})
+
+    fresh = run_sections([section for section in sections if section.name not in cached])
+    results = {}
+    for section in sections:
+        results[section.name] = cached.get(section.name) or fresh[section.name]
+        # Only complete results are worth reusing
+        if cache is not None and section.static and results[section.name][1]["state"] == "ok":
+            cache.put(section.name, fingerprint, results[section.name][0])
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Could not save the section cache to {cache.path}: {e}")
+
+    system_info = {"timestamp": timestamp}
+    for name, (result, status) in results.items():
+        if status["state"] not in ("ok", "cached"):
+            print(f"Section {name} incomplete ({status['state']}): {status['error']}")
+        key = MERGED_SECTIONS.get(name, name)
+        if key in system_info:
+            system_info[key].update(result)
+        else:
+            system_info[key] = result
+    system_info["collection_stats"] = collection_stats(results, time.perf_counter() - start)
+    return system_info
+
+# Console report for each key of the document
+PRINTERS = {
+    "asset_information": print_asset_information,
+    "memory_information": print_memory_information,
+    "physical_disks": print_physical_disks,
+    "logical_drives": print_logical_drives,
+    "network_interfaces": print_network_interfaces,
+    "battery_information": print_battery_information,
+    "monitor_information": print_monitor_information,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect this machine's inventory as JSON.")
+    parser.add_argument("--sections", default="all",
+                        help="comma-separated sections to collect: all, volatile, or any of "
+                             + ", ".join(list(SECTION_ALIASES) + ["antivirus", "firewall"]))
+    parser.add_argument("--output", default="system_info.json", help="file to write, or - for stdout")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="file keeping static sections between runs")
+    parser.add_argument("--cache-ttl", type=float, default=168,
+                        help="hours a cached static section is reused while the hardware fingerprint matches")
+    parser.add_argument("--no-cache", action="store_true", help="probe every section and leave the cache alone")
+    args = parser.parse_args(argv)
+    try:
+        sections = select_sections(args.sections)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    to_stdout = args.output == "-"
+    # Keep stdout for the document; progress and the report go to stderr
+    with contextlib.redirect_stdout(sys.stderr) if to_stdout else contextlib.nullcontext():
+        try:
+            cache = None if args.no_cache else SectionCache(args.cache, args.cache_ttl * 3600)
+            system_info = collect_system_info(sections, cache)
+        finally:
+            powershell.close()
+
+    if to_stdout:
+        json.dump(system_info, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+        return
+
+    for key, printer in PRINTERS.items():
+        if key in system_info:
+            printer(system_info[key])
+
+    # Export to JSON
+    with open(args.output, "w") as f:
+        json.dump(system_info, f, indent=4)
+    print(f"\nSystem information exported to {args.output}")
+
+    stats = system_info["collection_stats"]
+    for name, status in stats["sections"].items():
+        print(f"Section {name}: {status['state']} in {status['seconds']:.2f}s")
+    wmi_stats, powershell_stats = stats["wmi"], stats["powershell"]
+    print(f"WMI: {wmi_stats['queries']} queries, {wmi_stats['cache_hits']} cache hits, {wmi_stats['seconds']:.2f}s")
+    print(f"PowerShell: {powershell_stats['calls']} calls, {powershell_stats['failures']} failed, "
+          f"{powershell_stats['timeouts']} timed out, {powershell_stats['seconds']:.2f}s")
+    print(f"Collected in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import re
+import threading
+from array import array
+
+# Searched in order; the first file that exists is loaded. The IEEE registry
+# can be fetched from https://standards-oui.ieee.org/oui/oui.txt
+OUI_PATHS = [
+    os.environ.get("WIS_OUI_DB", ""),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "oui.txt"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "manuf"),
+    "/usr/share/ieee-data/oui.txt",
+    "/usr/share/hwdata/oui.txt",
+    "/usr/share/wireshark/manuf",
+]
+
+# IEEE oui.txt: "00-00-0C   (hex)\t\tCisco Systems, Inc"
+IEEE_LINE_REGEX = re.compile(r'^\s*([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})\s+\(hex\)\s+(.+?)\s*$')
+# Wireshark manuf: "00:00:0C\tCisco\tCisco Systems, Inc" (longer /28 and /36 ranges are skipped)
+MANUF_LINE_REGEX = re.compile(r'^([0-9A-Fa-f]{2})[:-]([0-9A-Fa-f]{2})[:-]([0-9A-Fa-f]{2})\t([^\t#]+)(?:\t([^\t#]+))?')
+
+# Used only when no database file is installed
+FALLBACK_VENDORS = {
+    "00163E": "Intel",
+    "00F48D": "Realtek",
+    "025041": "Microsoft",
+}
+
+UNKNOWN_VENDOR = "Unknown Vendor"
+
+
+def mac_prefix(mac):
+    """Return the 24-bit OUI of a MAC address as an int, or None if it is malformed."""
+    digits = re.sub(r'[^0-9A-Fa-f]', '', mac or '')
+    if len(digits) < 6:
+        return None
+    return int(digits[:6], 16)
+
+
+def parse_oui_file(path):
+    """Yield (prefix, vendor) from an IEEE oui.txt or Wireshark manuf file."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = IEEE_LINE_REGEX.match(line)
+            if match:
+                yield int("".join(match.group(1, 2, 3)), 16), match.group(4)
+                continue
+            match = MANUF_LINE_REGEX.match(line)
+            if match and "/" not in line.split("\t", 1)[0]:
+                yield int("".join(match.group(1, 2, 3)), 16), (match.group(5) or match.group(4)).strip()
+
+
+class OuiIndex:
+    """Open-addressing hash table from 24-bit OUI prefixes to vendor names.
+
+    Keys and vendor ids live in two flat arrays sized to a power of two at
+    least twice the entry count, so a lookup is a hash and a probe or two,
+    and the ~37k IEEE entries take under 1 MB instead of the several MB of a
+    dict of boxed ints. Vendor names are stored once each.
+    """
+
+    def __init__(self, entries):
+        vendors = []
+        vendor_ids = {}
+        pairs = []
+        for prefix, vendor in entries:
+            vendor_id = vendor_ids.get(vendor)
+            if vendor_id is None:
+                vendor_id = vendor_ids[vendor] = len(vendors)
+                vendors.append(vendor)
+            pairs.append((prefix, vendor_id))
+        bits = 4
+        while (1 << bits) < 2 * len(pairs):
+            bits += 1
+        size = 1 << bits
+        self._mask = size - 1
+        self._shift = 32 - bits
+        # Slot keys are prefix + 1 so that 0 can mark an empty slot
+        self._keys = array("I", bytes(4 * size))
+        value_type = "H" if len(vendors) <= 0xFFFF else "I"
+        self._values = array(value_type, bytes(array(value_type).itemsize * size))
+        self._vendors = vendors
+        self.size = 0
+        for prefix, vendor_id in pairs:
+            slot = self._slot(prefix)
+            if not self._keys[slot]:
+                self._keys[slot] = prefix + 1
+                self.size += 1
+            self._values[slot] = vendor_id
+
+    def _slot(self, prefix):
+        key = prefix + 1
+        # Fibonacci hashing: the top bits of a 32-bit multiplicative hash
+        slot = ((prefix * 2654435761) & 0xFFFFFFFF) >> self._shift
+        while self._keys[slot] and self._keys[slot] != key:
+            slot = (slot + 1) & self._mask
+        return slot
+
+    def get(self, prefix, default=None):
+        slot = self._slot(prefix)
+        if not self._keys[slot]:
+            return default
+        return self._vendors[self._values[slot]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_index(paths=None):
+    """Load the first available OUI database into an OuiIndex, or FALLBACK_VENDORS if none is found."""
+    for path in paths or OUI_PATHS:
+        if path and os.path.isfile(path):
+            return OuiIndex(parse_oui_file(path))
+    return OuiIndex((int(prefix, 16), vendor) for prefix, vendor in FALLBACK_VENDORS.items())
+
+
+def vendor_for_mac(mac):
+    """Look up the vendor of a MAC address, loading the database on first use."""
+    global _index
+    prefix = mac_prefix(mac)
+    if prefix is None:
+        return UNKNOWN_VENDOR
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index()
+    vendor = _index.get(prefix)
+    if vendor is None and prefix & 0x020000:
+        # Locally administered addresses (VPN, Hyper-V, Docker) have no registered vendor
+        return "Locally Administered"
+    return vendor or UNKNOWN_VENDOR
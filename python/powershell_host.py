@@ -0,0 +1,268 @@
+import base64
+import itertools
+import json
+import subprocess
+import threading
+import time
+
+# Marks protocol lines, so anything else a command writes to stdout is skipped
+FRAME_MARKER = "\x1eWIS "
+
+# Reads one JSON request per line from stdin and answers each with one marked
+# JSON line carrying the command's output as text.
+HOST_SCRIPT = r'''
+$ProgressPreference = 'SilentlyContinue'
+[Console]::OutputEncoding = [Text.Encoding]::UTF8
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    $request = $line | ConvertFrom-Json
+    $response = @{ id = $request.id }
+    try {
+        $response.output = (Invoke-Expression $request.script | Out-String -Width 4096)
+        $response.ok = $true
+    } catch {
+        $response.ok = $false
+        $response.error = $_.Exception.Message
+    }
+    [Console]::Out.WriteLine("$([char]0x1e)WIS " + ($response | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+}
+'''
+
+
+class PowerShellError(Exception):
+    """A command failed, or the host exited while running it."""
+
+
+class PowerShellTimeout(PowerShellError):
+    """A command did not answer in time; the host was stopped and will be restarted."""
+
+
+def host_argv(executable="powershell"):
+    """Command line that starts a PowerShell host running HOST_SCRIPT."""
+    encoded = base64.b64encode(HOST_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return [executable, "-NoLogo", "-NoProfile", "-NonInteractive",
+            "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded]
+
+
+class PowerShellHost:
+    """One long-lived PowerShell process that runs commands sent over stdin.
+
+    Requests and responses are single-line JSON frames, so the startup cost
+    of powershell.exe is paid once rather than per command. The host is
+    started on first use and restarted on the next call after it crashes or
+    a command times out. argv can point at any interpreter that speaks the
+    same protocol, e.g. pwsh or a stub script when testing off Windows.
+    """
+
+    def __init__(self, argv=None, timeout=30.0):
+        self.argv = argv or host_argv()
+        self.timeout = timeout
+        self.starts = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.seconds = 0.0
+        self._process = None
+        self._responses = {}
+        self._exited = False                   # the current process's stdout has closed
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()          # one command at a time
+        self._cond = threading.Condition()
+
+    def _start(self):
+        try:
+            process = subprocess.Popen(
+                self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding="utf-8", errors="replace", bufsize=1)
+        except OSError as e:
+            raise PowerShellError(f"Could not start PowerShell: {e}") from None
+        with self._cond:
+            # A reader left over from the previous process only reports on its own process
+            self._process = process
+            self._responses = {}
+            self._exited = False
+        self.starts += 1
+        threading.Thread(target=self._read, args=(process,), name="powershell-reader", daemon=True).start()
+
+    def _read(self, process):
+        for line in process.stdout:
+            if not line.startswith(FRAME_MARKER):
+                continue
+            try:
+                response = json.loads(line[len(FRAME_MARKER):])
+            except ValueError:
+                continue
+            with self._cond:
+                if process is self._process:
+                    self._responses[response.get("id")] = response
+                    self._cond.notify_all()
+        with self._cond:
+            if process is self._process:
+                self._exited = True
+                self._cond.notify_all()
+
+    def _stop(self):
+        with self._cond:
+            process, self._process = self._process, None
+            self._exited = False
+        if process is None:
+            return
+        try:
+            process.kill()
+        except OSError:
+            pass
+        # Every process the host starts is reaped here, on restart or close
+        process.wait()
+
+    def run(self, script, timeout=None):
+        """Run a PowerShell command and return its output as text."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                return self._run(script, timeout)
+            except PowerShellTimeout:
+                self.timeouts += 1
+                raise
+            except PowerShellError:
+                self.failures += 1
+                raise
+            finally:
+                self.calls += 1
+                self.seconds += time.perf_counter() - start
+
+    def _run(self, script, timeout):
+        # Caller holds self._lock
+        if self._process is None or self._process.poll() is not None or self._exited:
+            self._stop()
+            self._start()
+        process = self._process
+        request_id = next(self._ids)
+        try:
+            process.stdin.write(json.dumps({"id": request_id, "script": script}) + "\n")
+            process.stdin.flush()
+        except OSError as e:
+            self._stop()
+            raise PowerShellError(f"PowerShell host is not accepting commands: {e}") from None
+
+        with self._cond:
+            answered = self._cond.wait_for(lambda: request_id in self._responses or self._exited, timeout)
+            response = self._responses.pop(request_id, None)
+        if response is None:
+            self._stop()
+            if not answered:
+                raise PowerShellTimeout(f"PowerShell command timed out after {timeout}s")
+            raise PowerShellError("PowerShell host exited while running the command")
+        if not response.get("ok"):
+            raise PowerShellError(response.get("error") or "PowerShell command failed")
+        return response.get("output") or ""
+
+    def run_json(self, script, timeout=None):
+        """Run a command whose output is JSON (e.g. ends in ConvertTo-Json) and parse it."""
+        output = self.run(script, timeout).strip()
+        return json.loads(output) if output else None
+
+    def stats(self):
+        """Return command count, failures, timeouts, host starts and total command time."""
+        return {"calls": self.calls, "failures": self.failures, "timeouts": self.timeouts,
+                "starts": self.starts, "seconds": round(self.seconds, 4)}
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+                self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PowerShellPool:
+    """Up to size hosts, started on demand, so concurrent callers are not serialized."""
+
+    def __init__(self, size=2, argv=None, timeout=30.0):
+        self.argv = argv
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._hosts = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            host = PowerShellHost(self.argv, self.timeout)
+            self._hosts.append(host)
+            return host
+
+    def _release(self, host):
+        with self._lock:
+            self._idle.append(host)
+        self._slots.release()
+
+    def run(self, script, timeout=None):
+        host = self._acquire()
+        try:
+            return host.run(script, timeout)
+        finally:
+            self._release(host)
+
+    def run_json(self, script, timeout=None):
+        host = self._acquire()
+        try:
+            return host.run_json(script, timeout)
+        finally:
+            self._release(host)
+
+    def stats(self):
+        """Totals of stats() over every host the pool has started."""
+        with self._lock:
+            hosts = list(self._hosts)
+        totals = {"hosts": len(hosts), "calls": 0, "failures": 0, "timeouts": 0, "starts": 0, "seconds": 0.0}
+        for host in hosts:
+            for key, value in host.stats().items():
+                totals[key] += value
+        totals["seconds"] = round(totals["seconds"], 4)
+        return totals
+
+    def close(self):
+        with self._lock:
+            hosts, self._hosts, self._idle = self._hosts, [], []
+        for host in hosts:
+            host.close()
+
+
+class FakePowerShell:
+    """In-memory stand-in for PowerShellHost/PowerShellPool, answering from {command prefix: output text}."""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.calls = []
+        self.failures = 0
+
+    def run(self, script, timeout=None):
+        self.calls.append(script)
+        for prefix, output in self.outputs.items():
+            if script.startswith(prefix):
+                return output
+        self.failures += 1
+        raise PowerShellError(f"No fake output for: {script}")
+
+    def run_json(self, script, timeout=None):
+        output = self.run(script, timeout).strip()
+        return json.loads(output) if output else None
+
+    def stats(self):
+        return {"calls": len(self.calls), "failures": self.failures, "timeouts": 0, "starts": 0, "seconds": 0.0}
+
+    def close(self):
+        pass
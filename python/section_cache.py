@@ -0,0 +1,74 @@
+import copy
+import hashlib
+import json
+import os
+import time
+
+CACHE_FORMAT = 1
+
+
+def hardware_fingerprint(bios_serial, boot_time):
+    """Hash of the BIOS serial and last boot time; None when the serial is unknown.
+
+    Hardware is rarely swapped without a reboot, so a new boot time (or a
+    different machine image) is the cue to probe the static sections again.
+    """
+    if not bios_serial or str(bios_serial).strip() in ("", "Unknown"):
+        return None
+    return hashlib.sha256(f"{str(bios_serial).strip()}|{boot_time}".encode("utf-8")).hexdigest()
+
+
+class SectionCache:
+    """Results of static sections kept in a local JSON file between collector runs.
+
+    A cached result is used while the hardware fingerprint it was stored
+    under still matches and it is younger than ttl seconds. The file is
+    rewritten atomically, so an interrupted run leaves the previous cache;
+    an unreadable file is treated as empty.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                valid = isinstance(data, dict) and data.get("format") == CACHE_FORMAT
+                self._entries = data.get("sections", {}) if valid else {}
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, name, fingerprint):
+        """Return (result, age in seconds) for a fresh entry, or None."""
+        if fingerprint is None:
+            return None
+        entry = self._load().get(name)
+        if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+            return None
+        age = time.time() - entry.get("saved", 0)
+        if not 0 <= age < self.ttl:
+            return None
+        return copy.deepcopy(entry.get("result")), age
+
+    def put(self, name, fingerprint, result):
+        if fingerprint is None:
+            return
+        self._load()[name] = {"fingerprint": fingerprint, "saved": time.time(), "result": copy.deepcopy(result)}
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": CACHE_FORMAT, "sections": self._entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
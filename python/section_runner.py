@@ -0,0 +1,80 @@
+import copy
+import threading
+import time
+
+
+class Section:
+    """One independent part of the inventory.
+
+    collect(result) fills result, a fresh copy of fallback, in place, so that
+    whatever it has gathered is still usable if it overruns its timeout.
+    Static sections describe hardware and may be served from a SectionCache;
+    refresh(result), if given, updates the few cheap fields of a cached
+    result that can change without the hardware changing.
+    """
+
+    def __init__(self, name, collect, fallback, timeout=30.0, static=False, refresh=None):
+        self.name = name
+        self.collect = collect
+        self.fallback = fallback
+        self.timeout = timeout
+        self.static = static
+        self.refresh = refresh
+
+
+def _snapshot(value):
+    # The collector thread may still be writing; retry a copy that raced with it
+    for _ in range(10):
+        try:
+            return copy.deepcopy(value)
+        except RuntimeError:
+            time.sleep(0.01)
+    return value
+
+
+def run_sections(sections):
+    """Run sections concurrently and return {name: (result, status)}.
+
+    Each section runs on its own daemon thread, so a hung WMI provider or
+    PowerShell call cannot block the others or the interpreter's exit. All
+    sections share one clock: each is waited for until its own timeout after
+    the start. status is a dict with "state" (ok, error or timeout), "seconds"
+    and, for failures, "error"; failed sections keep their partial result.
+    """
+    runs = {}
+    start = time.perf_counter()
+    for section in sections:
+        run = {
+            "result": copy.deepcopy(section.fallback),
+            "done": threading.Event(),
+            "error": None,
+            "seconds": None,
+        }
+
+        def target(section=section, run=run):
+            try:
+                section.collect(run["result"])
+            except Exception as e:
+                run["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                run["seconds"] = round(time.perf_counter() - start, 3)
+                run["done"].set()
+
+        runs[section.name] = run
+        threading.Thread(target=target, name=f"section-{section.name}", daemon=True).start()
+
+    results = {}
+    for section in sections:
+        run = runs[section.name]
+        remaining = section.timeout - (time.perf_counter() - start)
+        if not run["done"].wait(max(remaining, 0)):
+            status = {"state": "timeout", "seconds": section.timeout,
+                      "error": f"timed out after {section.timeout}s"}
+            results[section.name] = (_snapshot(run["result"]), status)
+            continue
+        if run["error"]:
+            status = {"state": "error", "seconds": run["seconds"], "error": run["error"]}
+        else:
+            status = {"state": "ok", "seconds": run["seconds"]}
+        results[section.name] = (run["result"], status)
+    return results
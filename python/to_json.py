@@ -1,26 +1,35 @@
-import subprocess
+import argparse
 import json
 import os
+import re
+import sys
+import time
 import logging
+from powershell_host import PowerShellError, PowerShellHost
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from record_delta import make_delta, record_hash
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_powershell_script(ps1_path):
-    """Execute PowerShell script and return JSON output."""
+def run_powershell_script(ps1_path, host=None):
+    """Execute PowerShell script and return JSON output.
+
+    Runs in the given long-lived PowerShellHost, or in a host of its own.
+    """
+    if host is None:
+        with PowerShellHost(timeout=300) as own_host:
+            return run_powershell_script(ps1_path, own_host)
     try:
         logger.info(f"Executing PowerShell script: {ps1_path}")
-        result = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-File", ps1_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        quoted_path = ps1_path.replace("'", "''")
+        result = host.run_json(f"& '{quoted_path}'")
         logger.info("PowerShell script executed successfully")
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error executing PowerShell script: {e.stderr}")
+        return result
+    except PowerShellError as e:
+        logger.error(f"Error executing PowerShell script: {e}")
         return None
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing JSON output: {e}")
@@ -35,10 +44,62 @@ def save_to_json(data, output_path):
     except Exception as e:
         logger.error(f"Error saving JSON file: {e}")
 
+def snapshot_filename(system_info, owner):
+    """Name a snapshot the way GetInfoJsonFile.ps1 does: SystemInfo_<Owner>_<timestamp>.json."""
+    safe_owner = re.sub(r'[<>:"/\\|?*]', '_', owner)
+    return f"SystemInfo_{safe_owner}_{re.sub('[: ]', '_', system_info['Timestamp'])}.json"
+
+def load_state(state_path):
+    """Return the locally kept copy of the last snapshot written, or None."""
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_snapshot(system_info, records_dir, state_path, owner, full_every=24):
+    """Write a full record or a delta against the last snapshot into records_dir.
+
+    A full record is written on the first run, every full_every runs, and
+    whenever the last snapshot is gone from records_dir or belonged to
+    another asset; otherwise only the changed sections are written.
+    Returns the path written.
+    """
+    system_info.setdefault("OwnerName", owner)
+    filename = snapshot_filename(system_info, owner)
+    current_hash = record_hash(system_info)
+    state = load_state(state_path)
+
+    document = system_info
+    chain = 0
+    if (state and state.get("chain", 0) + 1 < full_every
+            and os.path.exists(os.path.join(records_dir, state["filename"]))
+            and state["record"].get("AssetInformation", {}).get("SerialNumber")
+            == system_info.get("AssetInformation", {}).get("SerialNumber")):
+        document = make_delta(state["record"], state["filename"], system_info, base_hash=state["hash"])
+        chain = state["chain"] + 1
+        logger.info(f"Writing delta with {len(document['Changed'])} changed sections against {state['filename']}")
+
+    save_to_json(document, os.path.join(records_dir, filename))
+    # Kept locally so the next run can diff against it without reading the share
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"filename": filename, "hash": current_hash, "chain": chain, "record": system_info}, f)
+    os.replace(tmp_path, state_path)
+    return os.path.join(records_dir, filename)
+
 def main():
+    parser = argparse.ArgumentParser(description="Run the inventory PowerShell script and save its JSON output.")
     # Paths (updated to match error message)
-    ps1_path = r"F:\Personal\WIS\Scripts\GetSystemInfoJson.ps1"
-    output_path = r"F:\Personal\WIS\system_info.json"
+    parser.add_argument("--script", default=r"F:\Personal\WIS\Scripts\GetSystemInfoJson.ps1")
+    parser.add_argument("--output", default=r"F:\Personal\WIS\system_info.json")
+    parser.add_argument("--records-dir", help="write SystemInfo_<Owner>_<timestamp>.json snapshots here, as deltas where possible")
+    parser.add_argument("--owner", default=os.environ.get("USERNAME", "Unknown"))
+    parser.add_argument("--state", help="local copy of the last snapshot (default: next to --output)")
+    parser.add_argument("--full-every", type=int, default=24, help="write a full record at least every N runs")
+    args = parser.parse_args()
+    ps1_path = args.script
+    output_path = args.output
 
     # Verify PowerShell script exists
     if not os.path.exists(ps1_path):
@@ -46,10 +107,19 @@ def main():
         return
 
     # Run PowerShell script and get JSON output
+    start = time.perf_counter()
     system_info = run_powershell_script(ps1_path)
     if system_info:
+        # Section timings come from the script when it records them; the run time includes host startup.
+        # Deltas carry CollectionStats beside the diff (record_delta.VOLATILE_KEYS), so timings never count as a change
+        stats = system_info.setdefault("CollectionStats", {})
+        stats["RunSeconds"] = round(time.perf_counter() - start, 3)
         # Save to JSON file
-        save_to_json(system_info, output_path)
+        if args.records_dir:
+            state_path = args.state or os.path.join(os.path.dirname(os.path.abspath(output_path)), "last_snapshot.json")
+            write_snapshot(system_info, args.records_dir, state_path, args.owner, args.full_every)
+        else:
+            save_to_json(system_info, output_path)
         # Print summary to console
         print("\n=== System Information Summary ===")
         print(f"Hostname: {system_info.get('AssetInformation', {}).get('Hostname', 'Unknown')}")
@@ -59,6 +129,7 @@ def main():
         if system_info.get('BatteryInformation'):
             print(f"Battery State: {system_info.get('BatteryInformation', {}).get('CurrentState', 'Unknown')}")
         print(f"Monitors: {len(system_info.get('MonitorInformation', []))}")
+        print(f"Collected in: {stats['RunSeconds']:.2f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,113 @@
+import threading
+import time
+from types import SimpleNamespace
+
+
+def wmi_connect(namespace):
+    """Open a WMI connection with the wmi package (Windows only)."""
+    import pythoncom
+    import wmi
+    # COM must be initialised on every thread that opens a connection
+    pythoncom.CoInitialize()
+    return wmi.WMI(namespace=namespace)
+
+
+def materialize(row):
+    """Copy a WMI object's properties into a plain object.
+
+    Plain rows can be shared between threads and read without further COM
+    calls. Values are read from the underlying COM object so association
+    references stay object path strings instead of each being resolved with
+    a new connection. Rows that are not WMI objects (e.g. from a fake
+    provider) are kept as they are.
+    """
+    ole_object = getattr(row, 'ole_object', None)
+    if ole_object is None:
+        return row
+    return SimpleNamespace(**{prop.Name: prop.Value for prop in ole_object.Properties_})
+
+
+class WmiSession:
+    """WMI access for one collection run.
+
+    Keeps one connection per namespace (per thread, as COM connections are
+    apartment-bound) and memoizes every class query for the lifetime of the
+    session, so each class is fetched from its provider at most once. Every
+    provider round trip is recorded with its row count and duration.
+
+    connect(namespace) returns an object with a query(wql) method; it defaults
+    to wmi.WMI and can be replaced with a fake provider for testing.
+    """
+
+    def __init__(self, connect=wmi_connect):
+        self._connect = connect
+        self._local = threading.local()
+        self._results = {}      # (namespace, class_name) -> [rows]
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.queries = []       # one entry per provider round trip
+        self.hits = 0
+
+    def connection(self, namespace):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        if namespace not in connections:
+            connections[namespace] = self._connect(namespace)
+        return connections[namespace]
+
+    def query(self, class_name, namespace="root\\cimv2"):
+        """Return all instances of class_name, querying the provider only once."""
+        key = (namespace.lower(), class_name.lower())
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Concurrent callers for the same class wait for the one query
+        with key_lock:
+            with self._lock:
+                if key in self._results:
+                    self.hits += 1
+                    return self._results[key]
+            start = time.perf_counter()
+            try:
+                rows = [materialize(row) for row in self.connection(namespace).query(f"SELECT * FROM {class_name}")]
+                error = None
+            except Exception as e:
+                print(f"WMI query failed for {class_name} in {namespace}: {str(e)}")
+                rows, error = [], str(e)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._results[key] = rows
+                self.queries.append({
+                    "namespace": namespace,
+                    "class_name": class_name,
+                    "rows": len(rows),
+                    "seconds": round(elapsed, 4),
+                    "error": error,
+                })
+            return rows
+
+    def stats(self):
+        """Return query count, cache hits and total provider time."""
+        with self._lock:
+            return {
+                "queries": len(self.queries),
+                "cache_hits": self.hits,
+                "seconds": round(sum(q["seconds"] for q in self.queries), 4),
+                "by_class": list(self.queries),
+            }
+
+
+class FakeWmiConnection:
+    """In-memory stand-in for a WMI namespace, built from {class_name: [dict, ...]}."""
+
+    def __init__(self, classes):
+        self.classes = {name.lower(): rows for name, rows in classes.items()}
+        self.calls = []
+
+    def query(self, wql):
+        class_name = wql.rsplit(" ", 1)[-1]
+        self.calls.append(class_name)
+        return [SimpleNamespace(**row) for row in self.classes.get(class_name.lower(), [])]
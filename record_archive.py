@@ -0,0 +1,461 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from record_index import METRIC_COLUMNS, load_record, parse_filename, read_summary, record_metrics
+
+MAGIC = b'WISARC1\0'
+FOOTER = struct.Struct('<Q')
+
+# Every Nth snapshot of an asset is stored in full so reads never replay long delta chains
+KEYFRAME_INTERVAL = 32
+
+FULL, DELTA = 0, 1
+_MISSING = object()
+
+# Value tags of the document encoding
+T_NULL, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_DICT = range(8)
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def id(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+
+def _encode(value, strings, out):
+    """Append a tagged binary encoding of a JSON value; strings become dictionary ids."""
+    if value is None:
+        out.append(T_NULL)
+    elif value is True:
+        out.append(T_TRUE)
+    elif value is False:
+        out.append(T_FALSE)
+    elif isinstance(value, int):
+        out.append(T_INT)
+        # Zigzag without a width limit, so any JSON integer round-trips
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(T_FLOAT)
+        out += struct.pack('<d', value)
+    elif isinstance(value, str):
+        out.append(T_STR)
+        _write_varint(out, strings.id(value))
+    elif isinstance(value, list):
+        out.append(T_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(item, strings, out)
+    elif isinstance(value, dict):
+        out.append(T_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _write_varint(out, strings.id(key))
+            _encode(item, strings, out)
+    else:
+        raise TypeError(f"cannot archive value of type {type(value).__name__}")
+
+
+def _decode(buf, pos, string):
+    tag = buf[pos]
+    pos += 1
+    if tag == T_NULL:
+        return None, pos
+    if tag == T_TRUE:
+        return True, pos
+    if tag == T_FALSE:
+        return False, pos
+    if tag == T_INT:
+        n, pos = _read_varint(buf, pos)
+        return (n >> 1 if not n & 1 else -((n + 1) >> 1)), pos
+    if tag == T_FLOAT:
+        return struct.unpack_from('<d', buf, pos)[0], pos + 8
+    if tag == T_STR:
+        string_id, pos = _read_varint(buf, pos)
+        return string(string_id), pos
+    if tag == T_LIST:
+        count, pos = _read_varint(buf, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode(buf, pos, string)
+            items.append(item)
+        return items, pos
+    if tag == T_DICT:
+        count, pos = _read_varint(buf, pos)
+        items = {}
+        for _ in range(count):
+            key_id, pos = _read_varint(buf, pos)
+            items[string(key_id)], pos = _decode(buf, pos, string)
+        return items, pos
+    raise ValueError(f"corrupt archive: unknown tag {tag} at {pos - 1}")
+
+
+def _native(arr):
+    """Columns are little-endian on disk."""
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+
+def _asset_key(summary):
+    """Assets without a serial fall back to their filename owner, then the file itself."""
+    return str(summary['SerialNumber'] or summary['FileOwner'] or summary['filename'])
+
+
+def pack(records_dir, archive_path, keyframe_interval=KEYFRAME_INTERVAL):
+    """Pack every record in records_dir into a columnar archive; return the snapshot count.
+
+    Snapshots are grouped per asset and ordered by time. Each one is stored
+    as the top-level sections that differ from the asset's previous snapshot,
+    with a full copy every keyframe_interval snapshots. Only one asset's
+    previous record is held in memory at a time.
+    """
+    summaries = []
+    with os.scandir(records_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.json') and entry.is_file():
+                summary = read_summary(entry.path)
+                if summary is not None:
+                    summaries.append((entry.path, summary))
+    summaries.sort(key=lambda item: (_asset_key(item[1]), item[1]['Timestamp']))
+
+    strings = _StringTable()
+    columns = {
+        'asset': array('I'), 'timestamp': array('I'), 'filename': array('I'),
+        'base': array('i'), 'doc_offset': array('Q'), 'doc_length': array('I'),
+    }
+    metrics = {name: array('d') for name in METRIC_COLUMNS}
+
+    tmp_path = archive_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+        previous_asset = previous = None
+        run = 0
+        for path, summary in summaries:
+            try:
+                record = load_record(path)
+            except (OSError, ValueError) as e:
+                print(f"Error reading {path}: {str(e)}")
+                continue
+            asset = _asset_key(summary)
+            doc = bytearray()
+            if asset != previous_asset or run % keyframe_interval == 0:
+                if asset != previous_asset:
+                    run = 0
+                doc.append(FULL)
+                _encode(record, strings, doc)
+                columns['base'].append(-1)
+            else:
+                changed = {key: value for key, value in record.items() if previous.get(key, _MISSING) != value}
+                removed = [key for key in previous if key not in record]
+                doc.append(DELTA)
+                _encode(changed, strings, doc)
+                _encode(removed, strings, doc)
+                columns['base'].append(len(columns['asset']) - 1)
+            run += 1
+            previous_asset, previous = asset, record
+
+            columns['asset'].append(strings.id(asset))
+            columns['timestamp'].append(strings.id(record['Timestamp']))
+            columns['filename'].append(strings.id(summary['filename']))
+            columns['doc_offset'].append(offset)
+            columns['doc_length'].append(len(doc))
+            for name, value in zip(METRIC_COLUMNS, record_metrics(record)):
+                metrics[name].append(value)
+            f.write(doc)
+            offset += len(doc)
+
+        encoded = [value.encode('utf-8') for value in strings.values]
+        string_offsets = array('Q', [0])
+        for value in encoded:
+            string_offsets.append(string_offsets[-1] + len(value))
+
+        sections = {}
+
+        def write_section(name, data, typecode=None):
+            nonlocal offset
+            padding = -offset % 8
+            f.write(b'\0' * padding)
+            offset += padding
+            sections[name] = {'offset': offset, 'length': len(data), 'typecode': typecode}
+            f.write(data)
+            offset += len(data)
+
+        write_section('strings', b''.join(encoded))
+        write_section('string_offsets', _native(string_offsets).tobytes(), 'Q')
+        for name, arr in list(columns.items()) + list(metrics.items()):
+            write_section(name, _native(arr).tobytes(), arr.typecode)
+
+        footer = json.dumps({
+            'count': len(columns['asset']),
+            'keyframe_interval': keyframe_interval,
+            'created': time.time(),
+            'sections': sections,
+        }).encode()
+        f.write(footer)
+        f.write(FOOTER.pack(len(footer)))
+    os.replace(tmp_path, archive_path)
+    return len(columns['asset'])
+
+
+class ArchiveReader:
+    """Memory-mapped reader for archives written by pack().
+
+    Columns are zero-copy views over the mapping and documents are decoded
+    on demand, so opening an archive costs one small footer read. The reader
+    also offers the read interface of RecordIndex (latest, latest_by_owner,
+    filenames, get), so the frontends can serve a packed history read-only.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.records_dir = os.path.dirname(os.path.abspath(archive_path))
+        self._file = open(archive_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{archive_path} is not a record archive")
+        (footer_length,) = FOOTER.unpack_from(self._mm, len(self._mm) - FOOTER.size)
+        footer_start = len(self._mm) - FOOTER.size - footer_length
+        footer = json.loads(self._mm[footer_start:footer_start + footer_length])
+        self.count = footer['count']
+        self.version = 0
+        self.last_modified = footer['created']
+        self._view = memoryview(self._mm)
+        self._sections = footer['sections']
+        self._columns = {}
+        self._strings = {}
+        self._strings_start = self._sections['strings']['offset']
+        self._string_offsets = self.column('string_offsets')
+        # Per thread: the pooled HTTP workers each keep their own last decoded row
+        self._last = threading.local()
+        self._rows_by_filename = None
+        self._asset_rows = None
+        self._latest_rows = None
+        self._owner_rows = None
+
+    def close(self):
+        for view in self._columns.values():
+            view.release()
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        """Return a column as a read-only memoryview over the mapping."""
+        view = self._columns.get(name)
+        if view is None:
+            section = self._sections[name]
+            view = self._view[section['offset']:section['offset'] + section['length']]
+            if sys.byteorder != 'little':
+                arr = array(section['typecode'], view.tobytes())
+                arr.byteswap()
+                view = memoryview(arr)
+            else:
+                view = view.cast(section['typecode'])
+            self._columns[name] = view
+        return view
+
+    def string(self, string_id):
+        value = self._strings.get(string_id)
+        if value is None:
+            start = self._strings_start + self._string_offsets[string_id]
+            end = self._strings_start + self._string_offsets[string_id + 1]
+            value = self._strings[string_id] = str(self._mm[start:end], 'utf-8')
+        return value
+
+    def metadata(self, row):
+        """Return (asset, timestamp, filename) for a snapshot row without decoding its document."""
+        return (self.string(self.column('asset')[row]), self.string(self.column('timestamp')[row]),
+                self.string(self.column('filename')[row]))
+
+    def record(self, row):
+        """Rebuild the full record of a snapshot row.
+
+        Deltas replace whole top-level sections, so records share nested
+        values with each other; treat returned records as read-only.
+        """
+        last_row, last_record = getattr(self._last, 'entry', (None, None))
+        if last_row == row:
+            return dict(last_record)
+        bases = self.column('base')
+        chain = [row]
+        while bases[chain[-1]] != -1 and chain[-1] != last_row:
+            chain.append(bases[chain[-1]])
+        if chain[-1] == last_row:
+            record = dict(last_record)
+            chain.pop()
+        else:
+            record = None
+        offsets, lengths = self.column('doc_offset'), self.column('doc_length')
+        for step in reversed(chain):
+            with self._view[offsets[step]:offsets[step] + lengths[step]] as buf:
+                if buf[0] == FULL:
+                    record, _ = _decode(buf, 1, self.string)
+                else:
+                    changed, pos = _decode(buf, 1, self.string)
+                    removed, _ = _decode(buf, pos, self.string)
+                    for key in removed:
+                        record.pop(key, None)
+                    record.update(changed)
+        # Sequential history scans then only apply one delta per step
+        self._last.entry = (row, record)
+        return dict(record)
+
+    def asset_rows(self):
+        """Return {asset: range of rows}; rows are stored grouped by asset in time order."""
+        assets = self.column('asset')
+        ranges = {}
+        start = 0
+        for row in range(1, self.count + 1):
+            if row == self.count or assets[row] != assets[start]:
+                ranges[self.string(assets[start])] = range(start, row)
+                start = row
+        return ranges
+
+    def history(self, serial, start=None, end=None):
+        """Return summaries of serial's snapshots with start <= Timestamp <= end, oldest first.
+
+        The asset's rows are already in time order, so the range is found by
+        binary search over the timestamp column and metrics come from the
+        metric columns without decoding any document.
+        """
+        rows = self._assets().get(serial)
+        if rows is None:
+            return []
+        timestamps = self.column('timestamp')
+
+        def bound(value):
+            lo, hi = rows.start, rows.stop
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.string(timestamps[mid]) < value:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        lo = bound(start) if start else rows.start
+        hi = bound(end + '\uffff') if end else rows.stop
+        metrics = [self.column(name) for name in METRIC_COLUMNS]
+        summaries = []
+        for row in range(lo, hi):
+            _, timestamp, filename = self.metadata(row)
+            file_owner, file_timestamp = parse_filename(filename)
+            summaries.append({'filename': filename, 'SerialNumber': serial, 'Timestamp': timestamp,
+                              'FileOwner': file_owner, 'FileTimestamp': file_timestamp,
+                              'Metrics': tuple(column[row] for column in metrics)})
+        return summaries
+
+    def refresh(self):
+        return 0
+
+    def update_path(self, path):
+        return 0
+
+    def _assets(self):
+        if self._asset_rows is None:
+            self._asset_rows = self.asset_rows()
+        return self._asset_rows
+
+    def _latest(self):
+        # The archive never changes, so which rows are latest is worked out once per open
+        if self._latest_rows is None:
+            latest = []
+            for rows in self._assets().values():
+                record = self.record(rows[-1])
+                serial = record['AssetInformation'].get('SerialNumber')
+                if serial:
+                    latest.append(((record['Timestamp'], serial), rows[-1]))
+            latest.sort(reverse=True)
+            self._latest_rows = [row for _, row in latest]
+        return self._latest_rows
+
+    def latest(self):
+        return [self.record(row) for row in self._latest()]
+
+    def latest_metrics(self):
+        metrics = [self.column(name) for name in METRIC_COLUMNS]
+        return [(self.record(row), tuple(column[row] for column in metrics)) for row in self._latest()]
+
+    def changed_since(self, version):
+        # The version never moves, so nothing is ever changed
+        return set() if version == self.version else None
+
+    def latest_by_owner(self):
+        if self._owner_rows is None:
+            latest = {}
+            for row in range(self.count):
+                _, _, filename = self.metadata(row)
+                owner, file_timestamp = parse_filename(filename)
+                if owner and (owner not in latest or file_timestamp > latest[owner][0]):
+                    latest[owner] = (file_timestamp, filename, row)
+            self._owner_rows = [(filename, row) for _, filename, row in sorted(latest.values(), reverse=True)]
+        return [(filename, self.record(row)) for filename, row in self._owner_rows]
+
+    def filenames(self):
+        return [self.metadata(row)[2] for row in range(self.count)]
+
+    def latest_for(self, serial):
+        rows = self._assets().get(serial)
+        return None if not rows else (self.metadata(rows[-1])[2], self.record(rows[-1]))
+
+    def stamp(self, filename):
+        # Archives are written once, so a row never changes
+        return 0 if self._row(filename) is not None else None
+
+    def _row(self, filename):
+        if self._rows_by_filename is None:
+            self._rows_by_filename = {name: row for row, name in enumerate(self.filenames())}
+        return self._rows_by_filename.get(filename)
+
+    def get(self, filename):
+        row = self._row(filename)
+        return None if row is None else self.record(row)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack a Records directory into a compact columnar archive.')
+    parser.add_argument('records_dir', help='directory containing SystemInfo_*.json files')
+    parser.add_argument('archive_path', help='archive file to write')
+    parser.add_argument('--keyframe-interval', type=int, default=KEYFRAME_INTERVAL,
+                        help='store every Nth snapshot of an asset in full')
+    args = parser.parse_args()
+    count = pack(args.records_dir, args.archive_path, keyframe_interval=args.keyframe_interval)
+    size = sum(entry.stat().st_size for entry in os.scandir(args.records_dir) if entry.name.endswith('.json'))
+    packed = os.path.getsize(args.archive_path)
+    print(f"Packed {count} snapshots: {size} bytes -> {packed} bytes ({size / max(packed, 1):.1f}x)")
@@ -0,0 +1,80 @@
+import json
+
+from record_query import parse_fields, project
+
+# Bounds one request; the dashboard asks for one entry per asset
+MAX_BATCH_ITEMS = 10000
+MAX_BATCH_BODY = 4 * 1024 * 1024
+
+KINDS = ('filenames', 'serials', 'latest')
+
+
+def parse_batch(body):
+    """Parse a /api/records/batch body into (kind, keys, fields).
+
+    The body is a JSON object with exactly one of "filenames" (record
+    files), "serials" (the latest snapshot of each asset) or "latest": true
+    (the latest file per owner, as the list page shows), and optionally
+    "fields", a projection as accepted by parse_fields, as a string or a list.
+    """
+    try:
+        request = json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid JSON: {e}") from None
+    if not isinstance(request, dict):
+        raise ValueError("body must be a JSON object")
+    kinds = [kind for kind in KINDS if kind in request]
+    if len(kinds) != 1:
+        raise ValueError('give exactly one of "filenames", "serials" or "latest"')
+    kind = kinds[0]
+    keys = None
+    if kind == 'latest':
+        if request['latest'] is not True:
+            raise ValueError('"latest" must be true')
+    else:
+        keys = request[kind]
+        if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys):
+            raise ValueError(f'"{kind}" must be a list of strings')
+        if len(keys) > MAX_BATCH_ITEMS:
+            raise ValueError(f"at most {MAX_BATCH_ITEMS} {kind} per request")
+    fields = request.get('fields') or ''
+    if isinstance(fields, list) and all(isinstance(field, str) for field in fields):
+        fields = ','.join(fields)
+    if not isinstance(fields, str):
+        raise ValueError('"fields" must be a string or a list of strings')
+    return kind, keys, parse_fields(fields)
+
+
+def batch_records(store, kind, keys, fields):
+    """Yield one item per requested key, in request order.
+
+    Items are the (projected) record plus its filename, or
+    {"filename"|"serial": key, "error": "not found"}. Records come from the
+    store, which answers from memory or its parsed-record cache where it can.
+    """
+    if kind == 'latest':
+        for filename, record in store.latest_by_owner():
+            yield dict(project(record, fields), filename=filename)
+        return
+    for key in keys:
+        if kind == 'filenames':
+            record = store.get(key)
+            found = None if record is None else (key, record)
+        else:
+            found = store.latest_for(key)
+        if found is None:
+            yield {kind[:-1]: key, 'error': 'not found'}
+        else:
+            yield dict(project(found[1], fields), filename=found[0])
+
+
+def encode_items(items, ndjson=False):
+    """Yield str chunks of items as a JSON array, or one JSON document per line."""
+    if ndjson:
+        for item in items:
+            yield json.dumps(item) + '\n'
+        return
+    yield '['
+    for i, item in enumerate(items):
+        yield (',' if i else '') + json.dumps(item)
+    yield ']'
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+
+class RecordCache:
+    """Bounded LRU cache of parsed records keyed by (filename, mtime).
+
+    The mtime in the key means a rewritten file simply misses and its stale
+    entry ages out. Either bound may be None; the byte bound is measured
+    with the on-disk size of each record, which tracks its parsed size
+    closely enough to cap memory without walking the object graph.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._items = OrderedDict()   # (filename, mtime) -> (record, size)
+        self._lock = threading.Lock()
+
+    def get(self, filename, mtime):
+        with self._lock:
+            item = self._items.get((filename, mtime))
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((filename, mtime))
+            self.hits += 1
+            return item[0]
+
+    def put(self, filename, mtime, record, size):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            key = (filename, mtime)
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (record, size)
+            self.bytes += size
+            while self._items and ((self.max_entries is not None and len(self._items) > self.max_entries)
+                                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
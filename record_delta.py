@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+# Marks a delta document; full records have no SnapshotType
+DELTA_TYPE = 'Delta'
+
+# Deltas may be based on deltas, but reconstruction stops after this many links
+MAX_CHAIN = 64
+
+# Per-run fields (the collector's timings) that differ on every run; each snapshot
+# carries its own, outside the diff and the base hash
+VOLATILE_KEYS = ('CollectionStats',)
+
+
+def record_hash(record):
+    """Return the SHA-256 of a record's canonical JSON form.
+
+    Keys are sorted and separators fixed so the collector and the server get
+    the same hash for the same content regardless of how it was serialized.
+    VOLATILE_KEYS are left out, so a rerun on an unchanged host hashes the same.
+    """
+    content = {key: value for key, value in record.items() if key not in VOLATILE_KEYS}
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def is_delta(data):
+    return isinstance(data, dict) and data.get('SnapshotType') == DELTA_TYPE
+
+
+def make_delta(base, base_filename, record, base_hash=None):
+    """Describe record as the top-level sections that differ from base.
+
+    The delta names the base snapshot file and carries its hash, so the
+    server can find the base and check it is the one the delta was made from.
+    Timestamp and VOLATILE_KEYS ride alongside rather than in Changed, so an
+    unchanged host produces an empty delta.
+    """
+    sidecar = ('Timestamp',) + VOLATILE_KEYS
+    changed = {key: value for key, value in record.items()
+               if key not in sidecar and (key not in base or base[key] != value)}
+    removed = sorted(key for key in base if key not in record and key not in sidecar)
+    delta = {
+        'SnapshotType': DELTA_TYPE,
+        'BaseFile': base_filename,
+        'BaseHash': base_hash or record_hash(base),
+        'Timestamp': record.get('Timestamp'),
+        'Changed': changed,
+        'Removed': removed,
+    }
+    for key in VOLATILE_KEYS:
+        if key in record:
+            delta[key] = record[key]
+    return delta
+
+
+def apply_delta(base, delta, base_hash=None):
+    """Rebuild the full record from its base; raise ValueError if the base does not match."""
+    if not isinstance(delta.get('Changed'), dict) or not isinstance(delta.get('Removed', []), list):
+        raise ValueError("malformed delta")
+    if (base_hash or record_hash(base)) != delta.get('BaseHash'):
+        raise ValueError(f"delta base {delta.get('BaseFile')} does not match BaseHash")
+    record = {key: value for key, value in base.items()
+              if key not in delta.get('Removed', []) and key not in VOLATILE_KEYS}
+    if delta.get('Timestamp') is not None:
+        record['Timestamp'] = delta['Timestamp']
+    record.update(delta['Changed'])
+    for key in VOLATILE_KEYS:
+        if key in delta:
+            record[key] = delta[key]
+    return record
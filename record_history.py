@@ -0,0 +1,47 @@
+import math
+import re
+
+from record_index import METRIC_COLUMNS
+from record_query import parse_fields, project
+
+# from/to bounds: a timestamp or any leading part of one, e.g. 2024, 2024-03 or 2024-03-01T09:30
+BOUND_REGEX = re.compile(r'^\d{4}(-\d{2}(-\d{2}([ T]\d{2}(:\d{2}(:\d{2})?)?)?)?)?$')
+
+
+def parse_bound(value, name):
+    if not value:
+        return None
+    if not BOUND_REGEX.match(value):
+        raise ValueError(f"{name} must be a timestamp like 2024-03-01 or 2024-03-01T09:30:00")
+    return value.replace('T', ' ')
+
+
+def asset_history(store, serial, start=None, end=None, fields=None):
+    """Return the time series of one asset between start and end (inclusive).
+
+    fields is a comma-separated list of METRIC_COLUMNS names, which come
+    from the store's per-snapshot summaries, and/or dotted record paths as
+    accepted by parse_fields, which load only the snapshots in range.
+    All metrics are returned when fields is empty.
+    """
+    start, end = parse_bound(start, 'from'), parse_bound(end, 'to')
+    if start and end and start[:len(end)] > end:
+        raise ValueError("from must not be after to")
+    names = [name.strip() for name in (fields or '').split(',') if name.strip()]
+    metrics = [name for name in names if name in METRIC_COLUMNS] if names else list(METRIC_COLUMNS)
+    paths = parse_fields(','.join(name for name in names if name not in METRIC_COLUMNS))
+    indexes = [METRIC_COLUMNS.index(name) for name in metrics]
+
+    points = []
+    for summary in store.history(serial, start, end):
+        point = {'Timestamp': summary['Timestamp'], 'filename': summary['filename']}
+        values = summary['Metrics']
+        for name, index in zip(metrics, indexes):
+            value = values[index]
+            point[name] = None if math.isnan(value) else value
+        if paths:
+            record = store.get(summary['filename'])
+            if record is not None:
+                point.update(project(record, paths))
+        points.append(point)
+    return {'serial': serial, 'from': start, 'to': end, 'count': len(points), 'points': points}
@@ -0,0 +1,561 @@
+import bisect
+import codecs
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from metrics import FILES_CHANGED, LATEST_SECONDS, PARSE_ERRORS, PARSE_SECONDS, SCAN_SECONDS
+from record_delta import MAX_CHAIN, apply_delta, is_delta, record_hash
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Changed-file count above which a refresh parses in a worker pool
+PARALLEL_THRESHOLD = 256
+
+FILENAME_REGEX = re.compile(r'^SystemInfo_(.+)_(\d{4}-\d{2}-\d{2}_\d{2}_\d{2}_\d{2})\.json$')
+
+
+def parse_filename(filename):
+    """Split a SystemInfo_<Owner>_<timestamp>.json filename into (owner, timestamp)."""
+    match = FILENAME_REGEX.match(filename)
+    if not match:
+        return None, None
+    return match.group(1).replace('_', ' '), match.group(2)
+
+
+def validate_record(data):
+    """Reject files that are valid JSON but not an inventory snapshot."""
+    if not isinstance(data, dict):
+        raise ValueError("record is not a JSON object")
+    if not isinstance(data.get('AssetInformation'), dict):
+        raise ValueError("record has no AssetInformation section")
+
+
+def decode_json(data):
+    """Decode JSON bytes with orjson when it is installed, else the stdlib parser."""
+    # PowerShell's Out-File -Encoding UTF8 writes a BOM, so accept one
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+class _BaseCache:
+    """Small LRU of reconstructed delta bases, so a chain is not re-read for every link."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._items = OrderedDict()   # (path, mtime_ns, size) -> (record, hash)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, record, base_hash):
+        with self._lock:
+            self._items[key] = (record, base_hash)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+_delta_bases = _BaseCache()
+
+
+def _load_base(filepath, depth):
+    """Return (record, hash) for the base snapshot a delta refers to."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        raise ValueError(f"delta base {os.path.basename(filepath)} is missing") from None
+    key = (filepath, st.st_mtime_ns, st.st_size)
+    cached = _delta_bases.get(key)
+    if cached is not None:
+        return cached
+    record = load_record(filepath, _depth=depth)
+    base_hash = record_hash(record)
+    _delta_bases.put(key, record, base_hash)
+    return record, base_hash
+
+
+def load_record(filepath, _depth=0):
+    """Read one record file, filling in Timestamp from the filename when missing.
+
+    Delta snapshots are rebuilt into full records from the base file they
+    name, which sits in the same directory.
+    """
+    with open(filepath, 'rb') as f:
+        data = decode_json(f.read())
+    if is_delta(data):
+        if _depth >= MAX_CHAIN:
+            raise ValueError("delta chain is too long")
+        base_file = data.get('BaseFile')
+        if not isinstance(base_file, str) or not base_file:
+            raise ValueError("delta has no BaseFile")
+        base_path = os.path.join(os.path.dirname(filepath), os.path.basename(base_file))
+        base, base_hash = _load_base(base_path, _depth + 1)
+        data = apply_delta(base, data, base_hash)
+    validate_record(data)
+    if 'Timestamp' not in data:
+        _, file_timestamp = parse_filename(os.path.basename(filepath))
+        try:
+            data['Timestamp'] = datetime.strptime(file_timestamp, "%Y-%m-%d_%H_%M_%S").isoformat()
+        except (TypeError, ValueError):
+            data['Timestamp'] = datetime.now().isoformat()
+    return data
+
+
+def read_log_entry(location):
+    """Read one record from an ingest log segment at (path, offset, length)."""
+    path, offset, length = location
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        entry = decode_json(f.read(length))
+    return entry['record']
+
+
+# Per-snapshot numeric metrics, kept in every summary with NaN for missing values
+METRIC_COLUMNS = ('ram_gb', 'disk_gb', 'free_gb', 'max_used_percent', 'battery_wear_percent')
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _rows(value):
+    """ConvertTo-Json emits single-item arrays as bare objects."""
+    if isinstance(value, dict):
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+def record_metrics(record):
+    """Return the METRIC_COLUMNS values for one record, NaN where unknown."""
+    memory = record.get('MemoryInformation') or {}
+    disks = [_number(d.get('SizeGB')) for d in _rows(record.get('PhysicalDisks')) if isinstance(d, dict)]
+    drives = [d for d in _rows(record.get('LogicalDrives')) if isinstance(d, dict)]
+    free = [_number(d.get('FreeSpaceGB')) for d in drives]
+    used = [_number(d.get('UsedPercent')) for d in drives]
+    battery = record.get('BatteryInformation') or {}
+    wear = _number(battery.get('BatteryWearPercent'))
+    if math.isnan(wear):
+        wear = 100 - _number(battery.get('BatteryHealthPercent'))
+    return (
+        _number(memory.get('TotalMemoryGB')),
+        math.fsum(disks) if disks else math.nan,
+        math.fsum(free) if free else math.nan,
+        max(used) if used else math.nan,
+        wear,
+    )
+
+
+def summarize(filepath, record):
+    """Build the small per-file summary the index keeps for every snapshot."""
+    filename = os.path.basename(filepath)
+    file_owner, file_timestamp = parse_filename(filename)
+    asset = record['AssetInformation']
+    return {
+        'filename': filename,
+        'SerialNumber': asset.get('SerialNumber'),
+        'Hostname': asset.get('Hostname'),
+        'OwnerName': record.get('OwnerName'),
+        'Timestamp': record['Timestamp'],
+        'FileOwner': file_owner,
+        'FileTimestamp': file_timestamp,
+        'Metrics': record_metrics(record),
+    }
+
+
+class ChangeLog:
+    """The serials whose latest snapshot each store version may have changed.
+
+    Lets consumers of a store such as FleetStats update only those assets
+    when the version moves. Only the last max_versions are
+    kept; since() answers None for anything older and the consumer rebuilds.
+    """
+
+    def __init__(self, max_versions=1024):
+        self._versions = deque(maxlen=max_versions)   # (version, frozenset of serials)
+        self._lock = threading.Lock()
+
+    def add(self, version, serials):
+        with self._lock:
+            self._versions.append((version, frozenset(serial for serial in serials if serial)))
+
+    def since(self, version):
+        """Return the set of serials changed after version, or None if that is no longer known."""
+        if version is None:
+            return None
+        changed = set()
+        oldest = None
+        with self._lock:
+            for logged, serials in reversed(self._versions):
+                if logged <= version:
+                    break
+                changed |= serials
+                oldest = logged
+        if oldest is not None and oldest != version + 1:
+            return None
+        return changed
+
+
+def asset_sort_key(record):
+    """Sort key for latest-per-asset listings: newest first, ties broken by serial."""
+    return record['Timestamp'], record['AssetInformation']['SerialNumber']
+
+
+def read_summary(filepath):
+    """Parse a record file and return only its summary; runs in parse pool workers."""
+    try:
+        return summarize(filepath, load_record(filepath))
+    except (OSError, ValueError) as e:
+        print(f"Error reading {filepath}: {str(e)}")
+        return None
+
+
+class _Grouping:
+    """Latest path per key, kept up to date as paths are added and removed."""
+
+    def __init__(self, key, order):
+        self.key = key
+        self.order = order
+        self.members = {}   # key -> {path, ...}
+        self.latest = {}    # key -> path
+
+    def add(self, path, summary, entries):
+        """Add a path; return the path it displaced as latest, or None."""
+        key = self.key(summary)
+        if not key:
+            return None
+        self.members.setdefault(key, set()).add(path)
+        current = self.latest.get(key)
+        if current is None or self.order(summary) > self.order(entries[current]):
+            self.latest[key] = path
+            return current
+        return None
+
+    def remove(self, path, summary, entries):
+        """Remove a path; if it was latest, promote the next newest and return it."""
+        key = self.key(summary)
+        if not key:
+            return None
+        members = self.members[key]
+        members.discard(path)
+        if self.latest.get(key) != path:
+            return None
+        if not members:
+            del self.members[key]
+            del self.latest[key]
+            return None
+        # Only this key's snapshots are considered, not the whole archive
+        successor = max(members, key=lambda p: self.order(entries[p]))
+        self.latest[key] = successor
+        return successor
+
+
+class RecordIndex:
+    """In-process index of a Records directory.
+
+    Each file is tracked by (mtime, size) so a refresh only re-parses files
+    that are new or changed and drops the ones that were deleted. The latest
+    record per SerialNumber (used by server.py) and per filename owner (used
+    by app/app.py) are maintained incrementally as files come and go; only
+    those latest records are held in memory in full.
+
+    When a refresh finds many changed files (a cold start), summaries are
+    parsed across a pool of `workers` processes (or threads, which suit
+    slow network shares better) and only the winning latest records are
+    then read in full.
+
+    Records posted to the ingest endpoint live in the ingest log rather than
+    in files of their own; ingest() adds them under their assigned filename
+    and refreshes leave them alone.
+    """
+
+    def __init__(self, records_dir, cache=None, workers=None, use_processes=True):
+        self.records_dir = records_dir
+        self.cache = cache        # optional RecordCache for records that are not latest
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.use_processes = use_processes
+        self.version = 0
+        self.last_modified = time.time()
+        self._entries = {}        # path -> (mtime, size, summary or None)
+        self._summaries = {}      # path -> summary, for valid records only
+        self._records = {}        # path -> full record, only for latest paths
+        self._logged = {}         # path -> ingest log location, for records without a file
+        self._timelines = {}      # serial -> [(Timestamp, path), ...] in time order
+        self._groupings = {
+            'serial': _Grouping(lambda s: s['SerialNumber'], lambda s: s['Timestamp']),
+            'owner': _Grouping(lambda s: s['FileOwner'], lambda s: s['FileTimestamp']),
+        }
+        self._sorted = {}
+        self._changes = ChangeLog()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """Bring the index in line with the directory; return the number of changed files."""
+        with self._refresh_lock:
+            seen = {}
+            with SCAN_SECONDS.time(store='index'):
+                try:
+                    with os.scandir(self.records_dir) as it:
+                        for entry in it:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                st = entry.stat()
+                                seen[entry.path] = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    pass
+
+            with self._lock:
+                removed = [path for path in self._entries if path not in seen and path not in self._logged]
+                changed = [(path, stat) for path, stat in seen.items()
+                           if self._entries.get(path, (None, None))[:2] != stat]
+            if self.workers > 1 and len(changed) >= PARALLEL_THRESHOLD:
+                self._apply(removed, self._summarize_parallel(changed))
+                self._load_missing()
+            else:
+                self._apply(removed, [(path, stat) + self._read(path) for path, stat in changed])
+            FILES_CHANGED.inc(len(removed) + len(changed), store='index')
+            return len(removed) + len(changed)
+
+    def update_path(self, path):
+        """Re-check a single file, e.g. after a filesystem notification."""
+        with self._refresh_lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                if path in self._entries:
+                    self._apply([path], [])
+                    return 1
+                return 0
+            stat = (st.st_mtime_ns, st.st_size)
+            if self._entries.get(path, (None, None))[:2] == stat:
+                return 0
+            self._apply([], [(path, stat) + self._read(path)])
+            return 1
+
+    def ingest(self, items):
+        """Add (filename, record, log_location) items that were written to the ingest log."""
+        loaded = []
+        for filename, record, location in items:
+            path = os.path.join(self.records_dir, filename)
+            loaded.append((path, (None, location[2]), summarize(path, record), record))
+        with self._lock:
+            for filename, _, location in items:
+                self._logged[os.path.join(self.records_dir, filename)] = location
+        self._apply([], loaded)
+
+    def has_snapshot(self, serial, timestamp):
+        """Return True if a snapshot of serial taken at timestamp is already indexed."""
+        with self._lock:
+            members = self._groupings['serial'].members.get(serial, ())
+            return any(self._summaries[path]['Timestamp'] == timestamp for path in members)
+
+    def _parse(self, path):
+        try:
+            with PARSE_SECONDS.time(store='index'):
+                location = self._logged.get(path)
+                if location is not None:
+                    return read_log_entry(location)
+                return load_record(path)
+        except (OSError, ValueError) as e:
+            PARSE_ERRORS.inc(store='index')
+            print(f"Error reading {path}: {str(e)}")
+            return None
+
+    def _read(self, path):
+        """Return (summary, record) for a file; both are None if it does not parse."""
+        record = self._parse(path)
+        if record is None:
+            return None, None
+        return summarize(path, record), record
+
+    def _summarize_parallel(self, changed):
+        paths = [path for path, _ in changed]
+        pool_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with pool_class(max_workers=self.workers) as pool:
+            summaries = list(pool.map(read_summary, paths, chunksize=64))
+        return [(path, stat, summary, None) for (path, stat), summary in zip(changed, summaries)]
+
+    def _load_missing(self):
+        """Read the full records of latest paths that were indexed from summaries only."""
+        with self._lock:
+            missing = list({path for grouping in self._groupings.values()
+                            for path in grouping.latest.values() if path not in self._records})
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            records = list(pool.map(self._parse, missing))
+        with self._lock:
+            for path, record in zip(missing, records):
+                if record is not None and path in self._summaries and self._is_latest(path):
+                    self._records[path] = record
+            self.version += 1
+            self._changes.add(self.version, (self._summaries[path]['SerialNumber'] for path in missing
+                                             if path in self._summaries))
+            self.last_modified = time.time()
+            self._sorted = {}
+
+    def _apply(self, removed, loaded):
+        if not removed and not loaded:
+            return
+        with self._lock:
+            changed = set()
+            for path in removed:
+                changed.add(self._remove(path))
+            for path, (mtime, size), summary, record in loaded:
+                if path in self._entries:
+                    changed.add(self._remove(path))
+                self._add(path, mtime, size, summary, record)
+                if summary is not None:
+                    changed.add(summary['SerialNumber'])
+            self.version += 1
+            self._changes.add(self.version, changed)
+            self.last_modified = time.time()
+            self._sorted = {}
+
+    def _add(self, path, mtime, size, summary, record):
+        # A None summary remembers a failed parse so the file is not re-read until it changes
+        self._entries[path] = (mtime, size, summary)
+        if summary is None:
+            return
+        self._summaries[path] = summary
+        if summary['SerialNumber']:
+            bisect.insort(self._timelines.setdefault(summary['SerialNumber'], []), (summary['Timestamp'], path))
+        for grouping in self._groupings.values():
+            displaced = grouping.add(path, summary, self._summaries)
+            if record is not None and grouping.latest.get(grouping.key(summary)) == path:
+                self._records[path] = record
+            if displaced:
+                self._release(displaced)
+
+    def _remove(self, path):
+        """Drop a path from the index; return its SerialNumber, or None if it had no summary."""
+        _, _, summary = self._entries.pop(path)
+        if summary is None:
+            return None
+        for grouping in self._groupings.values():
+            successor = grouping.remove(path, summary, self._summaries)
+            if successor and successor not in self._records:
+                record = self._parse(successor)
+                if record is not None:
+                    self._records[successor] = record
+        del self._summaries[path]
+        self._records.pop(path, None)
+        timeline = self._timelines.get(summary['SerialNumber'])
+        if timeline is not None:
+            del timeline[bisect.bisect_left(timeline, (summary['Timestamp'], path))]
+            if not timeline:
+                del self._timelines[summary['SerialNumber']]
+        return summary['SerialNumber']
+
+    def _is_latest(self, path):
+        summary = self._summaries[path]
+        return any(grouping.latest.get(grouping.key(summary)) == path
+                   for grouping in self._groupings.values())
+
+    def _release(self, path):
+        """Drop a full record once it is no longer latest in any grouping."""
+        if not self._is_latest(path):
+            self._records.pop(path, None)
+
+    def _latest(self, grouping_name, sort_key):
+        with self._lock:
+            if grouping_name not in self._sorted:
+                start = time.perf_counter()
+                paths = [p for p in self._groupings[grouping_name].latest.values() if p in self._records]
+                paths.sort(key=lambda p: sort_key(self._summaries[p]), reverse=True)
+                self._sorted[grouping_name] = [(self._summaries[p], self._records[p]) for p in paths]
+                LATEST_SECONDS.observe(time.perf_counter() - start, store='index', grouping=grouping_name)
+            return self._sorted[grouping_name]
+
+    def latest(self):
+        """Return the latest record per SerialNumber, ordered by asset_sort_key descending."""
+        return [record for _, record in self._latest('serial', lambda s: (s['Timestamp'], s['SerialNumber']))]
+
+    def latest_metrics(self):
+        """Return (record, METRIC_COLUMNS values) for each latest() record, from the summaries."""
+        return [(record, summary['Metrics'])
+                for summary, record in self._latest('serial', lambda s: (s['Timestamp'], s['SerialNumber']))]
+
+    def changed_since(self, version):
+        """Return the serials whose latest snapshot may differ from the given version's, or None if unknown."""
+        return self._changes.since(version)
+
+    def latest_by_owner(self):
+        """Return (filename, record) for the latest file per owner in the filename."""
+        return [(summary['filename'], record)
+                for summary, record in self._latest('owner', lambda s: (s['FileTimestamp'], s['filename']))]
+
+    def latest_for(self, serial):
+        """Return (filename, record) of serial's latest snapshot, or None; served from memory."""
+        with self._lock:
+            path = self._groupings['serial'].latest.get(serial)
+            record = self._records.get(path)
+        return None if record is None else (os.path.basename(path), record)
+
+    def get(self, filename):
+        """Return the record for one file in the directory, or None if it is unknown."""
+        path = os.path.join(self.records_dir, filename)
+        with self._lock:
+            entry = self._entries.get(path)
+            record = self._records.get(path)
+        if entry is None or entry[2] is None:
+            return None
+        if record is not None:
+            return record
+        mtime, size, _ = entry
+        if self.cache is not None:
+            record = self.cache.get(filename, mtime)
+            if record is not None:
+                return record
+        record = self._parse(path)
+        if record is not None and self.cache is not None:
+            self.cache.put(filename, mtime, record, size)
+        return record
+
+    def stamp(self, filename):
+        """Return (mtime_ns, size) of an indexed file, which changes whenever its content does, or None."""
+        with self._lock:
+            entry = self._entries.get(os.path.join(self.records_dir, filename))
+        if entry is None or entry[2] is None:
+            return None
+        return entry[:2]
+
+    def history(self, serial, start=None, end=None):
+        """Return the summaries of serial's snapshots with start <= Timestamp <= end, oldest first.
+
+        Bounds compare as timestamp prefixes, so end='2024-03' includes all of March.
+        """
+        with self._lock:
+            timeline = self._timelines.get(serial, [])
+            lo = bisect.bisect_left(timeline, (start,)) if start else 0
+            hi = bisect.bisect_right(timeline, (end + '\uffff',)) if end else len(timeline)
+            return [self._summaries[path] for _, path in timeline[lo:hi]]
+
+    def filenames(self):
+        """Return the names of all .json files currently in the directory."""
+        with self._lock:
+            return [os.path.basename(path) for path in self._entries]
@@ -0,0 +1,364 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from metrics import REGISTRY
+from record_delta import apply_delta, is_delta
+from record_index import decode_json, validate_record
+
+# Decompressed bodies larger than this are refused (guards against gzip bombs)
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# A new log segment is started once the current one reaches this size
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+SEGMENT_REGEX = re.compile(r'^records-(\d{6})\.ndjson$')
+
+INGESTED = REGISTRY.counter('wis_ingest_records_total', 'Posted records by outcome')
+FSYNC_SECONDS = REGISTRY.histogram('wis_ingest_fsync_seconds', 'Time of each group-commit fsync of the ingest log')
+
+
+class IngestError(ValueError):
+    """The request body as a whole could not be read."""
+
+
+def decode_body(body, content_encoding=None):
+    """Undo a gzip Content-Encoding, refusing bodies that inflate past MAX_BODY_SIZE."""
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding not in ('gzip', 'x-gzip'):
+        raise IngestError(f"unsupported Content-Encoding: {content_encoding}")
+    decompressor = zlib.decompressobj(31)
+    try:
+        data = decompressor.decompress(body, MAX_BODY_SIZE + 1)
+    except zlib.error as e:
+        raise IngestError(f"invalid gzip body: {e}") from None
+    if len(data) > MAX_BODY_SIZE or decompressor.unconsumed_tail:
+        raise IngestError("decompressed body is too large")
+    return data
+
+
+def parse_body(body, content_type=None):
+    """Split a decoded body into [(item_number, document or None, error or None)].
+
+    application/x-ndjson bodies hold one record per line; anything else is
+    read as a single JSON record or an array of records.
+    """
+    if 'ndjson' in (content_type or '') or 'jsonl' in (content_type or ''):
+        items = []
+        for number, line in enumerate(body.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append((number, decode_json(line), None))
+            except ValueError as e:
+                items.append((number, None, f"invalid JSON: {e}"))
+        return items
+    try:
+        data = decode_json(body)
+    except ValueError as e:
+        raise IngestError(f"invalid JSON: {e}") from None
+    if isinstance(data, list):
+        return [(number, document, None) for number, document in enumerate(data, 1)]
+    return [(1, data, None)]
+
+
+def record_filename(record, taken):
+    """Name an ingested record like a collector file: SystemInfo_<Owner>_<timestamp>.json."""
+    asset = record['AssetInformation']
+    owner = record.get('OwnerName') or asset.get('Hostname') or 'Unknown'
+    owner = re.sub(r'[<>:"/\\|?*_\s]+', ' ', str(owner)).strip().replace(' ', '_') or 'Unknown'
+    digits = re.findall(r'\d+', str(record['Timestamp']))
+    try:
+        stamp = datetime(*map(int, digits[:6])).strftime('%Y-%m-%d_%H_%M_%S')
+    except (TypeError, ValueError):
+        stamp = datetime.now().strftime('%Y-%m-%d_%H_%M_%S')
+    filename = f'SystemInfo_{owner}_{stamp}.json'
+    if taken(filename):
+        # Same owner and second but another asset: keep both apart
+        serial = re.sub(r'[^\w-]+', '', str(asset.get('SerialNumber') or '')) or 'asset'
+        filename = f'SystemInfo_{owner}_{serial}_{stamp}.json'
+    return filename
+
+
+def check_record(record):
+    """Reject records the store cannot key by (SerialNumber, Timestamp); both must be non-empty strings."""
+    validate_record(record)
+    for name, value in (('Timestamp', record.get('Timestamp')),
+                        ('AssetInformation.SerialNumber', record['AssetInformation'].get('SerialNumber'))):
+        if not value:
+            raise ValueError(f"record has no {name}")
+        if not isinstance(value, str):
+            raise ValueError(f"{name} is not a string")
+
+
+class IngestLog:
+    """Append-only NDJSON segments with group-committed fsync.
+
+    append() writes and flushes a batch of lines, then waits until a flusher
+    thread has fsynced past it. Writers arriving within one fsync_interval
+    share a single fsync, which is what keeps a login storm of small
+    check-ins from becoming one disk sync each.
+    """
+
+    def __init__(self, log_dir, fsync_interval=0.05):
+        self.log_dir = log_dir
+        self.fsync_interval = fsync_interval
+        os.makedirs(log_dir, exist_ok=True)
+        numbers = [int(m.group(1)) for m in map(SEGMENT_REGEX.match, os.listdir(log_dir)) if m]
+        self._segment = max(numbers) if numbers else 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._written = 0       # batches written
+        self._synced = 0        # batches covered by an fsync
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._closed = False
+        self.fsyncs = 0
+        self._flusher = threading.Thread(target=self._flush_loop, name='ingest-fsync', daemon=True)
+        self._flusher.start()
+
+    def _segment_path(self, number):
+        return os.path.join(self.log_dir, f'records-{number:06d}.ndjson')
+
+    def segments(self):
+        """Return the paths of all log segments, oldest first."""
+        names = sorted(name for name in os.listdir(self.log_dir) if SEGMENT_REGEX.match(name))
+        return [os.path.join(self.log_dir, name) for name in names]
+
+    def append(self, entries):
+        """Durably append JSON-serializable entries; return their (path, offset, length) locations."""
+        lines = [json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n' for entry in entries]
+        with self._cond:
+            if self._closed:
+                raise IngestError("ingest log is closed")
+            if self._file.tell() >= SEGMENT_SIZE:
+                self._rotate()
+            path = self._file.name
+            offset = self._file.tell()
+            locations = []
+            for line in lines:
+                locations.append((path, offset, len(line)))
+                offset += len(line)
+            self._file.write(b''.join(lines))
+            self._file.flush()
+            self._written += 1
+            batch = self._written
+            self._cond.notify_all()
+            while self._synced < batch and not self._closed:
+                self._cond.wait()
+        return locations
+
+    def _rotate(self):
+        self._fsync()
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+    def _fsync(self):
+        with FSYNC_SECONDS.time():
+            os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        self._synced = self._written
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._synced == self._written and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # Let more writers join this group before syncing
+            time.sleep(self.fsync_interval)
+            with self._cond:
+                if self._closed:
+                    return
+                self._fsync()
+                self._cond.notify_all()
+
+    def replay(self, batch_size=1000):
+        """Yield batches of (entry, location) from every segment, oldest first."""
+        batch = []
+        for path in self.segments():
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    length = len(line)
+                    if line.endswith(b'\n'):
+                        try:
+                            batch.append((decode_json(line), (path, offset, length)))
+                        except ValueError:
+                            pass
+                    # A torn final line from a crash is skipped
+                    offset += length
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        with self._cond:
+            if not self._closed:
+                self._fsync()
+                self._closed = True
+                self._file.close()
+                self._cond.notify_all()
+
+
+class RecordIngestor:
+    """Validates posted records and writes them to a store through an IngestLog.
+
+    Records are deduplicated by (SerialNumber, Timestamp) against the store
+    and each other. Delta snapshots are rebuilt from their BaseFile as found
+    in the store before they are logged, so the log only holds full records.
+    """
+
+    def __init__(self, store, log_dir, fsync_interval=0.05):
+        self.store = store
+        self.log = IngestLog(log_dir, fsync_interval)
+        self._lock = threading.Lock()
+        self._filenames = set()
+        self._pending = set()     # (serial, timestamp) keys being written
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    def replay(self):
+        """Load everything already in the log into the store; return the record count.
+
+        Entries that are malformed or that the store refuses are skipped and
+        counted as rejected, so one bad line cannot keep the server from starting.
+        """
+        count = 0
+        for batch in self.log.replay():
+            items = []
+            for entry, (path, offset, length) in batch:
+                try:
+                    if not isinstance(entry.get('filename'), str):
+                        raise ValueError("entry has no filename")
+                    check_record(entry['record'])
+                except (AttributeError, KeyError, ValueError) as e:
+                    print(f"Skipping ingest log entry at {path}:{offset}: {e}")
+                    self.rejected += 1
+                    continue
+                items.append((entry['filename'], entry['record'], (path, offset, length)))
+            failed = self._store(items)
+            self.rejected += len(failed)
+            self._filenames.update(filename for filename, _, _ in items)
+            count += len(items) - len(failed)
+        return count
+
+    def _store(self, items):
+        """Add logged (filename, record, location) items to the store; return the ones it refused.
+
+        A batch that fails is retried item by item, so one bad record is
+        dropped without losing the others.
+        """
+        if not items:
+            return []
+        try:
+            self.store.ingest(items)
+            return []
+        except Exception as e:
+            if len(items) == 1:
+                print(f"Could not store ingested record {items[0][0]}: {e}")
+                return items
+        failed = []
+        for item in items:
+            failed.extend(self._store([item]))
+        return failed
+
+    def _prepare(self, document):
+        if is_delta(document):
+            base_file = document.get('BaseFile')
+            base = self.store.get(os.path.basename(base_file)) if isinstance(base_file, str) else None
+            if base is None:
+                raise ValueError(f"delta base {base_file} is not known")
+            document = apply_delta(base, document)
+        check_record(document)
+        return document
+
+    def ingest(self, items):
+        """Ingest parse_body() items; return {accepted, duplicates, rejected: [{item, error}]}."""
+        rejected = []
+        prepared = []     # (item number, record)
+        for number, document, error in items:
+            if error is None:
+                try:
+                    document = self._prepare(document)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                rejected.append({'item': number, 'error': error})
+            else:
+                prepared.append((number, document))
+
+        duplicates = 0
+        entries = []
+        numbers = []
+        keys = []
+        # Claim (serial, timestamp) keys under the lock so concurrent requests cannot both
+        # insert a snapshot, but write outside it so their fsyncs can be shared
+        with self._lock:
+            for number, record in prepared:
+                key = (record['AssetInformation']['SerialNumber'], record['Timestamp'])
+                if key in self._pending or self.store.has_snapshot(*key):
+                    duplicates += 1
+                    continue
+                self._pending.add(key)
+                keys.append(key)
+                filename = record_filename(record, lambda name: name in self._filenames
+                                           or self.store.get(name) is not None)
+                self._filenames.add(filename)
+                entries.append({'filename': filename, 'record': record})
+                numbers.append(number)
+        accepted = len(entries)
+        try:
+            if entries:
+                locations = self.log.append(entries)
+                failed = {filename for filename, _, _ in self._store(
+                    [(entry['filename'], entry['record'], location) for entry, location in zip(entries, locations)])}
+                for number, entry in zip(numbers, entries):
+                    if entry['filename'] in failed:
+                        rejected.append({'item': number, 'error': "record could not be stored"})
+                accepted -= len(failed)
+        finally:
+            with self._lock:
+                self._pending.difference_update(keys)
+        with self._lock:
+            self.accepted += accepted
+            self.duplicates += duplicates
+            self.rejected += len(rejected)
+        INGESTED.inc(accepted, outcome='accepted')
+        INGESTED.inc(duplicates, outcome='duplicate')
+        INGESTED.inc(len(rejected), outcome='rejected')
+        return {'accepted': accepted, 'duplicates': duplicates, 'rejected': rejected}
+
+    def stats(self):
+        return {'accepted': self.accepted, 'duplicates': self.duplicates, 'rejected': self.rejected,
+                'fsyncs': self.log.fsyncs}
+
+    def close(self):
+        self.log.close()
+
+
+def open_ingestor(store, records_dir):
+    """Return a RecordIngestor for store, or None if the store is read-only.
+
+    The log lives in WIS_INGEST_LOG, or an Ingest directory next to the
+    records directory. Records already in the log are replayed into the store.
+    """
+    if not hasattr(store, 'ingest'):
+        return None
+    log_dir = os.environ.get('WIS_INGEST_LOG') or os.path.join(
+        os.path.dirname(os.path.abspath(records_dir)), 'Ingest')
+    ingestor = RecordIngestor(store, log_dir)
+    replayed = ingestor.replay()
+    if replayed:
+        print(f"Replayed {replayed} ingested records from {log_dir}")
+    return ingestor
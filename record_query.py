@@ -0,0 +1,104 @@
+import base64
+import json
+
+
+def parse_fields(spec):
+    """Parse a fields= projection like "AssetInformation.Hostname,Model,OS,OwnerName".
+
+    Each entry is a dotted path. A bare name that follows a dotted entry is
+    also tried under that entry's parent, so the example above selects
+    Hostname, Model and OS from AssetInformation and the top-level OwnerName.
+    Returns a list of (path, fallback path or None) tuples.
+    """
+    fields = []
+    parent = ()
+    for name in spec.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        path = tuple(name.split('.'))
+        if len(path) > 1:
+            parent = path[:-1]
+            fields.append((path, None))
+        else:
+            fields.append((path, parent + path if parent else None))
+    return fields
+
+
+def _lookup(record, path):
+    value = record
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            raise KeyError(key)
+        value = value[key]
+    return value
+
+
+def _assign(target, path, value):
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = value
+
+
+def project(record, fields):
+    """Return a copy of record holding only the parsed fields that it has."""
+    if not fields:
+        return record
+    result = {}
+    for path, fallback in fields:
+        for candidate in (path, fallback):
+            if candidate is None:
+                continue
+            try:
+                _assign(result, candidate, _lookup(record, candidate))
+                break
+            except KeyError:
+                continue
+    return result
+
+
+def encode_cursor(key):
+    """Encode a sort key as an opaque, URL-safe pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length=None):
+    """Decode a cursor produced by encode_cursor; raise ValueError if it is malformed.
+
+    A cursor must decode to a list of strings, of the given length if one is passed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+    if (not isinstance(key, list) or not all(isinstance(part, str) for part in key)
+            or length is not None and len(key) != length):
+        raise ValueError(f"invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def paginate(items, sort_key, limit=None, cursor=None):
+    """Return (page, next_cursor) from items sorted by sort_key in descending order.
+
+    The cursor is the sort key of the last item already returned, so pages
+    stay consistent while new records arrive and the page start is found by
+    binary search rather than by counting an offset.
+    """
+    start = 0
+    if cursor is not None:
+        after = decode_cursor(cursor, len(sort_key(items[0])) if items else None)
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tuple(sort_key(items[mid])) > after:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(items) and tuple(sort_key(items[lo])) == after:
+            lo += 1
+        start = lo
+    end = len(items) if limit is None else start + limit
+    page = items[start:end]
+    next_cursor = encode_cursor(list(sort_key(page[-1]))) if page and end < len(items) else None
+    return page, next_cursor
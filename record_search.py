@@ -0,0 +1,434 @@
+import bisect
+import heapq
+import math
+import re
+import shlex
+import threading
+from functools import lru_cache
+
+from record_index import _rows, asset_sort_key
+from record_query import decode_cursor, encode_cursor, parse_fields, project
+
+TOKEN_REGEX = re.compile(r'[a-z0-9]+')
+TERM_REGEX = re.compile(r'^(?:(\w+):)?(.*?)(?:(<=|>=|<|>|=)([\w.]+))?$')
+VERSION_OPERATORS = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    # "=120" matches 120, 120.0.1, ...
+    '=': lambda a, b: a[:len(b)] == b,
+}
+
+# Returned for each hit unless the request asks for other fields
+DEFAULT_FIELDS = 'AssetInformation.Hostname,SerialNumber,Model,OwnerName,Timestamp'
+
+
+# Software names and versions repeat across the fleet, so their tokens are memoized
+@lru_cache(maxsize=65536)
+def text_tokens(value):
+    return tuple(TOKEN_REGEX.findall(value.lower()))
+
+
+def whole_token(value):
+    value = value.strip().lower()
+    return (value,) if value else ()
+
+
+def mac_tokens(value):
+    digits = re.sub(r'[^0-9a-f]', '', value.lower())
+    return (digits,) if digits else ()
+
+
+@lru_cache(maxsize=65536)
+def name_tokens(name):
+    return frozenset(text_tokens(name))
+
+
+@lru_cache(maxsize=65536)
+def version_key(version):
+    """Compare versions numerically, component by component: 119.0.6045 < 120."""
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def _version_range(pairs, op, version):
+    """Return the (lo, hi) slice of sorted (version key, doc) pairs whose key satisfies "key op version"."""
+    # (version,) sorts before every pair with that key and (version, inf) after them
+    first, last = bisect.bisect_left(pairs, (version,)), bisect.bisect_left(pairs, (version, math.inf))
+    if op == '<':
+        return 0, first
+    if op == '<=':
+        return 0, last
+    if op == '>':
+        return last, len(pairs)
+    if op == '>=':
+        return first, len(pairs)
+    # "=120" matches 120, 120.0.1, ...: every key that starts with version
+    if not version:
+        return 0, len(pairs)
+    return first, bisect.bisect_left(pairs, (version[:-1] + (version[-1] + 1,),))
+
+
+def _field_values(record):
+    """Return ({field: [raw values]}, installed software rows) for one record."""
+    asset = record.get('AssetInformation') or {}
+    interfaces = [i for i in _rows(record.get('NetworkInterfaces')) if isinstance(i, dict)]
+    software = [s for s in _rows(record.get('InstalledSoftware')) if isinstance(s, dict)]
+    values = {
+        'hostname': [asset.get('Hostname')],
+        'owner': [record.get('OwnerName')],
+        'serial': [asset.get('SerialNumber')],
+        'model': [asset.get('Model')],
+        'ip': [i.get(key) for i in interfaces for key in ('IPv4', 'IPv6')],
+        'mac': [i.get('MAC') for i in interfaces],
+        'software': [s.get('Name') for s in software],
+        'version': [s.get('Version') for s in software],
+    }
+    return values, software
+
+
+# Field name -> tokenizer. Free text is split into words; serials also match
+# whole, addresses only match whole (or by prefix).
+FIELDS = {
+    'hostname': text_tokens,
+    'owner': text_tokens,
+    'serial': lambda value: text_tokens(value) + whole_token(value),
+    'model': text_tokens,
+    'ip': whole_token,
+    'mac': mac_tokens,
+    'software': text_tokens,
+    'version': whole_token,
+}
+
+
+def parse_query(q):
+    """Split q into (field or None, text, prefix, version op, version key) terms.
+
+    Terms are whitespace separated and all must match; quote a term to keep
+    its spaces. "field:" limits a term to one field, a trailing * matches
+    token prefixes, and software terms may end in a version comparison,
+    e.g. software:chrome<120 or 'software:"visual studio code">=1.90'.
+    """
+    try:
+        words = shlex.split(q)
+    except ValueError as e:
+        raise ValueError(f"invalid query: {e}") from None
+    terms = []
+    for word in words:
+        field, text, op, version = TERM_REGEX.match(word).groups()
+        if field is not None:
+            field = field.lower()
+            if field not in FIELDS:
+                raise ValueError(f"unknown search field: {field}")
+        if op is not None and field != 'software':
+            raise ValueError(f"version comparisons need a software: term: {word}")
+        prefix = text.endswith('*')
+        text = text.rstrip('*').strip('"\'')
+        if not text:
+            raise ValueError(f"empty search term: {word}")
+        terms.append((field, text, prefix, op, version_key(version) if op else None))
+    if not terms:
+        raise ValueError("q is required")
+    return terms
+
+
+class _Postings:
+    """token -> set of document ids for one field, with a sorted token list for prefix lookups.
+
+    New tokens are merged into the sorted list by sorted_tokens() (or it is
+    re-sorted if many arrived at once); tokens whose postings emptied are
+    skipped until the next full sort.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self._sorted = []
+        self._added = []
+
+    def add_all(self, tokens, doc):
+        postings = self.postings
+        for token in tokens:
+            docs = postings.get(token)
+            if docs is None:
+                docs = postings[token] = set()
+                self._added.append(token)
+            docs.add(doc)
+
+    def discard(self, token, doc):
+        docs = self.postings.get(token)
+        if docs is not None:
+            docs.discard(doc)
+            if not docs:
+                del self.postings[token]
+
+    def sorted_tokens(self):
+        if self._added:
+            if len(self._added) > 1000 or len(self._sorted) > 2 * len(self.postings) + 1000:
+                self._sorted = sorted(self.postings)
+            else:
+                for token in self._added:
+                    index = bisect.bisect_left(self._sorted, token)
+                    if index == len(self._sorted) or self._sorted[index] != token:
+                        self._sorted.insert(index, token)
+            self._added = []
+        return self._sorted
+
+    def match(self, token, prefix):
+        if not prefix:
+            return self.postings.get(token, set())
+        tokens = self.sorted_tokens()
+        matched = set()
+        for index in range(bisect.bisect_left(tokens, token), len(tokens)):
+            term = tokens[index]
+            if not term.startswith(token):
+                break
+            matched |= self.postings.get(term, ())
+        return matched
+
+
+class _Versions:
+    """Sorted (version key, doc id) pairs of the software whose name has one token.
+
+    Pairs added since the last lookup are merged in by the next one (sorted
+    all at once after a bulk load), so a version comparison is a binary
+    search for the range of matching keys.
+    """
+
+    def __init__(self):
+        self._sorted = []
+        self._added = []
+
+    def __len__(self):
+        return len(self._sorted) + len(self._added)
+
+    def add(self, version, doc):
+        self._added.append((version, doc))
+
+    def discard(self, version, doc):
+        pairs = self.sorted_pairs()
+        index = bisect.bisect_left(pairs, (version, doc))
+        if index < len(pairs) and pairs[index] == (version, doc):
+            del pairs[index]
+
+    def sorted_pairs(self):
+        if self._added:
+            if len(self._added) > 64:
+                self._sorted.extend(self._added)
+                self._sorted.sort()
+            else:
+                for pair in self._added:
+                    bisect.insort(self._sorted, pair)
+            self._added = []
+        return self._sorted
+
+    def docs(self, op, version):
+        pairs = self.sorted_pairs()
+        lo, hi = _version_range(pairs, op, version)
+        return {doc for _, doc in pairs[lo:hi]}
+
+
+class SearchIndex:
+    """Inverted index over the latest record of every asset.
+
+    Each asset's searchable fields are tokenized once. When the store's
+    version moves, only the assets it reports as changed are re-read and
+    re-tokenized (everything is rebuilt if it cannot say), and server.py
+    and app/app.py refresh right after an ingest so new records are
+    searchable at once. Queries intersect posting sets. Installed versions
+    are kept parsed and sorted per software-name token, so a version
+    comparison is a range lookup; a token's list is built by the first
+    comparison on it and then kept up to date with the postings. Only the
+    requested page of hits is sorted and projected.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version = None
+        self._fields = {field: _Postings() for field in FIELDS}
+        self._versions = {}    # software name token -> _Versions, for tokens compared so far
+        self._docs = {}        # doc id -> (record, {field: tokens}, [(name tokens, version)], sort key)
+        self._by_serial = {}   # serial -> doc id
+        self._next_doc = 0
+
+    def refresh(self):
+        """Bring the index up to date with the store; return the number of assets re-indexed."""
+        with self._lock:
+            version = self.store.version
+            if version == self._version:
+                return 0
+            serials = self.store.changed_since(self._version)
+            if serials is None or len(serials) > len(self._docs) // 2:
+                changed = self._rebuild()
+            else:
+                changed = 0
+                for serial in serials:
+                    latest = self.store.latest_for(serial)
+                    if latest is not None:
+                        changed += self._put(serial, latest[1])
+                    elif serial in self._by_serial:
+                        self._remove(self._by_serial[serial])
+                        changed += 1
+            # Merge new tokens now rather than in the first prefix query after an update
+            for postings in self._fields.values():
+                postings.sorted_tokens()
+            self._version = version
+            return changed
+
+    def _rebuild(self):
+        changed = 0
+        current = set()
+        for record in self.store.latest():
+            serial = record['AssetInformation']['SerialNumber']
+            current.add(serial)
+            changed += self._put(serial, record)
+        for serial in [serial for serial in self._by_serial if serial not in current]:
+            self._remove(self._by_serial[serial])
+            changed += 1
+        return changed
+
+    def _put(self, serial, record):
+        """Index record as serial's latest; return 1 if it was (re-)tokenized, else 0."""
+        doc = self._by_serial.get(serial)
+        if doc is not None and self._docs[doc][0].get('Timestamp') == record.get('Timestamp'):
+            # Same snapshot; keep the store's current object for results
+            self._docs[doc] = (record,) + self._docs[doc][1:]
+            return 0
+        if doc is not None:
+            self._remove(doc)
+        self._add(serial, record)
+        return 1
+
+    def _add(self, serial, record):
+        doc = self._next_doc
+        self._next_doc += 1
+        values, rows = _field_values(record)
+        tokens = {}
+        for field, tokenize in FIELDS.items():
+            field_tokens = set()
+            for value in values[field]:
+                if value not in (None, ''):
+                    field_tokens.update(tokenize(str(value)))
+            self._fields[field].add_all(field_tokens, doc)
+            tokens[field] = field_tokens
+        software = [(name_tokens(str(s.get('Name') or '')), str(s.get('Version') or '')) for s in rows]
+        for token, version in self._version_pairs(software):
+            self._versions[token].add(version, doc)
+        self._docs[doc] = (record, tokens, software, asset_sort_key(record))
+        self._by_serial[serial] = doc
+
+    def _remove(self, doc):
+        record, tokens, software, _ = self._docs.pop(doc)
+        del self._by_serial[record['AssetInformation']['SerialNumber']]
+        for field, field_tokens in tokens.items():
+            for token in field_tokens:
+                self._fields[field].discard(token, doc)
+        for token, version in self._version_pairs(software):
+            self._versions[token].discard(version, doc)
+
+    def _version_pairs(self, software, tokens=None):
+        """Return the (name token, version key) pairs of software, for tokens with a _Versions list."""
+        tokens = self._versions if tokens is None else tokens
+        pairs = set()
+        if not tokens:
+            return pairs
+        for names, installed in software:
+            for token in names:
+                if token in tokens:
+                    version = version_key(installed)
+                    if version:
+                        pairs.add((token, version))
+        return pairs
+
+    def _versions_for(self, token):
+        versions = self._versions.get(token)
+        if versions is None:
+            versions = self._versions[token] = _Versions()
+            for doc in self._fields['software'].postings.get(token, ()):
+                installed = {version_key(version) for names, version in self._docs[doc][2] if token in names}
+                for version in installed:
+                    if version:
+                        versions.add(version, doc)
+        return versions
+
+    def _match_term(self, field, text, prefix):
+        fields = [field] if field else list(FIELDS)
+        matched = set()
+        for name in fields:
+            tokens = FIELDS[name](text)
+            if not tokens:
+                continue
+            postings = self._fields[name]
+            # Every word of the term must match; a prefix only applies to the last one
+            docs = None
+            for i, token in enumerate(tokens):
+                found = postings.match(token, prefix and i == len(tokens) - 1)
+                docs = set(found) if docs is None else docs & found
+                if not docs:
+                    break
+            matched |= docs or set()
+        return matched
+
+    def _match_version(self, text, prefix, op, version):
+        """Return the docs with software named like text whose version satisfies "op version"."""
+        tokens = text_tokens(text)
+        if not tokens:
+            return set()
+        *words, last = tokens
+        names = [last]
+        if prefix:
+            sorted_names = self._fields['software'].sorted_tokens()
+            names = []
+            for index in range(bisect.bisect_left(sorted_names, last), len(sorted_names)):
+                if not sorted_names[index].startswith(last):
+                    break
+                names.append(sorted_names[index])
+        docs = set()
+        for name in names:
+            docs |= self._versions_for(name).docs(op, version)
+        if words:
+            # The other words must be in the name of the same software entry
+            docs = {doc for doc in docs if self._version_matches(self._docs[doc][2], words, last, prefix, op, version)}
+        return docs
+
+    @staticmethod
+    def _version_matches(software, words, last, prefix, op, version):
+        compare = VERSION_OPERATORS[op]
+        for names, installed in software:
+            if not (last in names or prefix and any(name.startswith(last) for name in names)):
+                continue
+            installed = version_key(installed)
+            if installed and all(word in names for word in words) and compare(installed, version):
+                return True
+        return False
+
+    def search(self, q, fields=None, limit=100, cursor=None):
+        """Return {total, results, next_cursor} for a query; see parse_query for the syntax."""
+        terms = parse_query(q)
+        after = decode_cursor(cursor, 2) if cursor is not None else None
+        self.refresh()
+        with self._lock:
+            # Most selective terms first so the intersection shrinks quickly
+            matches = [self._match_term(field, text, prefix) for field, text, prefix, _, _ in terms]
+            matches.extend(self._match_version(text, prefix, op, version)
+                           for _, text, prefix, op, version in terms if op is not None)
+            matches.sort(key=len)
+            docs = set(matches[0])
+            for found in matches[1:]:
+                docs &= found
+            total = len(docs)
+            # Only the requested page is sorted: hits come newest first, after the cursor
+            keys = [self._docs[doc][3] for doc in docs]
+            if after is not None:
+                keys = [key for key in keys if key < after]
+            page = heapq.nlargest(len(keys) if limit is None else limit + 1, keys)
+            records = [self._docs[self._by_serial[serial]][0] for _, serial in page[:limit]]
+        next_cursor = encode_cursor(list(page[limit - 1])) if limit is not None and len(page) > limit else None
+        projection = parse_fields(fields if fields is not None else DEFAULT_FIELDS)
+        return {'total': total, 'results': [project(record, projection) for record in records],
+                'next_cursor': next_cursor}
+
+    def stats(self):
+        with self._lock:
+            return {'assets': len(self._docs),
+                    'terms': {field: len(postings.postings) for field, postings in self._fields.items()}}
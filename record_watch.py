@@ -0,0 +1,119 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _open_inotify(directory):
+    """Return an inotify fd watching directory, or None when inotify is unavailable."""
+    if not sys.platform.startswith('linux') or not os.path.isdir(directory):
+        return None
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_events(fd):
+    """Yield (mask, name) for every queued inotify event."""
+    try:
+        buf = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return
+    offset = 0
+    while offset < len(buf):
+        _, mask, _, length = EVENT_HEADER.unpack_from(buf, offset)
+        offset += EVENT_HEADER.size
+        name = buf[offset:offset + length].rstrip(b'\0')
+        offset += length
+        yield mask, os.fsdecode(name)
+
+
+class RecordWatcher(threading.Thread):
+    """Background worker that keeps a RecordIndex in sync with its directory.
+
+    On Linux it follows inotify events and re-checks only the files named in
+    them; elsewhere (or on network shares inotify cannot watch) it falls back
+    to polling, where each pass is a stat-only scan that parses changed files.
+    Either way, request handlers only read from the index.
+    """
+
+    def __init__(self, index, poll_interval=2.0, rescan_interval=300.0):
+        super().__init__(name='record-watcher', daemon=True)
+        self.index = index
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        self._refresh()
+        fd = _open_inotify(self.index.records_dir)
+        if fd is None:
+            self._poll()
+        else:
+            try:
+                self._follow(fd)
+            finally:
+                os.close(fd)
+
+    def _refresh(self):
+        try:
+            self.index.refresh()
+        except Exception as e:
+            print(f"Error refreshing {self.index.records_dir}: {e}")
+
+    def _poll(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self._refresh()
+
+    def _follow(self, fd):
+        # Catch anything written between the first scan and the watch being added
+        self._refresh()
+        last_scan = time.monotonic()
+        while not self._stop_event.is_set():
+            # Periodic rescans cover events inotify cannot see, e.g. remote writers
+            if time.monotonic() - last_scan >= self.rescan_interval:
+                self._refresh()
+                last_scan = time.monotonic()
+            ready, _, _ = select.select([fd], [], [], 1.0)
+            if not ready:
+                continue
+            names = set()
+            overflow = False
+            for mask, name in _read_events(fd):
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name.endswith('.json'):
+                    names.add(name)
+            if overflow:
+                self._refresh()
+                last_scan = time.monotonic()
+                continue
+            for name in names:
+                try:
+                    self.index.update_path(os.path.join(self.index.records_dir, name))
+                except Exception as e:
+                    print(f"Error ingesting {name}: {e}")
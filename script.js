@@ -1,65 +1,25 @@
-async function fetchFileList() {
+// The latest record per owner, fetched in one round trip
+async function fetchAssetData() {
     try {
-        const response = await fetch('/Records', {
-            headers: { 'Accept': 'application/json' }
+        const response = await fetch('/api/records/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+            body: JSON.stringify({ latest: true })
         });
         if (!response.ok) {
-            throw new Error(`Failed to fetch file list: ${response.status} ${response.statusText}`);
+            throw new Error(`Failed to fetch records: ${response.status} ${response.statusText}`);
         }
         const data = await response.json();
         if (!Array.isArray(data)) {
-            throw new Error('File list response is not an array');
+            throw new Error('Batch response is not an array');
         }
-        return data.filter(file => file.endsWith('.json'));
+        return data.filter(record => !record.error);
     } catch (error) {
-        console.error('Error fetching file list:', error);
+        console.error('Error fetching asset data:', error);
         return [];
     }
 }
 
-function parseFilename(filename) {
-    const regex = /^SystemInfo_(.+)_(\d{4}-\d{2}-\d{2}_\d{2}_\d{2}_\d{2})\.json$/;
-    const match = filename.match(regex);
-    if (!match) return null;
-    return {
-        ownerName: match[1].replace(/_/g, ' '),
-        timestamp: match[2].replace(/_/g, ':'),
-        filename: filename
-    };
-}
-
-function getLatestFiles(fileList) {
-    const fileMap = new Map();
-    fileList.forEach(filename => {
-        const parsed = parseFilename(filename);
-        if (parsed) {
-            const current = fileMap.get(parsed.ownerName);
-            if (!current || new Date(parsed.timestamp.replace(/:/g, '-')) > new Date(current.timestamp.replace(/:/g, '-'))) {
-                fileMap.set(parsed.ownerName, parsed);
-            }
-        }
-    });
-    return Array.from(fileMap.values());
-}
-
-async function fetchAssetData() {
-    const fileList = await fetchFileList();
-    const latestFiles = getLatestFiles(fileList);
-    const assetData = [];
-    for (const file of latestFiles) {
-        try {
-            const response = await fetch(`/Records/${file.filename}`);
-            if (response.ok) {
-                const data = await response.json();
-                assetData.push(data);
-            }
-        } catch (error) {
-            console.error(`Error fetching ${file.filename}:`, error);
-        }
-    }
-    return assetData;
-}
-
 async function initializeApp() {
     const syncDataBtn = document.getElementById('syncDataBtn');
     const listViewBtn = document.getElementById('listViewBtn');
@@ -1,62 +1,586 @@
 from http.server import SimpleHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+import argparse
+import hashlib
 import json
 import os
-import glob
-from datetime import datetime
+import re
+import selectors
+import socket
+import threading
+import time
+from asset_db import open_store
+from fleet_stats import FleetStats
+from http_cache import CachedResponse, choose_encoding, gzip_stream, http_date, make_etag, not_modified
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_ERRORS, REQUEST_SECONDS, SERIALIZE_SECONDS, SlowRequestProfiler
+from record_batch import MAX_BATCH_BODY, batch_records, encode_items, parse_batch
+from record_history import asset_history
+from record_index import asset_sort_key
+from record_ingest import MAX_BODY_SIZE, IngestError, decode_body, open_ingestor, parse_body
+from record_query import parse_fields, project, paginate
+from record_search import SearchIndex
+from record_watch import RecordWatcher
+
+# RecordIndex over Records/, or a SQLite AssetStore when WIS_DB is set
+record_index = open_store('Records')
+
+def build_assets_body():
+    records = record_index.latest()
+    with SERIALIZE_SECONDS.time(endpoint='/api/assets'):
+        return json.dumps(records).encode()
+
+assets_response = CachedResponse(build_assets_body)
+
+class LatestRecords:
+    """The latest-per-asset list in asset_sort_key order, built once per store version.
+
+    Pages of /api/assets are cut from this shared list, so paging through
+    the fleet costs one latest() (a GROUP BY and a decode per asset with
+    WIS_DB) per data version rather than one per page.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version = None
+        self._records = []
+
+    def get(self, version):
+        with self._lock:
+            if self._version != version:
+                self._records = self.store.latest()
+                self._version = version
+            return self._records
+
+latest_records = LatestRecords(record_index)
+fleet_stats = FleetStats(record_index)
+search_index = SearchIndex(record_index)
+# Set in main; stays None for read-only stores
+ingestor = None
+# cProfile dumps of slow requests when WIS_PROFILE_SLOW_MS is set
+profiler = SlowRequestProfiler()
+store_gauge = REGISTRY.gauge('wis_store_info', 'Snapshots in the record store and its data version')
+
+HISTORY_PATH = re.compile(r'^/api/assets/([^/]+)/history$')
+API_ROUTES = ('/api/assets', '/api/stats', '/api/search', '/api/records', '/api/records/batch', '/metrics')
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands requests to a bounded pool of worker threads.
+
+    At most workers + backlog requests are in flight at once; beyond that
+    new connections get an immediate 503 instead of queueing without bound.
+    Between requests a keep-alive connection waits in a selector, not in a
+    worker, so idle clients cannot starve active ones. It goes back to the
+    pool when its next request arrives and is closed after idle_timeout
+    seconds without one, or at once when max_idle connections already wait.
+    """
+
+    def __init__(self, server_address, handler_class, workers=8, backlog=32, idle_timeout=15, max_idle=256):
+        self.request_queue_size = backlog
+        super().__init__(server_address, handler_class)
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        self._selector = selectors.DefaultSelector()
+        self._idle = {}          # socket -> (handler, deadline); only touched by the idle thread
+        self._parking = []       # handlers handed over by workers
+        self._parking_lock = threading.Lock()
+        self._closing = False
+        self._wakeup, self._wakeup_writer = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._idle_thread = threading.Thread(target=self._watch_idle, name='http-idle', daemon=True)
+        self._idle_thread.start()
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _reject(self, request):
+        try:
+            request.sendall(b'HTTP/1.1 503 Service Unavailable\r\n'
+                            b'Retry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _process_request(self, request, client_address):
+        try:
+            # Sets up the connection and serves its first request
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            self._slots.release()
+            return
+        self._after_request(handler)
+
+    def _process_next(self, handler):
+        try:
+            handler.handle()
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        self._after_request(handler)
+
+    def _after_request(self, handler):
+        try:
+            # Requests the client already sent are served without a round trip through the selector
+            while not handler.close_connection and self._has_input(handler):
+                try:
+                    handler.handle()
+                except Exception:
+                    self.handle_error(handler.request, handler.client_address)
+            if handler.close_connection or not self._park(handler):
+                self._close(handler)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _has_input(handler):
+        sock = handler.request
+        try:
+            sock.setblocking(False)
+            return bool(handler.rfile.peek(1))
+        except OSError:
+            handler.close_connection = True
+            return False
+        finally:
+            try:
+                sock.settimeout(handler.timeout)
+            except OSError:
+                pass
+
+    def _park(self, handler):
+        with self._parking_lock:
+            if self._closing:
+                return False
+            self._parking.append(handler)
+        try:
+            self._wakeup_writer.send(b'\0')
+        except BlockingIOError:
+            pass
+        return True
+
+    def _close(self, handler):
+        handler.close_connection = True
+        try:
+            handler.finish()
+        except Exception:
+            pass
+        self.shutdown_request(handler.request)
+
+    def _watch_idle(self):
+        while True:
+            timeout = min((deadline for _, deadline in self._idle.values()), default=None)
+            if timeout is not None:
+                timeout = max(0, timeout - time.monotonic())
+            try:
+                events = self._selector.select(timeout)
+            except (OSError, ValueError):
+                return
+            with self._parking_lock:
+                parking, self._parking = self._parking, []
+                closing = self._closing
+            if closing:
+                for handler, _ in self._idle.values():
+                    self._close(handler)
+                for handler in parking:
+                    self._close(handler)
+                self._selector.close()
+                return
+            for handler in parking:
+                if len(self._idle) >= self.max_idle:
+                    self._close(handler)
+                    continue
+                self._idle[handler.request] = (handler, time.monotonic() + self.idle_timeout)
+                self._selector.register(handler.request, selectors.EVENT_READ)
+            for key, _ in events:
+                if key.fileobj is self._wakeup:
+                    try:
+                        while self._wakeup.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                handler, _ = self._idle.pop(key.fileobj)
+                self._selector.unregister(key.fileobj)
+                if self._slots.acquire(blocking=False):
+                    self._executor.submit(self._process_next, handler)
+                else:
+                    handler.close_connection = True
+                    handler.finish()
+                    self._reject(handler.request)
+            now = time.monotonic()
+            for sock, (handler, deadline) in list(self._idle.items()):
+                if deadline <= now:
+                    del self._idle[sock]
+                    self._selector.unregister(sock)
+                    self._close(handler)
+
+    def server_close(self):
+        super().server_close()
+        with self._parking_lock:
+            self._closing = True
+        try:
+            self._wakeup_writer.send(b'\0')
+        except OSError:
+            pass
+        self._idle_thread.join(timeout=5)
+        self._wakeup.close()
+        self._wakeup_writer.close()
+        self._executor.shutdown(wait=False)
 
 class RequestHandler(SimpleHTTPRequestHandler):
+    # Headers and body go out in separate writes; with Nagle on, a kept-alive
+    # connection stalls on the client's delayed ACK before the body is sent
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=os.path.dirname(os.path.abspath(__file__)), **kwargs)
-    
+
+    def handle(self):
+        # One request per call; PooledHTTPServer holds the connection between requests
+        # instead of leaving this worker blocked on the next request line
+        self.close_connection = True
+        try:
+            self.handle_one_request()
+        except Exception:
+            self.close_connection = True
+            raise
+
+    def finish(self):
+        if self.close_connection:
+            super().finish()
+
     def do_GET(self):
-        if self.path == '/api/assets':
-            self.handle_assets()
+        self.instrumented(self.route_get)
+
+    def do_POST(self):
+        self.instrumented(self.route_post)
+
+    def instrumented(self, handler):
+        """Run a handler under the request timer and, when enabled, the slow-request profiler."""
+        url = urlsplit(self.path)
+        if url.path in API_ROUTES:
+            route = url.path
+        elif HISTORY_PATH.match(url.path):
+            route = '/api/assets/<serial>/history'
         else:
-            super().do_GET()
-    
-    def handle_assets(self):
-        records = []
-        for filepath in glob.glob('Records/*.json'):
+            route = 'static'
+        with profiler.profile(f'{self.command} {url.path}'), REQUEST_SECONDS.time(method=self.command, route=route):
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Extract timestamp from filename if not in JSON
-                    if 'Timestamp' not in data:
-                        filename = os.path.basename(filepath)
-                        try:
-                            dt_part = filename.split('_')[-1].replace('.json', '')
-                            data['Timestamp'] = datetime.strptime(dt_part, "%Y-%m-%d_%H_%M_%S").isoformat()
-                        except:
-                            data['Timestamp'] = datetime.now().isoformat()
-                    records.append(data)
-            except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                print(f"Error reading {filepath}: {str(e)}")
-                continue
-        
-        # Sort by timestamp (newest first)
-        records.sort(key=lambda x: x['Timestamp'], reverse=True)
-        
-        # Group by serial number, keeping only the latest
-        assets_map = {}
-        for record in records:
-            sn = record.get('AssetInformation', {}).get('SerialNumber')
-            if sn and (sn not in assets_map or 
-                       record['Timestamp'] > assets_map[sn]['Timestamp']):
-                assets_map[sn] = record
-        
+                handler(url)
+            except Exception:
+                REQUEST_ERRORS.inc(method=self.command, route=route)
+                raise
+
+    def route_get(self, url):
+        if url.path == '/api/assets':
+            self.handle_assets(url.query)
+        elif url.path == '/api/stats':
+            self.handle_stats(url.query)
+        elif url.path == '/api/search':
+            self.handle_search(url.query)
+        elif HISTORY_PATH.match(url.path):
+            self.handle_history(unquote(HISTORY_PATH.match(url.path).group(1)), url.query)
+        elif url.path == '/metrics':
+            self.handle_metrics()
+        else:
+            super().do_GET()
+
+    def route_post(self, url):
+        if url.path == '/api/records':
+            self.handle_ingest()
+        elif url.path == '/api/records/batch':
+            self.handle_batch(url.query)
+        else:
+            self.send_error(404)
+
+    def handle_metrics(self):
+        """Serve counters and timers in the Prometheus text format."""
+        store_gauge.set(record_index.version, field='version')
+        store_gauge.set(len(record_index.filenames()), field='snapshots')
+        body = REGISTRY.render()
+        self.send_response(200)
+        self.send_header('Content-type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_ingest(self):
+        """Accept one record, a JSON array or an NDJSON batch (optionally gzipped) at /api/records."""
+        if ingestor is None:
+            self.send_error(501, "This store is read-only")
+            return
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self.send_error(411)
+            return
+        if int(length) > MAX_BODY_SIZE:
+            self.send_error(413)
+            return
+        body = self.rfile.read(int(length))
+        try:
+            items = parse_body(decode_body(body, self.headers.get('Content-Encoding')),
+                               self.headers.get('Content-Type'))
+        except IngestError as e:
+            self.send_error(400, str(e))
+            return
+        result = ingestor.ingest(items)
+        if result['accepted']:
+            # Index the new records now rather than in the next search
+            search_index.refresh()
+        body = json.dumps(result).encode()
+
+        # A request where nothing could be used is the client's fault
+        self.send_response(400 if result['rejected'] and not (result['accepted'] or result['duplicates']) else 200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_batch(self, query_string):
+        """Stream many records in one response for POST /api/records/batch; see record_batch.parse_batch."""
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self.send_error(411)
+            return
+        if int(length) > MAX_BATCH_BODY:
+            self.send_error(413)
+            return
+        try:
+            kind, keys, fields = parse_batch(self.rfile.read(int(length)))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        ndjson = (parse_qs(query_string).get('format', [''])[0] == 'ndjson'
+                  or 'application/x-ndjson' in self.headers.get('Accept', ''))
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), encodings=('gzip',))
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson' if ndjson else 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.stream_body(encode_items(batch_records(record_index, kind, keys, fields), ndjson), gzip=bool(encoding))
+
+    def handle_assets(self, query_string):
+        version, last_modified = record_index.version, record_index.last_modified
+        if query_string:
+            variant = hashlib.sha1(query_string.encode()).hexdigest()[:12]
+            if not self.send_not_modified(make_etag(version, variant), last_modified):
+                self.handle_assets_page(parse_qs(query_string), version, variant, last_modified)
+            return
+        if self.send_not_modified(make_etag(version), last_modified):
+            return
+        body, encoding = assets_response.get(version).encoded(choose_encoding(self.headers.get('Accept-Encoding')))
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_cache_headers(make_etag(version, encoding or ''), last_modified, encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_stats(self, query_string):
+        """Serve /api/stats?group_by=&metric=&agg=&where=&bins= aggregations over latest assets."""
+        version, last_modified = record_index.version, record_index.last_modified
+        variant = 'stats-' + hashlib.sha1(query_string.encode()).hexdigest()[:12]
+        if self.send_not_modified(make_etag(version, variant), last_modified):
+            return
+        try:
+            result = fleet_stats.query(parse_qs(query_string))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        body = json.dumps(result).encode()
+
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_cache_headers(make_etag(version, variant), last_modified, None)
         self.end_headers()
-        self.wfile.write(json.dumps(list(assets_map.values())).encode())
+        self.wfile.write(body)
+
+    def handle_search(self, query_string):
+        """Serve /api/search?q=&fields=&limit=&cursor= from the search index."""
+        version, last_modified = record_index.version, record_index.last_modified
+        variant = 'search-' + hashlib.sha1(query_string.encode()).hexdigest()[:12]
+        if self.send_not_modified(make_etag(version, variant), last_modified):
+            return
+        query = parse_qs(query_string)
+        try:
+            limit = int(query['limit'][0]) if 'limit' in query else 100
+            if limit <= 0:
+                raise ValueError("limit must be positive")
+            result = search_index.search(query.get('q', [''])[0], query.get('fields', [None])[0],
+                                         limit, query.get('cursor', [None])[0])
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        body = json.dumps(result).encode()
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_cache_headers(make_etag(version, variant), last_modified, None)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_history(self, serial, query_string):
+        """Serve /api/assets/<serial>/history?from=&to=&fields= as a time series."""
+        version, last_modified = record_index.version, record_index.last_modified
+        variant = 'history-' + hashlib.sha1(f'{serial}?{query_string}'.encode()).hexdigest()[:12]
+        if self.send_not_modified(make_etag(version, variant), last_modified):
+            return
+        query = parse_qs(query_string)
+        try:
+            result = asset_history(record_index, serial, query.get('from', [None])[0],
+                                   query.get('to', [None])[0], query.get('fields', [None])[0])
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        body = json.dumps(result).encode()
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_cache_headers(make_etag(version, variant), last_modified, None)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_modified(self, etag, last_modified):
+        """Answer with 304 and return True if the client's copy is still current."""
+        if not not_modified(self.headers, etag, last_modified):
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', http_date(last_modified))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        return True
+
+    def send_cache_headers(self, etag, last_modified, encoding):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', http_date(last_modified))
+        # Clients may keep the body but must revalidate, which is a cheap 304
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+
+    def handle_assets_page(self, query, version, variant, last_modified):
+        """Serve /api/assets?limit=&cursor=&fields=&format=ndjson as a streamed response."""
+        try:
+            limit = int(query['limit'][0]) if 'limit' in query else None
+            if limit is not None and limit <= 0:
+                raise ValueError("limit must be positive")
+            fields = parse_fields(query.get('fields', [''])[0])
+            page, next_cursor = paginate(latest_records.get(version), asset_sort_key, limit,
+                                         query.get('cursor', [None])[0])
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        ndjson = (query.get('format', [''])[0] == 'ndjson'
+                  or 'application/x-ndjson' in self.headers.get('Accept', ''))
+        if ndjson:
+            chunks = (json.dumps(project(record, fields)) + '\n' for record in page)
+        else:
+            chunks = self._json_array(project(record, fields) for record in page)
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson' if ndjson else 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'X-Next-Cursor')
+        if next_cursor:
+            self.send_header('X-Next-Cursor', next_cursor)
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), encodings=('gzip',))
+        self.send_cache_headers(make_etag(version, variant + ('-gzip' if encoding else '')), last_modified, encoding)
+        self.stream_body(chunks, gzip=bool(encoding))
+
+    @staticmethod
+    def _json_array(items):
+        yield '['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + json.dumps(item)
+        yield ']'
+
+    def stream_body(self, chunks, gzip=False, buffer_size=64 * 1024):
+        """Finish the headers and write chunks as they are produced.
+
+        HTTP/1.1 clients get chunked transfer encoding so the connection can be
+        kept alive; otherwise the body is delimited by closing the connection.
+        """
+        chunked = self.protocol_version >= 'HTTP/1.1' and self.request_version >= 'HTTP/1.1'
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+
+        def flush(data, last=False):
+            if chunked:
+                frame = b'%x\r\n%s\r\n' % (len(data), data) if data else b''
+                # The final chunk and the terminator leave in one write
+                self.wfile.write(frame + b'0\r\n\r\n' if last else frame)
+            elif data:
+                self.wfile.write(data)
+
+        data_chunks = (chunk.encode() for chunk in chunks)
+        if gzip:
+            data_chunks = gzip_stream(data_chunks)
+        buffer = []
+        size = 0
+        for data in data_chunks:
+            buffer.append(data)
+            size += len(data)
+            if size >= buffer_size:
+                flush(b''.join(buffer))
+                buffer, size = [], 0
+        flush(b''.join(buffer), last=True)
 
 if __name__ == '__main__':
-    port = 8000
-    server = HTTPServer(('localhost', port), RequestHandler)
-    print(f'Server running at http://localhost:{port}')
+    parser = argparse.ArgumentParser(description='Serve the asset dashboard, /api/assets, /api/search and POST /api/records.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=8, help='worker threads handling connections')
+    parser.add_argument('--backlog', type=int, default=32,
+                        help='connections allowed to wait for a worker before new ones get 503')
+    parser.add_argument('--keep-alive', type=float, default=15,
+                        help='idle seconds before a keep-alive connection is closed; 0 disables keep-alive')
+    args = parser.parse_args()
+
+    ingestor = open_ingestor(record_index, 'Records')
+    if args.keep_alive > 0:
+        RequestHandler.protocol_version = 'HTTP/1.1'
+        # Bounds a request that has started arriving; idle connections wait in the server's selector
+        RequestHandler.timeout = args.keep_alive
+    server = PooledHTTPServer((args.host, args.port), RequestHandler, workers=args.workers, backlog=args.backlog,
+                              idle_timeout=args.keep_alive)
+    watcher = RecordWatcher(record_index)
+    watcher.start()
+    print(f'Server running at http://{args.host}:{args.port} ({args.workers} workers)')
     print('Serving from:', os.path.dirname(os.path.abspath(__file__)))
     try:
         server.serve_forever()
     except KeyboardInterrupt:
+        watcher.stop()
         server.shutdown()
-        print("\nServer stopped")
\ No newline at end of file
+        if ingestor is not None:
+            ingestor.close()
+        server.server_close()
+        print("\nServer stopped")
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+# Shaped after GetInfoJsonFile.ps1 output; values are drawn from these pools
+MODELS = [
+    ('Dell Inc.', 'Latitude 5420', 'Laptop'), ('Dell Inc.', 'OptiPlex 7090', 'Desktop'),
+    ('HP', 'EliteBook 840 G8', 'Laptop'), ('HP', 'ProDesk 400 G7', 'Desktop'),
+    ('LENOVO', 'ThinkPad T14 Gen 2', 'Laptop'), ('LENOVO', 'ThinkCentre M70q', 'Desktop'),
+]
+OS_BUILDS = [
+    ('Microsoft Windows 10 Pro', '10.0.19045', '19045'),
+    ('Microsoft Windows 11 Pro', '10.0.22631', '22631'),
+    ('Microsoft Windows 11 Enterprise', '10.0.26100', '26100'),
+]
+PROCESSORS = [
+    'Intel(R) Core(TM) i5-1135G7 @ 2.40GHz (4 cores / 8 threads @ 2.42 GHz)',
+    'Intel(R) Core(TM) i7-1185G7 @ 3.00GHz (4 cores / 8 threads @ 3 GHz)',
+    'AMD Ryzen 5 PRO 5650U with Radeon Graphics (6 cores / 12 threads @ 2.3 GHz)',
+]
+FIRST_NAMES = ['Aarav', 'Sita', 'Ram', 'Priya', 'John', 'Maria', 'Anil', 'Gita', 'Hari', 'Laxmi', 'Wei', 'Fatima']
+LAST_NAMES = ['Sharma', 'Thapa', 'Gurung', 'Shrestha', 'Doe', 'Garcia', 'Karki', 'Rai', 'Chen', 'Khan']
+PUBLISHERS = ['Microsoft Corporation', 'Google LLC', 'Mozilla', 'Adobe Inc.', 'Zoom Video Communications, Inc.',
+              'Igor Pavlov', 'Notepad++ Team', 'Oracle Corporation', 'Cisco Systems, Inc.', 'Python Software Foundation']
+COMMON_SOFTWARE = ['Google Chrome', 'Mozilla Firefox', 'Microsoft Edge', 'Microsoft 365 Apps for enterprise - en-us',
+                   'Microsoft Visual C++ 2015-2022 Redistributable (x64)', 'Zoom', '7-Zip 23.01 (x64)',
+                   'Adobe Acrobat Reader', 'Notepad++ (64-bit x64)', 'Microsoft Teams', 'Cisco Secure Client',
+                   'Python 3.11.7 (64-bit)', 'Microsoft Visual Studio Code', 'Java 8 Update 391', 'VLC media player']
+VENDOR_PREFIXES = [('00-16-3E', 'Intel'), ('00-F4-8D', 'Realtek'), ('F8-75-A4', 'LCFC(HeFei) Electronics'),
+                   ('3C-52-82', 'Hewlett Packard'), ('D8-BB-C1', 'Micro-Star International')]
+
+
+def _version(rng):
+    return f'{rng.randint(1, 130)}.{rng.randint(0, 9)}.{rng.randint(0, 9999)}'
+
+
+class _Asset:
+    """Hardware and software of one machine, drifting a little between snapshots."""
+
+    def __init__(self, number, rng, software_sizes):
+        self.rng = rng
+        manufacturer, model, asset_type = rng.choice(MODELS)
+        os_name, version, build = rng.choice(OS_BUILDS)
+        # Numbered so every asset has its own owner, as latest-per-owner views expect
+        self.owner = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {number}'
+        self.info = {
+            'Hostname': f'WS-{number:05d}', 'AssetType': asset_type, 'LastUser': f'CORP\\user{number}',
+            'OS': os_name, 'Version': version, 'Build': build, 'Domain': 'corp.example.com',
+            'Manufacturer': manufacturer, 'Model': model, 'SerialNumber': f'SYN{number:07d}',
+            'Processor': rng.choice(PROCESSORS), 'Motherboard': f'{manufacturer} 0{rng.randint(100, 999)}',
+            'Graphics': 'Intel(R) Iris(R) Xe Graphics', 'Audio': 'Realtek High Definition Audio',
+            'Antivirus': 'Windows Defender (Enabled)', 'Firewall': 'Domain: True, Private: True, Public: True',
+        }
+        self.modules = [8] * rng.choice([1, 2])
+        self.disk_gb = rng.choice([238.47, 476.94, 953.87])
+        self.used_gb = self.disk_gb * rng.uniform(0.2, 0.7)
+        self.health = rng.uniform(80, 100)
+        prefix, vendor = rng.choice(VENDOR_PREFIXES)
+        self.interfaces = [('Wi-Fi', f'{prefix}-{number >> 8 & 255:02X}-{number & 255:02X}-01', vendor),
+                           ('Ethernet', f'{prefix}-{number >> 8 & 255:02X}-{number & 255:02X}-02', vendor)]
+        self.ip = f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}'
+        count = rng.randint(*software_sizes)
+        names = COMMON_SOFTWARE[:min(count, len(COMMON_SOFTWARE))]
+        names += [f'Line of Business App {rng.randint(1, 5000)}' for _ in range(count - len(names))]
+        self.software = [{'Name': name, 'Version': _version(rng), 'Publisher': rng.choice(PUBLISHERS),
+                          'InstallDate': f'2023{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}',
+                          'Scope': 'System-wide' if rng.random() < 0.9 else 'User-only'} for name in names]
+
+    def step(self):
+        """Advance one snapshot: disks fill, batteries wear, software updates now and then."""
+        rng = self.rng
+        self.used_gb = min(self.disk_gb * 0.98, self.used_gb + rng.uniform(-0.5, 1.5))
+        self.health = max(40.0, self.health - rng.uniform(0, 0.1))
+        if rng.random() < 0.01:
+            self.modules.append(8)
+        for software in self.software:
+            if rng.random() < 0.02:
+                software['Version'] = _version(rng)
+
+    def record(self, timestamp):
+        rng = self.rng
+        free = self.disk_gb - self.used_gb
+        record = {
+            'Timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'OwnerName': self.owner,
+            'AssetInformation': dict(self.info),
+            'MemoryInformation': {
+                'Modules': [{'CapacityGB': size, 'SpeedMHz': 3200, 'RAMType': 'DDR4', 'ModuleType': 'SODIMM',
+                             'Manufacturer': 'Samsung', 'PartNumber': 'M471A1K43DB1-CWE'} for size in self.modules],
+                'TotalMemoryGB': sum(self.modules),
+            },
+            'PhysicalDisks': [{'Model': 'NVMe SAMSUNG MZVL2512', 'MediaType': 'SSD', 'BusType': 'NVMe',
+                               'SizeGB': self.disk_gb, 'DriveLetters': 'C', 'Status': 'Healthy'}],
+            'LogicalDrives': [{'DriveLetter': 'C', 'VolumeLabel': 'Windows', 'FileSystem': 'NTFS',
+                               'TotalSizeGB': round(self.disk_gb, 2), 'UsedSpaceGB': round(self.used_gb, 2),
+                               'FreeSpaceGB': round(free, 2),
+                               'UsedPercent': round(self.used_gb / self.disk_gb * 100, 2)}],
+            'NetworkInterfaces': [{'Name': name, 'Status': 'Up' if name == 'Wi-Fi' else 'Disconnected',
+                                   'IPv4': self.ip if name == 'Wi-Fi' else '',
+                                   'IPv6': f'fe80::{rng.randint(0, 0xffff):x}' if name == 'Wi-Fi' else '',
+                                   'MAC': mac, 'Vendor': vendor} for name, mac, vendor in self.interfaces],
+            'BatteryInformation': None,
+            'MonitorInformation': [{'FriendlyName': 'DELL P2422H', 'Manufacturer': 'Dell Inc.', 'ProductCode': 'A0F3',
+                                    'SerialNumber': f'MON{self.info["SerialNumber"][3:]}', 'ScreenSizeInch': 23.8,
+                                    'NativeResolution': '1920 x 1080', 'YearOfManufacture': 2022}],
+            'InstalledSoftware': [dict(software) for software in self.software],
+        }
+        if self.info['AssetType'] == 'Laptop':
+            record['BatteryInformation'] = {
+                'Model': '5B10W13930', 'Manufacturer': 'SMP', 'EstimatedChargeRemainingPercent': rng.randint(5, 100),
+                'BatteryHealthPercent': round(self.health, 2), 'DesignedCapacityWh': 50.0,
+                'FullChargedCapacityWh': round(50.0 * self.health / 100, 2), 'CycleCount': rng.randint(10, 900),
+            }
+        return record
+
+
+def generate_fleet(records_dir, assets, snapshots, software_sizes=(20, 200), seed=0,
+                   start=datetime(2024, 1, 1, 8, 0, 0), interval=timedelta(days=1)):
+    """Write assets x snapshots SystemInfo_<Owner>_<timestamp>.json files; return the file count.
+
+    Files are written the way the PowerShell collector writes them (UTF-8
+    with BOM, four-space indented), each asset with its own owner, serial
+    and a software list sized uniformly within software_sizes.
+    """
+    os.makedirs(records_dir, exist_ok=True)
+    rng = random.Random(seed)
+    count = 0
+    for number in range(assets):
+        asset = _Asset(number, rng, software_sizes)
+        # Spread check-ins over the day so timestamps do not all collide
+        offset = timedelta(seconds=rng.randint(0, 8 * 3600))
+        for index in range(snapshots):
+            if index:
+                asset.step()
+            timestamp = start + offset + interval * index
+            record = asset.record(timestamp)
+            filename = f"SystemInfo_{asset.owner}_{record['Timestamp'].replace(':', '_').replace(' ', '_')}.json"
+            with open(os.path.join(records_dir, filename), 'w', encoding='utf-8-sig') as f:
+                json.dump(record, f, indent=4)
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic Records directory for benchmarks.')
+    parser.add_argument('records_dir', help='directory to write SystemInfo_*.json files into')
+    parser.add_argument('--assets', type=int, default=100)
+    parser.add_argument('--snapshots', type=int, default=10, help='snapshots per asset')
+    parser.add_argument('--software-min', type=int, default=20, help='fewest installed programs per asset')
+    parser.add_argument('--software-max', type=int, default=200, help='most installed programs per asset')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    count = generate_fleet(args.records_dir, args.assets, args.snapshots,
+                           (args.software_min, args.software_max), args.seed)
+    print(f"Wrote {count} records to {args.records_dir}")
@@ -0,0 +1,43 @@
+"""Speaks PowerShellHost's stdin/stdout protocol with a few canned commands, for tests off Windows.
+
+echo TEXT answers TEXT, pid answers the process id, sleep SECONDS answers
+after a delay, fail MESSAGE answers with an error, noise writes an
+unframed line before answering and exit quits without answering.
+"""
+import json
+import os
+import sys
+import time
+
+FRAME_MARKER = "\x1eWIS "
+
+
+def answer(request_id, output=None, error=None):
+    response = {"id": request_id, "ok": error is None}
+    if error is None:
+        response["output"] = output
+    else:
+        response["error"] = error
+    sys.stdout.write(FRAME_MARKER + json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+
+for line in sys.stdin:
+    request = json.loads(line)
+    command, _, argument = request["script"].partition(" ")
+    if command == "echo":
+        answer(request["id"], argument + "\n")
+    elif command == "pid":
+        answer(request["id"], f"{os.getpid()}\n")
+    elif command == "sleep":
+        time.sleep(float(argument))
+        answer(request["id"], "")
+    elif command == "fail":
+        answer(request["id"], error=argument)
+    elif command == "noise":
+        sys.stdout.write("WARNING: something unframed\n")
+        answer(request["id"], argument + "\n")
+    elif command == "exit":
+        sys.exit(0)
+    else:
+        answer(request["id"], error=f"unknown command {command}")
@@ -0,0 +1,100 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from synthetic_fleet import generate_fleet
+
+try:
+    import flask
+except ImportError:
+    flask = None
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'app.py')
+
+
+def load_app(app_dir):
+    """Import app/app.py afresh with its Records directory next to app_dir."""
+    cwd = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        spec = importlib.util.spec_from_file_location('wis_app', APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['wis_app'] = module
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+    module.app.config['WIS_BACKGROUND'] = False
+    return module
+
+
+@unittest.skipUnless(flask, 'Flask is not installed')
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records_dir = os.path.join(self.tmp.name, 'Records')
+        os.makedirs(os.path.join(self.tmp.name, 'app'))
+        generate_fleet(self.records_dir, assets=3, snapshots=2, software_sizes=(5, 10))
+        self.env = {name: os.environ.pop(name) for name in ('WIS_DB', 'WIS_ARCHIVE') if name in os.environ}
+        self.wis = load_app(os.path.join(self.tmp.name, 'app'))
+        self.wis.record_index.refresh()
+        self.client = self.wis.app.test_client()
+
+    def tearDown(self):
+        sys.modules.pop('wis_app', None)
+        os.environ.update(self.env)
+        close = getattr(self.wis.record_index, 'close', None)
+        if close is not None:
+            close()
+        self.tmp.cleanup()
+
+    def latest_filenames(self):
+        return sorted(filename for filename, _ in self.wis.record_index.latest_by_owner())
+
+    def rewrite(self, filename, **changes):
+        path = os.path.join(self.records_dir, filename)
+        with open(path, encoding='utf-8-sig') as f:
+            record = json.load(f)
+        record.update(changes)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.wis.record_index.refresh()
+
+    def test_list_rows_are_rendered_once_per_record(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.wis.row_cache.stats()['entries'], 3)
+        misses = self.wis.row_cache.misses
+
+        first = self.latest_filenames()[0]
+        self.rewrite(first, OwnerName='Renamed Owner')
+        response = self.client.get('/')
+        self.assertIn(b'Renamed Owner', response.data)
+        # Only the rewritten file's row was rendered again
+        self.assertEqual(self.wis.row_cache.misses, misses + 1)
+        self.assertEqual(self.wis.row_cache.hits, 2)
+
+    def test_detail_pages_are_reused_until_the_file_changes(self):
+        filename = self.latest_filenames()[0]
+        for _ in range(2):
+            response = self.client.get(f'/asset/{filename}')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.wis.detail_cache.misses, self.wis.detail_cache.hits), (1, 1))
+
+        self.rewrite(filename, OwnerName='Renamed Owner')
+        response = self.client.get(f'/asset/{filename}')
+        self.assertIn(b'Renamed Owner', response.data)
+        self.assertEqual(self.wis.detail_cache.misses, 2)
+
+        self.assertEqual(self.client.get('/asset/SystemInfo_Nobody_2025-01-01_08_00_00.json').status_code, 404)
+        stats = self.client.get('/records/cache-stats').get_json()
+        self.assertEqual(stats['details']['entries'], 2)
+        self.assertEqual(stats['rows']['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+from asset_db import AssetStore
+from synthetic_fleet import generate_fleet
+
+
+class AssetStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records_dir = os.path.join(self.tmp.name, 'Records')
+        generate_fleet(self.records_dir, assets=3, snapshots=2, software_sizes=(5, 10))
+        self.store = AssetStore(os.path.join(self.tmp.name, 'assets.db'), self.records_dir)
+        self.store.refresh()
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_removing_an_unknown_file_keeps_the_version(self):
+        version = self.store.version
+        self.assertEqual(self.store.update_path(os.path.join(self.records_dir, 'SystemInfo_Nobody.json')), 0)
+        self.assertEqual(self.store.version, version)
+
+    def test_removing_an_imported_file_bumps_the_version(self):
+        filename = sorted(self.store.filenames())[0]
+        version = self.store.version
+        os.remove(os.path.join(self.records_dir, filename))
+        self.assertEqual(self.store.update_path(os.path.join(self.records_dir, filename)), 1)
+        self.assertGreater(self.store.version, version)
+        self.assertIsNone(self.store.get(filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+import main
+from powershell_host import FakePowerShell
+from wmi_session import FakeWmiConnection
+
+POWER_TIME_UNLIMITED = -2
+
+
+def fake_psutil(battery=None):
+    return SimpleNamespace(
+        POWER_TIME_UNLIMITED=POWER_TIME_UNLIMITED,
+        sensors_battery=lambda: battery,
+        disk_partitions=lambda: [SimpleNamespace(device='C:\\', mountpoint='C:\\', fstype='NTFS', opts='rw,fixed')],
+        disk_usage=lambda mountpoint: SimpleNamespace(total=500 * 1024 ** 3, used=200 * 1024 ** 3,
+                                                      free=300 * 1024 ** 3, percent=40.0),
+    )
+
+
+def wmi_classes(chassis_type):
+    return {
+        'Win32_SystemEnclosure': [{'ChassisTypes': [chassis_type]}],
+        'Win32_PhysicalMemory': [{'Capacity': str(8 * 1024 ** 3), 'Speed': 3200, 'SMBIOSMemoryType': 26,
+                                  'FormFactor': 12, 'Manufacturer': 'Samsung', 'PartNumber': 'M471A1K43DB1 '}] * 2,
+        'BatteryStaticData': [{'Name': '5B10W13930', 'Manufacturer': 'SMP', 'DesignedCapacity': 50000}],
+    }
+
+
+POWERSHELL_OUTPUTS = {
+    'Get-MpComputerStatus': 'True\n',
+    'Get-NetFirewallProfile': 'Domain   True\nPrivate  True\nPublic   True\n',
+    'Get-PhysicalDisk': '{"DeviceId": "0", "FriendlyName": "NVMe SAMSUNG MZVL2512", "MediaType": "SSD", '
+                        '"BusType": "NVMe", "Size": 512110190592}',
+}
+
+
+class CollectorTest(unittest.TestCase):
+    def configure(self, chassis_type, battery=None):
+        connection = FakeWmiConnection(wmi_classes(chassis_type))
+        self.powershell = FakePowerShell(POWERSHELL_OUTPUTS)
+        main.configure(wmi_connect=lambda namespace: connection, powershell_runner=self.powershell,
+                       psutil_module=fake_psutil(battery), screeninfo_module=SimpleNamespace(get_monitors=list))
+        return connection
+
+    def test_a_full_run_queries_each_wmi_class_once(self):
+        connection = self.configure(chassis_type=10)
+        system_info = main.collect_system_info()
+        self.assertEqual(sorted(connection.calls), sorted(set(connection.calls)))
+        # The chassis and computer system classes are read by several sections
+        self.assertIn('Win32_SystemEnclosure', connection.calls)
+        wmi = system_info['collection_stats']['wmi']
+        self.assertEqual(wmi['queries'], len(connection.calls))
+        self.assertGreater(wmi['cache_hits'], 0)
+
+        # The next run starts a fresh session
+        main.collect_system_info(main.select_sections('asset'))
+        self.assertEqual(connection.calls.count('Win32_BIOS'), 2)
+
+    def test_desktop_has_no_battery_information(self):
+        self.configure(chassis_type=3)
+        system_info = main.collect_system_info(main.select_sections('battery'))
+        self.assertEqual(system_info['battery_information'], {})
+
+    def test_laptop_battery_information(self):
+        self.configure(chassis_type=10, battery=SimpleNamespace(power_plugged=True, secsleft=POWER_TIME_UNLIMITED,
+                                                                percent=81))
+        battery = main.collect_system_info(main.select_sections('battery'))['battery_information']
+        self.assertEqual(battery['current_state'], 'Charging')
+        self.assertEqual(battery['percent'], 81)
+        self.assertEqual(battery['designed_capacity_wh'], 50.0)
+
+    def test_select_sections_accepts_names_aliases_and_groups(self):
+        self.assertEqual([section.name for section in main.select_sections('monitors, asset,memory_information')],
+                         ['asset_information', 'memory_information', 'monitor_information'])
+        self.assertEqual([section.name for section in main.select_sections('volatile,DRIVES')],
+                         ['logical_drives', 'network_interfaces', 'battery_information'])
+        self.assertEqual(main.select_sections('all'), main.SECTIONS)
+        with self.assertRaisesRegex(ValueError, 'unknown section: printers'):
+            main.select_sections('asset,printers')
+        with self.assertRaises(ValueError):
+            main.select_sections(' , ')
+
+    def test_only_selected_sections_run(self):
+        connection = self.configure(chassis_type=3)
+        system_info = main.collect_system_info(main.select_sections('memory,drives'))
+        self.assertEqual(set(system_info), {'timestamp', 'memory_information', 'logical_drives', 'collection_stats'})
+        self.assertEqual(system_info['memory_information']['total_memory_gb'], 16.0)
+        self.assertEqual(system_info['logical_drives'][0]['used_percent'], 40.0)
+        self.assertEqual(set(system_info['collection_stats']['sections']), {'memory_information', 'logical_drives'})
+        # The drives section reads the disk/partition joins; nothing else is probed
+        self.assertEqual(set(connection.calls), {'Win32_PhysicalMemory', 'Win32_LogicalDisk',
+                                                 'Win32_DiskDriveToDiskPartition', 'Win32_LogicalDiskToPartition'})
+        self.assertEqual(self.powershell.calls, [])
+
+    def test_antivirus_and_firewall_are_reported_in_asset_information(self):
+        self.configure(chassis_type=3)
+        system_info = main.collect_system_info(main.select_sections('antivirus,firewall'))
+        self.assertEqual(system_info['asset_information'], {
+            'antivirus': 'Windows Defender (Enabled)',
+            'firewall': 'Domain   True, Private  True, Public   True',
+        })
+        self.assertEqual(system_info['collection_stats']['sections']['firewall']['state'], 'ok')
+
+    def test_cli_writes_the_document_to_stdout(self):
+        self.configure(chassis_type=10)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            main.main(['--sections', 'battery,memory', '--output', '-', '--no-cache'])
+        system_info = json.loads(stdout.getvalue())
+        self.assertEqual(set(system_info), {'timestamp', 'memory_information', 'battery_information',
+                                            'collection_stats'})
+
+    def test_cli_writes_a_file(self):
+        self.configure(chassis_type=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'system_info.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.main(['--sections', 'battery', '--output', output, '--no-cache'])
+            with open(output) as f:
+                self.assertEqual(json.load(f)['battery_information'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
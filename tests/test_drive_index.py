@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+from drive_index import NETWORK_DRIVE, DriveIndex, reference_id
+from wmi_session import FakeWmiConnection
+
+
+def partition_path(disk, partition):
+    return f'\\\\WS-00001\\root\\cimv2:Win32_DiskPartition.DeviceID="Disk #{disk}, Partition #{partition}"'
+
+
+def logical_path(letter):
+    return f'\\\\WS-00001\\root\\cimv2:Win32_LogicalDisk.DeviceID="{letter}:"'
+
+
+CLASSES = {
+    'Win32_LogicalDisk': [
+        {'DeviceID': 'D:', 'Size': 1000, 'DriveType': 3},
+        {'DeviceID': 'C:', 'Size': 500, 'DriveType': 3},
+        {'DeviceID': 'E:', 'Size': 2000, 'DriveType': 3},
+        {'DeviceID': 'Z:', 'Size': 4000, 'DriveType': NETWORK_DRIVE},
+        {'DeviceID': 'R:', 'Size': None, 'DriveType': 5},
+        {'DeviceID': None, 'Size': 1, 'DriveType': 3},
+    ],
+    'Win32_DiskDriveToDiskPartition': [
+        {'Antecedent': 'Win32_DiskDrive', 'Dependent': partition_path(0, 0)},
+        {'Antecedent': 'Win32_DiskDrive', 'Dependent': partition_path(0, 1)},
+        {'Antecedent': 'Win32_DiskDrive', 'Dependent': partition_path(1, 0)},
+        {'Antecedent': 'Win32_DiskDrive', 'Dependent': 'not an object path'},
+    ],
+    'Win32_LogicalDiskToPartition': [
+        {'Antecedent': partition_path(0, 1), 'Dependent': logical_path('D')},
+        {'Antecedent': partition_path(0, 0), 'Dependent': logical_path('C')},
+        # Already-resolved objects rather than paths
+        {'Antecedent': SimpleNamespace(DeviceID='Disk #1, Partition #0'), 'Dependent': SimpleNamespace(DeviceID='E:')},
+    ],
+}
+
+
+class DriveIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = FakeWmiConnection(CLASSES)
+        self.index = DriveIndex(lambda class_name: self.connection.query(f'SELECT * FROM {class_name}'))
+
+    def test_drive_letters_per_disk(self):
+        self.assertEqual(self.index.drive_letters(0), 'C, D')
+        self.assertEqual(self.index.drive_letters(1), 'E')
+        self.assertEqual(self.index.drive_letters(2), '')
+
+    def test_local_drives_skip_network_and_empty_drives(self):
+        self.assertEqual([ld.DeviceID for ld in self.index.local_drives()], ['C:', 'D:', 'E:'])
+
+    def test_each_class_is_queried_once(self):
+        for disk in (0, 1, 0):
+            self.index.drive_letters(disk)
+        self.index.local_drives()
+        self.assertEqual(sorted(self.connection.calls), sorted(CLASSES))
+
+    def test_reference_id(self):
+        self.assertEqual(reference_id(partition_path(3, 2)), 'Disk #3, Partition #2')
+        self.assertEqual(reference_id('Win32_Volume.DeviceID="\\\\\\\\?\\\\Volume{1}\\\\"'), '\\\\?\\Volume{1}\\')
+        self.assertEqual(reference_id('Win32_X.DeviceID="say \\"hi\\""'), 'say "hi"')
+        self.assertIsNone(reference_id(None))
+        self.assertIsNone(reference_id('Win32_DiskDrive'))
+
+
+if __name__ == '__main__':
+    unittest.main()
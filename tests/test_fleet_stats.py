@@ -0,0 +1,154 @@
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from asset_db import AssetStore
+from fleet_stats import FleetStats
+from record_index import ChangeLog, RecordIndex, record_metrics
+from synthetic_fleet import generate_fleet
+
+
+def stats_query(stats, **params):
+    return stats.query({name: value if isinstance(value, list) else [value] for name, value in params.items()})
+
+
+class CountingIndex(RecordIndex):
+    rebuilds = 0
+
+    def latest_metrics(self):
+        self.rebuilds += 1
+        return super().latest_metrics()
+
+
+class FleetStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records_dir = os.path.join(self.tmp.name, 'Records')
+        generate_fleet(self.records_dir, assets=30, snapshots=2, software_sizes=(5, 10))
+        self.index = CountingIndex(self.records_dir, workers=1)
+        self.index.refresh()
+        self.stats = FleetStats(self.index)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def snapshot(self, serial):
+        filename, record = self.index.latest_for(serial)
+        return filename, dict(record)
+
+    def assert_matches_a_fresh_frame(self, *queries):
+        fresh = FleetStats(RecordIndex(self.records_dir, workers=1))
+        fresh.store.refresh()
+        for params in queries:
+            # Groups that tie may come back in either order
+            result, expected = stats_query(self.stats, **params), stats_query(fresh, **params)
+            for found in (result, expected):
+                found['groups'].sort(key=lambda group: (group['count'], group['key'] or ''))
+            self.assertEqual(result, expected, params)
+
+    def test_group_by_and_filters(self):
+        records = self.index.latest()
+        result = stats_query(self.stats, group_by='model')
+        self.assertEqual(result['assets'], 30)
+        self.assertEqual(sum(group['count'] for group in result['groups']), 30)
+        models = {record['AssetInformation']['Model'] for record in records}
+        self.assertEqual({group['key'] for group in result['groups']}, models)
+
+        ram = [record_metrics(record)[0] for record in records]
+        result = stats_query(self.stats, metric='ram_gb', agg='mean')
+        self.assertAlmostEqual(result['groups'][0]['value'], round(math.fsum(ram) / len(ram), 2))
+
+        result = stats_query(self.stats, where=['ram_gb>=16', 'asset_type==Laptop'])
+        expected = sum(1 for record in records
+                       if record_metrics(record)[0] >= 16 and record['AssetInformation']['AssetType'] == 'Laptop')
+        self.assertEqual(result['matched'], expected)
+
+        histogram = stats_query(self.stats, metric='max_used_percent', bins='4')['histogram']
+        self.assertEqual(len(histogram['edges']), 5)
+        self.assertEqual(sum(histogram['counts']), 30)
+
+    def test_bad_queries_raise_value_error(self):
+        for params in ({'where': 'ram_gb>lots'}, {'where': 'color==red'}, {'where': 'model>3'},
+                       {'agg': 'median', 'metric': 'ram_gb'}, {'agg': 'sum'}, {'group_by': 'color'},
+                       {'metric': 'ram_gb', 'bins': '0'}, {'metric': 'ram_gb', 'bins': 'many'}):
+            with self.assertRaises(ValueError, msg=params):
+                stats_query(self.stats, **params)
+
+    def test_changes_update_only_the_changed_assets(self):
+        stats_query(self.stats, group_by='model')
+        self.assertEqual(self.index.rebuilds, 1)
+        serials = [record['AssetInformation']['SerialNumber'] for record in self.index.latest()]
+
+        # A newer snapshot with more memory and another model
+        filename, record = self.snapshot(serials[0])
+        record['Timestamp'] = '2030-01-01T08:00:00'
+        record['AssetInformation'] = dict(record['AssetInformation'], Model='Brand New 1')
+        record['MemoryInformation'] = dict(record['MemoryInformation'], TotalMemoryGB=128)
+        with open(os.path.join(self.records_dir, filename.replace('.json', '_new.json')), 'w') as f:
+            json.dump(record, f)
+        # And an asset that is gone entirely
+        for name in os.listdir(self.records_dir):
+            with open(os.path.join(self.records_dir, name), 'rb') as f:
+                gone = serials[1].encode() in f.read()
+            if gone:
+                os.remove(os.path.join(self.records_dir, name))
+        self.index.refresh()
+
+        result = stats_query(self.stats, group_by='model')
+        self.assertEqual(self.index.rebuilds, 1)
+        self.assertEqual(result['assets'], 29)
+        self.assertIn({'key': 'Brand New 1', 'count': 1, 'value': 1.0}, result['groups'])
+        self.assertEqual(stats_query(self.stats, where='ram_gb>100')['matched'], 1)
+        self.assert_matches_a_fresh_frame({'group_by': 'model'}, {'group_by': 'owner'},
+                                          {'metric': 'free_gb', 'agg': 'sum', 'group_by': 'os'},
+                                          {'metric': 'ram_gb', 'agg': 'max'})
+
+    def test_an_unknown_history_rebuilds(self):
+        stats_query(self.stats, group_by='model')
+        self.index._changes = ChangeLog(max_versions=1)
+        for number in range(2):
+            self.index.ingest([(f'SystemInfo_Extra_{number}_2030-01-0{number + 1}_08_00_00.json',
+                                {'Timestamp': '2030-01-01', 'AssetInformation': {'SerialNumber': f'EXTRA{number}'}},
+                                (None, 0, 0))])
+        self.assertEqual(stats_query(self.stats, group_by='model')['assets'], 32)
+        self.assertEqual(self.index.rebuilds, 2)
+
+
+class ChangeLogTest(unittest.TestCase):
+    def test_serials_since_a_version(self):
+        changes = ChangeLog(max_versions=3)
+        for version, serials in enumerate((['A'], ['B', None], ['A', 'C'], ['D']), 1):
+            changes.add(version, serials)
+        self.assertEqual(changes.since(4), set())
+        self.assertEqual(changes.since(2), {'A', 'C', 'D'})
+        self.assertEqual(changes.since(1), {'A', 'B', 'C', 'D'})
+        # Version 1 itself is no longer kept
+        self.assertIsNone(changes.since(0))
+        self.assertIsNone(changes.since(None))
+
+
+class AssetStoreChangesTest(unittest.TestCase):
+    def test_writes_and_removals_are_reported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            records_dir = os.path.join(tmp, 'Records')
+            generate_fleet(records_dir, assets=3, snapshots=1, software_sizes=(5, 10))
+            store = AssetStore(os.path.join(tmp, 'assets.db'), records_dir)
+            try:
+                store.refresh()
+                stats = FleetStats(store)
+                self.assertEqual(stats_query(stats)['assets'], 3)
+                version = store.version
+                filename = sorted(store.filenames())[0]
+                serial = store.get(filename)['AssetInformation']['SerialNumber']
+                os.remove(os.path.join(records_dir, filename))
+                store.update_path(os.path.join(records_dir, filename))
+                self.assertEqual(store.changed_since(version), {serial})
+                self.assertEqual(stats_query(stats)['assets'], 2)
+            finally:
+                store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
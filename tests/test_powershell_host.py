@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'python'))
+from powershell_host import FakePowerShell, PowerShellError, PowerShellHost, PowerShellPool, PowerShellTimeout
+
+STUB_ARGV = [sys.executable, os.path.join(HERE, 'powershell_stub.py')]
+
+
+class PowerShellHostTest(unittest.TestCase):
+    def setUp(self):
+        self.host = PowerShellHost(STUB_ARGV, timeout=5)
+
+    def tearDown(self):
+        self.host.close()
+
+    def test_restarts_reap_the_old_process(self):
+        processes = []
+        for _ in range(3):
+            self.assertEqual(self.host.run('pid').strip(), str(self.host._process.pid))
+            processes.append(self.host._process)
+            with self.assertRaises(Exception):
+                self.host.run('exit')
+        self.host.run('echo again')
+        self.assertEqual(self.host.starts, 4)
+        self.assertIs(self.host._exited, False)
+        self.assertTrue(all(process.returncode is not None for process in processes))
+
+    def test_commands_share_one_process(self):
+        self.assertEqual(self.host.run('echo one'), 'one\n')
+        self.assertEqual(self.host.run('noise two'), 'two\n')
+        self.assertEqual(self.host.run_json('echo {"a": [1, 2]}'), {'a': [1, 2]})
+        self.assertIsNone(self.host.run_json('sleep 0'))
+        self.assertEqual(self.host.starts, 1)
+        self.assertEqual(self.host.stats()['calls'], 4)
+
+    def test_command_errors_keep_the_process(self):
+        pid = self.host.run('pid')
+        with self.assertRaisesRegex(PowerShellError, 'access denied'):
+            self.host.run('fail access denied')
+        self.assertEqual(self.host.run('pid'), pid)
+        self.assertEqual(self.host.stats()['failures'], 1)
+
+    def test_timeout_stops_the_host_and_the_next_call_restarts_it(self):
+        pid = self.host.run('pid')
+        start = time.perf_counter()
+        with self.assertRaises(PowerShellTimeout):
+            self.host.run('sleep 10', timeout=0.3)
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertIsNone(self.host._process)
+        self.assertNotEqual(self.host.run('pid'), pid)
+        stats = self.host.stats()
+        self.assertEqual((stats['timeouts'], stats['failures'], stats['starts']), (1, 0, 2))
+
+    def test_a_host_that_exits_mid_command_is_restarted(self):
+        with self.assertRaisesRegex(PowerShellError, 'exited'):
+            self.host.run('exit')
+        self.assertEqual(self.host.run('echo back'), 'back\n')
+        self.assertEqual(self.host.starts, 2)
+
+    def test_a_missing_interpreter_is_an_error(self):
+        host = PowerShellHost([os.path.join(HERE, 'no-such-powershell')])
+        with self.assertRaisesRegex(PowerShellError, 'Could not start'):
+            host.run('echo x')
+        host.close()
+
+
+class PowerShellPoolTest(unittest.TestCase):
+    def test_concurrent_commands_run_in_parallel_hosts(self):
+        pool = PowerShellPool(size=2, argv=STUB_ARGV, timeout=5)
+        try:
+            start = time.perf_counter()
+            threads = [threading.Thread(target=pool.run, args=('sleep 0.5',)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLess(time.perf_counter() - start, 0.95)
+            stats = pool.stats()
+            self.assertEqual((stats['hosts'], stats['calls']), (2, 2))
+        finally:
+            pool.close()
+
+
+class FakePowerShellTest(unittest.TestCase):
+    def test_answers_by_command_prefix(self):
+        fake = FakePowerShell({'Get-MpComputerStatus': 'True\n', 'Get-PhysicalDisk': '[{"DeviceId": "0"}]'})
+        self.assertEqual(fake.run('Get-MpComputerStatus | Select-Object -ExpandProperty AntispywareEnabled'), 'True\n')
+        self.assertEqual(fake.run_json('Get-PhysicalDisk | ConvertTo-Json'), [{'DeviceId': '0'}])
+        with self.assertRaises(PowerShellError):
+            fake.run('Get-NetFirewallProfile')
+        self.assertEqual(fake.stats()['calls'], 3)
+        self.assertEqual(fake.stats()['failures'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
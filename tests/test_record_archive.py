@@ -0,0 +1,65 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from record_archive import ArchiveReader, pack
+from record_index import RecordIndex
+from synthetic_fleet import generate_fleet
+
+
+class ArchiveReaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        records_dir = os.path.join(cls.tmp.name, 'Records')
+        generate_fleet(records_dir, assets=12, snapshots=4, software_sizes=(5, 20))
+        pack(records_dir, os.path.join(cls.tmp.name, 'fleet.wisarc'), keyframe_interval=3)
+        cls.index = RecordIndex(records_dir, use_processes=False)
+        cls.index.refresh()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.reader = ArchiveReader(os.path.join(self.tmp.name, 'fleet.wisarc'))
+
+    def tearDown(self):
+        self.reader.close()
+
+    def test_latest_matches_the_record_index(self):
+        for _ in range(2):
+            self.assertEqual(self.reader.latest(), self.index.latest())
+            self.assertEqual([filename for filename, _ in self.reader.latest_by_owner()],
+                             [filename for filename, _ in self.index.latest_by_owner()])
+
+    def test_latest_metrics_come_from_the_metric_columns(self):
+        latest = self.reader.latest_metrics()
+        self.assertEqual([record for record, _ in latest], self.index.latest())
+        # repr() so that NaN compares equal to NaN
+        self.assertEqual([repr(metrics) for _, metrics in latest],
+                         [repr(metrics) for _, metrics in self.index.latest_metrics()])
+        self.assertEqual(self.reader.changed_since(self.reader.version), set())
+
+    def test_concurrent_reads_rebuild_the_right_records(self):
+        expected = {filename: self.index.get(filename) for filename in self.index.filenames()}
+        names = sorted(expected)
+        failures = []
+
+        def read(offset):
+            for i in range(200):
+                filename = names[(offset + i * 7) % len(names)]
+                if self.reader.get(filename) != expected[filename]:
+                    failures.append(filename)
+
+        threads = [threading.Thread(target=read, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+from record_batch import MAX_BATCH_ITEMS, batch_records, encode_items, parse_batch
+from record_index import RecordIndex
+
+
+def make_record(serial, owner, timestamp):
+    return {'Timestamp': timestamp, 'OwnerName': owner,
+            'AssetInformation': {'SerialNumber': serial, 'Hostname': f'WS-{serial}'}}
+
+
+class ParseBatchTest(unittest.TestCase):
+    def test_kinds_and_fields(self):
+        kind, keys, fields = parse_batch(b'{"serials": ["A", "B"], "fields": ["OwnerName", "AssetInformation.Hostname"]}')
+        self.assertEqual((kind, keys), ('serials', ['A', 'B']))
+        self.assertEqual(fields, parse_batch(b'{"latest": true, "fields": "OwnerName,AssetInformation.Hostname"}')[2])
+        self.assertEqual(parse_batch(b'{"filenames": []}')[:2], ('filenames', []))
+        self.assertEqual(parse_batch(b'{"latest": true}')[:2], ('latest', None))
+
+    def test_bad_bodies_raise_value_error(self):
+        for body in (b'not json', b'\xff', b'[]', b'{}', b'{"serials": [], "filenames": []}',
+                     b'{"latest": 1}', b'{"serials": "A"}', b'{"serials": [1]}', b'{"latest": true, "fields": 3}',
+                     json.dumps({'serials': ['A'] * (MAX_BATCH_ITEMS + 1)}).encode()):
+            with self.assertRaises(ValueError, msg=body[:40]):
+                parse_batch(body)
+
+
+class BatchRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        records_dir = os.path.join(self.tmp.name, 'Records')
+        os.makedirs(records_dir)
+        for serial, owner, day in (('A', 'Ann', '2025-01-01'), ('A', 'Ann', '2025-02-01'), ('B', 'Bob', '2025-01-15')):
+            with open(os.path.join(records_dir, f'SystemInfo_{owner}_{day}_08_00_00.json'), 'w') as f:
+                json.dump(make_record(serial, owner, f'{day}T08:00:00'), f)
+        self.index = RecordIndex(records_dir, workers=1)
+        self.index.refresh()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def batch(self, body):
+        return list(batch_records(self.index, *parse_batch(json.dumps(body).encode())))
+
+    def test_items_follow_the_request_order(self):
+        items = self.batch({'serials': ['B', 'missing', 'A'], 'fields': 'AssetInformation.SerialNumber'})
+        self.assertEqual(items, [
+            {'AssetInformation': {'SerialNumber': 'B'}, 'filename': 'SystemInfo_Bob_2025-01-15_08_00_00.json'},
+            {'serial': 'missing', 'error': 'not found'},
+            {'AssetInformation': {'SerialNumber': 'A'}, 'filename': 'SystemInfo_Ann_2025-02-01_08_00_00.json'},
+        ])
+        items = self.batch({'filenames': ['SystemInfo_Ann_2025-01-01_08_00_00.json', 'nope.json'],
+                            'fields': 'Timestamp'})
+        self.assertEqual(items, [
+            {'Timestamp': '2025-01-01T08:00:00', 'filename': 'SystemInfo_Ann_2025-01-01_08_00_00.json'},
+            {'filename': 'nope.json', 'error': 'not found'},
+        ])
+
+    def test_latest_per_owner(self):
+        items = self.batch({'latest': True, 'fields': 'OwnerName'})
+        self.assertEqual(sorted((item['OwnerName'], item['filename']) for item in items), [
+            ('Ann', 'SystemInfo_Ann_2025-02-01_08_00_00.json'),
+            ('Bob', 'SystemInfo_Bob_2025-01-15_08_00_00.json'),
+        ])
+
+
+class EncodeItemsTest(unittest.TestCase):
+    def test_array_and_ndjson(self):
+        items = [{'a': 1}, {'b': [2]}]
+        self.assertEqual(json.loads(''.join(encode_items(iter(items)))), items)
+        self.assertEqual(''.join(encode_items([])), '[]')
+        lines = ''.join(encode_items(iter(items), ndjson=True)).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], items)
+
+
+if __name__ == '__main__':
+    unittest.main()
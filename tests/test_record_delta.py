@@ -0,0 +1,66 @@
+import copy
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from record_delta import apply_delta, make_delta, record_hash
+from record_index import load_record
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+from to_json import write_snapshot
+
+BASE = {
+    'Timestamp': '2024-01-01 08:00:00',
+    'OwnerName': 'Sita Thapa',
+    'AssetInformation': {'SerialNumber': 'SYN0000001', 'Hostname': 'WS-00001'},
+    'LogicalDrives': [{'DriveLetter': 'C', 'FreeSpaceGB': 120.5}],
+    'CollectionStats': {'Seconds': 4.2, 'RunSeconds': 5.1},
+}
+
+
+class RecordDeltaTest(unittest.TestCase):
+    def rerun(self, **changes):
+        record = copy.deepcopy(BASE)
+        record.update(Timestamp='2024-01-01 08:15:00', CollectionStats={'Seconds': 3.9, 'RunSeconds': 4.7})
+        record.update(changes)
+        return record
+
+    def test_unchanged_host_produces_an_empty_delta(self):
+        record = self.rerun()
+        delta = make_delta(BASE, 'SystemInfo_base.json', record)
+        self.assertEqual(delta['Changed'], {})
+        self.assertEqual(delta['Removed'], [])
+        self.assertEqual(record_hash(record), record_hash(dict(record, CollectionStats=BASE['CollectionStats'])))
+        self.assertEqual(apply_delta(BASE, delta), record)
+
+    def test_changed_sections_round_trip(self):
+        record = self.rerun(LogicalDrives=[{'DriveLetter': 'C', 'FreeSpaceGB': 118.0}])
+        del record['OwnerName']
+        delta = make_delta(BASE, 'SystemInfo_base.json', record)
+        self.assertEqual(set(delta['Changed']), {'LogicalDrives'})
+        self.assertEqual(delta['Removed'], ['OwnerName'])
+        self.assertEqual(apply_delta(BASE, delta), record)
+
+    def test_base_mismatch_is_rejected(self):
+        delta = make_delta(BASE, 'SystemInfo_base.json', self.rerun())
+        other = dict(BASE, OwnerName='Someone Else')
+        with self.assertRaises(ValueError):
+            apply_delta(other, delta)
+
+    def test_collector_writes_an_empty_delta_that_loads_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'last_snapshot.json')
+            write_snapshot(copy.deepcopy(BASE), tmp, state_path, 'Sita Thapa')
+            record = self.rerun()
+            path = write_snapshot(copy.deepcopy(record), tmp, state_path, 'Sita Thapa')
+            with open(path) as f:
+                delta = json.load(f)
+            self.assertEqual(delta['Changed'], {})
+            self.assertEqual(delta['CollectionStats'], record['CollectionStats'])
+            self.assertEqual(load_record(path), record)
+
+
+if __name__ == '__main__':
+    unittest.main()
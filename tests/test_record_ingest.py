@@ -0,0 +1,164 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from record_index import RecordIndex
+from record_ingest import IngestError, RecordIngestor, decode_body, open_ingestor, parse_body
+
+
+def make_record(serial='SYN0000001', timestamp='2025-01-01T08:00:00', owner='Sita Thapa', **changes):
+    record = {
+        'Timestamp': timestamp,
+        'OwnerName': owner,
+        'AssetInformation': {'SerialNumber': serial, 'Hostname': 'WS-00001'},
+        'MemoryInformation': {'TotalMemoryGB': 16},
+    }
+    record.update(changes)
+    return record
+
+
+def items(*documents):
+    return [(number, document, None) for number, document in enumerate(documents, 1)]
+
+
+class RecordIngestorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records_dir = os.path.join(self.tmp.name, 'Records')
+        self.log_dir = os.path.join(self.tmp.name, 'Ingest')
+        os.makedirs(self.records_dir)
+        self.open()
+
+    def tearDown(self):
+        self.ingestor.close()
+        self.tmp.cleanup()
+
+    def open(self):
+        self.index = RecordIndex(self.records_dir, workers=1)
+        self.index.refresh()
+        self.ingestor = RecordIngestor(self.index, self.log_dir, fsync_interval=0)
+        return self.ingestor.replay()
+
+    def reopen(self):
+        self.ingestor.close()
+        return self.open()
+
+    def test_accepted_records_are_served_and_replayed(self):
+        result = self.ingestor.ingest(items(make_record(), make_record('SYN0000002', owner='Ram Karki')))
+        self.assertEqual(result, {'accepted': 2, 'duplicates': 0, 'rejected': []})
+        self.assertEqual(self.index.latest_for('SYN0000001')[0], 'SystemInfo_Sita_Thapa_2025-01-01_08_00_00.json')
+
+        self.assertEqual(self.reopen(), 2)
+        self.assertEqual(sorted(record['AssetInformation']['SerialNumber'] for record in self.index.latest()),
+                         ['SYN0000001', 'SYN0000002'])
+        self.assertEqual(self.index.get('SystemInfo_Sita_Thapa_2025-01-01_08_00_00.json'), make_record())
+
+    def test_duplicates_are_dropped_within_a_batch_and_across_requests(self):
+        result = self.ingestor.ingest(items(make_record(), make_record()))
+        self.assertEqual((result['accepted'], result['duplicates']), (1, 1))
+        result = self.ingestor.ingest(items(make_record()))
+        self.assertEqual((result['accepted'], result['duplicates']), (0, 1))
+        self.assertEqual(self.reopen(), 1)
+
+    def test_same_owner_and_second_on_another_asset_gets_its_own_file(self):
+        self.ingestor.ingest(items(make_record(), make_record('SYN0000002')))
+        self.assertEqual(sorted(self.index.filenames()), [
+            'SystemInfo_Sita_Thapa_2025-01-01_08_00_00.json',
+            'SystemInfo_Sita_Thapa_SYN0000002_2025-01-01_08_00_00.json',
+        ])
+
+    def test_malformed_keys_are_rejected_before_they_are_logged(self):
+        bad = [
+            make_record(timestamp=20250101),
+            make_record(timestamp={'date': '2025-01-01'}),
+            make_record(timestamp=''),
+            make_record(serial=['SYN0000001']),
+            make_record(serial=12345),
+            {'Timestamp': '2025-01-01T08:00:00'},
+            ['not', 'a', 'record'],
+        ]
+        result = self.ingestor.ingest(items(*bad, make_record()))
+        self.assertEqual(result['accepted'], 1)
+        self.assertEqual([item['item'] for item in result['rejected']], list(range(1, len(bad) + 1)))
+        self.assertEqual(result['rejected'][0]['error'], "Timestamp is not a string")
+        self.assertEqual(result['rejected'][3]['error'], "AssetInformation.SerialNumber is not a string")
+        self.assertEqual(self.reopen(), 1)
+
+    def test_bad_log_entries_are_skipped_on_replay(self):
+        self.ingestor.ingest(items(make_record()))
+        self.ingestor.close()
+        segment = self.ingestor.log.segments()[-1]
+        with open(segment, 'ab') as f:
+            for entry in ({'filename': 'SystemInfo_Bad_2025-01-01_09_00_00.json',
+                           'record': make_record(timestamp=20250101)},
+                          {'record': make_record('SYN0000003')},
+                          ['not', 'an', 'entry']):
+                f.write(json.dumps(entry).encode() + b'\n')
+            # A torn line from a crash mid-write
+            f.write(b'{"filename": "SystemInfo_Torn')
+        self.assertEqual(self.open(), 1)
+        self.assertEqual(self.ingestor.stats()['rejected'], 3)
+        self.assertEqual(self.ingestor.ingest(items(make_record('SYN0000004')))['accepted'], 1)
+
+    def test_records_the_store_refuses_are_rejected(self):
+        class PickyIndex(RecordIndex):
+            def ingest(self, items):
+                if any(record.get('OwnerName') == 'Refused' for _, record, _ in items):
+                    raise TypeError("refused")
+                super().ingest(items)
+
+        self.index = PickyIndex(self.records_dir, workers=1)
+        self.ingestor.store = self.index
+        result = self.ingestor.ingest(items(make_record(), make_record('SYN0000002', owner='Refused')))
+        self.assertEqual(result['accepted'], 1)
+        self.assertEqual(result['rejected'], [{'item': 2, 'error': 'record could not be stored'}])
+        self.assertIsNotNone(self.index.latest_for('SYN0000001'))
+
+    def test_a_delta_is_rebuilt_from_its_base(self):
+        from record_delta import make_delta
+
+        base = make_record()
+        self.ingestor.ingest(items(base))
+        record = make_record(timestamp='2025-01-02T08:00:00', MemoryInformation={'TotalMemoryGB': 32})
+        delta = make_delta(base, 'SystemInfo_Sita_Thapa_2025-01-01_08_00_00.json', record)
+        self.assertEqual(self.ingestor.ingest(items(delta))['accepted'], 1)
+        self.assertEqual(self.index.latest_for('SYN0000001')[1], record)
+
+        unknown = dict(delta, BaseFile='SystemInfo_Nobody_2024-01-01_00_00_00.json')
+        self.assertIn('is not known', self.ingestor.ingest(items(unknown))['rejected'][0]['error'])
+
+    def test_open_ingestor_uses_a_log_next_to_the_records(self):
+        self.ingestor.ingest(items(make_record()))
+        self.ingestor.close()
+        self.ingestor = open_ingestor(RecordIndex(self.records_dir, workers=1), self.records_dir)
+        self.assertEqual(self.ingestor.log.log_dir, self.log_dir)
+        self.assertIsNotNone(self.ingestor.store.latest_for('SYN0000001'))
+
+
+class ParseBodyTest(unittest.TestCase):
+    def test_ndjson_lines_are_numbered_and_bad_lines_reported(self):
+        body = b'{"a": 1}\n\nnot json\n{"b": 2}\n'
+        parsed = parse_body(body, 'application/x-ndjson')
+        self.assertEqual([(number, document) for number, document, _ in parsed],
+                         [(1, {'a': 1}), (3, None), (4, {'b': 2})])
+        self.assertIn('invalid JSON', parsed[1][2])
+
+    def test_json_array_and_single_record(self):
+        self.assertEqual(parse_body(b'[{"a": 1}, {"b": 2}]'), [(1, {'a': 1}, None), (2, {'b': 2}, None)])
+        self.assertEqual(parse_body(b'{"a": 1}', 'application/json'), [(1, {'a': 1}, None)])
+        with self.assertRaises(IngestError):
+            parse_body(b'{"a": ')
+
+    def test_gzip_bodies_are_decoded(self):
+        self.assertEqual(decode_body(gzip.compress(b'{"a": 1}'), 'gzip'), b'{"a": 1}')
+        self.assertEqual(decode_body(b'plain', None), b'plain')
+        with self.assertRaises(IngestError):
+            decode_body(b'not gzip', 'gzip')
+        with self.assertRaises(IngestError):
+            decode_body(b'', 'br')
+
+
+if __name__ == '__main__':
+    unittest.main()
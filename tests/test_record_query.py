@@ -0,0 +1,49 @@
+import unittest
+
+from record_index import asset_sort_key
+from record_query import decode_cursor, encode_cursor, paginate, parse_fields, project
+
+RECORDS = [{'Timestamp': f'2024-01-{day:02d}', 'OwnerName': f'Owner {day}',
+            'AssetInformation': {'SerialNumber': f'S{day}', 'Hostname': f'WS-{day}', 'Model': 'Latitude'}}
+           for day in range(9, 0, -1)]
+
+
+class PaginateTest(unittest.TestCase):
+    def test_pages_follow_the_cursor(self):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = paginate(RECORDS, asset_sort_key, 4, cursor)
+            seen.extend(record['AssetInformation']['SerialNumber'] for record in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'S{day}' for day in range(9, 0, -1)])
+
+    def test_a_cursor_survives_records_arriving(self):
+        page, cursor = paginate(RECORDS, asset_sort_key, 3)
+        newer = [{'Timestamp': '2024-02-01', 'AssetInformation': {'SerialNumber': 'S10'}}] + RECORDS
+        page, _ = paginate(newer, asset_sort_key, 2, cursor)
+        self.assertEqual([record['AssetInformation']['SerialNumber'] for record in page], ['S6', 'S5'])
+
+    def test_malformed_cursors_raise_value_error(self):
+        for cursor in ('!!!', encode_cursor([1, 2]), encode_cursor(['2024-01-01']), encode_cursor({'a': 1}),
+                       encode_cursor(['2024-01-01', None]), encode_cursor('2024-01-01')):
+            with self.assertRaises(ValueError, msg=cursor):
+                paginate(RECORDS, asset_sort_key, 2, cursor)
+        with self.assertRaises(ValueError):
+            paginate([], asset_sort_key, 2, encode_cursor([1, 2]))
+        self.assertEqual(decode_cursor(encode_cursor(['a', 'b']), 2), ('a', 'b'))
+
+
+class ProjectTest(unittest.TestCase):
+    def test_bare_names_fall_back_to_the_previous_parent(self):
+        fields = parse_fields('AssetInformation.Hostname,Model,OwnerName,Missing')
+        self.assertEqual(project(RECORDS[0], fields), {
+            'AssetInformation': {'Hostname': 'WS-9', 'Model': 'Latitude'},
+            'OwnerName': 'Owner 9',
+        })
+        self.assertIs(project(RECORDS[0], []), RECORDS[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+import unittest
+
+from record_index import RecordIndex
+from record_query import encode_cursor
+from record_search import SearchIndex, parse_query
+
+
+def make_record(number, timestamp='2025-01-01T08:00:00', software=(), **changes):
+    record = {
+        'Timestamp': timestamp,
+        'OwnerName': f'Owner {number}',
+        'AssetInformation': {'SerialNumber': f'SYN{number:07d}', 'Hostname': f'WS-{number:05d}',
+                             'Model': 'Latitude 5420' if number % 2 else 'OptiPlex 7090'},
+        'NetworkInterfaces': [{'Name': 'Ethernet', 'IPv4': f'10.0.0.{number}', 'MAC': f'00-16-3E-00-00-{number:02X}'}],
+        'InstalledSoftware': [{'Name': name, 'Version': version} for name, version in software],
+    }
+    record.update(changes)
+    return record
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = RecordIndex(os.path.join(self.tmp.name, 'Records'), workers=1)
+        self.search_index = SearchIndex(self.index)
+        self.ingest(
+            make_record(1, software=[('Google Chrome', '119.0.6045.199'), ('Microsoft Visual Studio Code', '1.85.2')]),
+            make_record(2, software=[('Google Chrome', '120.0.6099.71'), ('Microsoft Edge', '120.0.2210.91')]),
+            make_record(3, software=[('Google Chrome', '121.0.1'), ('Visual Studio Code', '1.90.0')]),
+            make_record(4, software=[('Mozilla Firefox', '115.6.0esr'), ('Chrome Remote Desktop', '118.0')]),
+            make_record(5, software=[('Google Chrome', 'unknown')]),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ingest(self, *records):
+        self.index.ingest([(f"SystemInfo_{record['OwnerName'].replace(' ', '_')}_{record['Timestamp'][:10]}_08_00_00.json",
+                            record, (None, 0, 0)) for record in records])
+
+    def serials(self, q, **kwargs):
+        result = self.search_index.search(q, fields='AssetInformation.SerialNumber', **kwargs)
+        return sorted(hit['AssetInformation']['SerialNumber'][-1] for hit in result['results'])
+
+    def test_fields_and_prefixes(self):
+        self.assertEqual(self.serials('hostname:ws-00003'), ['3'])
+        self.assertEqual(self.serials('owner:"owner 4"'), ['4'])
+        self.assertEqual(self.serials('serial:syn0000002'), ['2'])
+        self.assertEqual(self.serials('model:latitude'), ['1', '3', '5'])
+        self.assertEqual(self.serials('ip:10.0.0.2'), ['2'])
+        self.assertEqual(self.serials('mac:00163e000004'), ['4'])
+        self.assertEqual(self.serials('software:firef*'), ['4'])
+        self.assertEqual(self.serials('optiplex chrome'), ['2', '4'])
+
+    def test_single_object_sections_are_searchable(self):
+        # ConvertTo-Json writes a one-item array as a bare object
+        record = make_record(6)
+        record['NetworkInterfaces'] = {'Name': 'Wi-Fi', 'IPv4': '10.9.9.9', 'MAC': 'F8-75-A4-00-00-06'}
+        record['InstalledSoftware'] = {'Name': 'Zoom', 'Version': '5.17.1'}
+        self.ingest(record)
+        self.assertEqual(self.serials('ip:10.9.9.9'), ['6'])
+        self.assertEqual(self.serials('mac:f8:75:a4:00:00:06'), ['6'])
+        self.assertEqual(self.serials('software:zoom>=5.17'), ['6'])
+
+    def test_version_comparisons(self):
+        self.assertEqual(self.serials('software:chrome<120'), ['1', '4'])
+        self.assertEqual(self.serials('software:"google chrome"<120'), ['1'])
+        self.assertEqual(self.serials('software:chrome<=120'), ['1', '4'])
+        self.assertEqual(self.serials('software:chrome<=120.0.6099.71'), ['1', '2', '4'])
+        self.assertEqual(self.serials('software:chrome>120'), ['2', '3'])
+        self.assertEqual(self.serials('software:chrome>=121'), ['3'])
+        self.assertEqual(self.serials('software:chrome=120'), ['2'])
+        self.assertEqual(self.serials('software:chrome=12'), [])
+        self.assertEqual(self.serials('software:"visual studio code">=1.90'), ['3'])
+        self.assertEqual(self.serials('software:"studio code"<1.90'), ['1'])
+        self.assertEqual(self.serials('software:fire*<116'), ['4'])
+        self.assertEqual(self.serials('software:edge>=120 model:optiplex'), ['2'])
+        # A version with no digits never compares
+        self.assertEqual(self.serials('software:chrome>0'), ['1', '2', '3', '4'])
+
+    def test_pages_follow_the_cursor_newest_first(self):
+        self.ingest(*(make_record(number, timestamp=f'2025-02-{number:02d}T08:00:00') for number in range(6, 10)))
+        seen = []
+        cursor = None
+        while True:
+            result = self.search_index.search('ws', fields='AssetInformation.SerialNumber', limit=4, cursor=cursor)
+            self.assertEqual(result['total'], 9)
+            seen.extend(hit['AssetInformation']['SerialNumber'] for hit in result['results'])
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'SYN{number:07d}' for number in (9, 8, 7, 6, 5, 4, 3, 2, 1)])
+        self.assertEqual(len(self.search_index.search('ws', limit=None)['results']), 9)
+
+    def test_bad_queries_and_cursors_raise_value_error(self):
+        for q in ('', 'color:red', 'hostname:ws<3', '"unclosed', 'software:*'):
+            with self.assertRaises(ValueError, msg=q):
+                self.search_index.search(q)
+        for cursor in ('!!!', encode_cursor([1, 2]), encode_cursor(['2025-01-01'])):
+            with self.assertRaises(ValueError, msg=cursor):
+                self.search_index.search('ws', cursor=cursor)
+        self.assertEqual(self.search_index.search('software:++<1')['total'], 0)
+
+    def test_changes_reindex_only_the_changed_assets(self):
+        self.search_index.refresh()
+        self.ingest(make_record(2, timestamp='2025-03-01T08:00:00', software=[('Google Chrome', '122.0')]))
+        self.assertEqual(self.search_index.refresh(), 1)
+        self.assertEqual(self.serials('software:chrome>=122'), ['2'])
+        self.assertEqual(self.serials('software:edge'), [])
+        self.assertEqual(self.search_index.stats()['assets'], 5)
+
+        # A store that cannot say what changed gets a rebuild, which keeps unchanged docs
+        self.index.changed_since = lambda version: None
+        self.ingest(make_record(7))
+        self.assertEqual(self.search_index.refresh(), 1)
+        self.assertEqual(self.serials('hostname:ws-00007'), ['7'])
+
+    def test_removed_assets_leave_the_index(self):
+        with tempfile.TemporaryDirectory() as records_dir:
+            for number in (1, 2):
+                with open(os.path.join(records_dir, f'SystemInfo_Owner_{number}_2025-01-01_08_00_00.json'), 'w') as f:
+                    json.dump(make_record(number), f)
+            index = RecordIndex(records_dir, workers=1)
+            index.refresh()
+            search_index = SearchIndex(index)
+            self.assertEqual(search_index.search('ws')['total'], 2)
+            os.remove(os.path.join(records_dir, 'SystemInfo_Owner_1_2025-01-01_08_00_00.json'))
+            index.refresh()
+            self.assertEqual(search_index.refresh(), 1)
+            self.assertEqual(search_index.search('ws')['total'], 1)
+            self.assertEqual(search_index.search('hostname:ws-00001')['total'], 0)
+
+
+class ParseQueryTest(unittest.TestCase):
+    def test_terms(self):
+        self.assertEqual(parse_query('software:"visual studio code">=1.90 ws-01*'), [
+            ('software', 'visual studio code', False, '>=', (1, 90)),
+            (None, 'ws-01', True, None, None),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+import main
+from powershell_host import FakePowerShell
+from section_cache import CACHE_FORMAT, SectionCache, hardware_fingerprint
+from wmi_session import FakeWmiConnection
+
+
+class SectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'WIS', 'section_cache.json')
+        self.fingerprint = hardware_fingerprint('SYN0000001', '20250101080000.000000+000')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_entries_survive_a_save_and_reload(self):
+        cache = SectionCache(self.path)
+        result = {'total_memory_gb': 16.0, 'modules': [{'capacity_gb': 8.0}]}
+        cache.put('memory_information', self.fingerprint, result)
+        result['modules'].clear()
+        cache.save()
+
+        hit = SectionCache(self.path).get('memory_information', self.fingerprint)
+        self.assertIsNotNone(hit)
+        cached, age = hit
+        self.assertEqual(cached, {'total_memory_gb': 16.0, 'modules': [{'capacity_gb': 8.0}]})
+        self.assertGreaterEqual(age, 0)
+        # Callers get their own copy
+        cached['modules'].clear()
+        self.assertEqual(len(SectionCache(self.path).get('memory_information', self.fingerprint)[0]['modules']), 1)
+
+    def test_misses(self):
+        cache = SectionCache(self.path, ttl=60)
+        cache.put('memory_information', self.fingerprint, {'total_memory_gb': 16.0})
+        self.assertIsNone(cache.get('physical_disks', self.fingerprint))
+        self.assertIsNone(cache.get('memory_information', hardware_fingerprint('SYN0000001', 'another boot')))
+        self.assertIsNone(cache.get('memory_information', None))
+        cache._entries['memory_information']['saved'] = time.time() - 61
+        self.assertIsNone(cache.get('memory_information', self.fingerprint))
+        # An entry from the future (clock moved back) is not trusted either
+        cache._entries['memory_information']['saved'] = time.time() + 3600
+        self.assertIsNone(cache.get('memory_information', self.fingerprint))
+
+    def test_an_unknown_fingerprint_is_never_stored(self):
+        cache = SectionCache(self.path)
+        cache.put('memory_information', None, {'total_memory_gb': 16.0})
+        cache.save()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unreadable_files_are_empty(self):
+        os.makedirs(os.path.dirname(self.path))
+        for content in ('not json', '[]', json.dumps({'format': CACHE_FORMAT + 1, 'sections': {'x': {}}})):
+            with open(self.path, 'w') as f:
+                f.write(content)
+            cache = SectionCache(self.path)
+            self.assertIsNone(cache.get('x', self.fingerprint))
+            cache.put('x', self.fingerprint, 1)
+            cache.save()
+            self.assertEqual(SectionCache(self.path).get('x', self.fingerprint)[0], 1)
+
+    def test_hardware_fingerprint(self):
+        self.assertIsNone(hardware_fingerprint(None, 'boot'))
+        self.assertIsNone(hardware_fingerprint(' Unknown ', 'boot'))
+        self.assertEqual(hardware_fingerprint('SYN1 ', 'boot'), hardware_fingerprint('SYN1', 'boot'))
+        self.assertNotEqual(hardware_fingerprint('SYN1', 'boot'), hardware_fingerprint('SYN2', 'boot'))
+
+
+class CollectorCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, 'section_cache.json')
+        self.boot_time = '20250101080000.000000+000'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_collector(self):
+        connection = FakeWmiConnection({
+            'Win32_BIOS': [{'SerialNumber': 'SYN0000001'}],
+            'Win32_OperatingSystem': [{'LastBootUpTime': self.boot_time}],
+            'Win32_PhysicalMemory': [{'Capacity': str(8 * 1024 ** 3), 'Speed': 3200, 'SMBIOSMemoryType': 26,
+                                      'FormFactor': 12, 'Manufacturer': 'Samsung', 'PartNumber': 'M471A1K43DB1'}],
+        })
+        main.configure(wmi_connect=lambda namespace: connection, powershell_runner=FakePowerShell({}),
+                       psutil_module=SimpleNamespace(), screeninfo_module=SimpleNamespace(get_monitors=list))
+        with contextlib.redirect_stdout(io.StringIO()):
+            system_info = main.collect_system_info(main.select_sections('memory'), SectionCache(self.cache_path))
+        return system_info, connection
+
+    def test_static_sections_are_reused_until_the_machine_reboots(self):
+        system_info, connection = self.run_collector()
+        self.assertEqual(system_info['collection_stats']['sections']['memory_information']['state'], 'ok')
+        self.assertIn('Win32_PhysicalMemory', connection.calls)
+
+        system_info, connection = self.run_collector()
+        self.assertEqual(system_info['collection_stats']['sections']['memory_information']['state'], 'cached')
+        self.assertEqual(system_info['memory_information']['total_memory_gb'], 8.0)
+        self.assertNotIn('Win32_PhysicalMemory', connection.calls)
+
+        self.boot_time = '20250102080000.000000+000'
+        system_info, connection = self.run_collector()
+        self.assertEqual(system_info['collection_stats']['sections']['memory_information']['state'], 'ok')
+        self.assertIn('Win32_PhysicalMemory', connection.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
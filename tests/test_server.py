@@ -0,0 +1,128 @@
+import http.client
+import json
+import threading
+import time
+import unittest
+
+import server
+from record_query import encode_cursor
+
+
+class KeepAliveHandler(server.RequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = 5
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledHTTPServerTest(unittest.TestCase):
+    workers = 2
+
+    def setUp(self):
+        self.httpd = server.PooledHTTPServer(('127.0.0.1', 0), KeepAliveHandler, workers=self.workers,
+                                             backlog=4, idle_timeout=30)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.connections = []
+
+    def tearDown(self):
+        for connection in self.connections:
+            connection.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def connect(self):
+        connection = http.client.HTTPConnection(*self.httpd.server_address, timeout=5)
+        self.connections.append(connection)
+        return connection
+
+    def get(self, connection, path='/styles.css'):
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = response.read()
+        return response, body
+
+    def test_idle_keep_alive_connections_do_not_hold_workers(self):
+        idle = [self.connect() for _ in range(self.workers)]
+        for connection in idle:
+            response, _ = self.get(connection)
+            self.assertEqual(response.status, 200)
+            self.assertFalse(response.will_close)
+
+        start = time.monotonic()
+        response, _ = self.get(self.connect())
+        self.assertEqual(response.status, 200)
+        self.assertLess(time.monotonic() - start, 2)
+
+        # The parked connections still serve their next request
+        for connection in idle:
+            response, _ = self.get(connection)
+            self.assertEqual(response.status, 200)
+
+    def test_pipelined_requests_on_one_connection(self):
+        connection = self.connect()
+        connection.connect()
+        request = b'GET /styles.css HTTP/1.1\r\nHost: test\r\n\r\n'
+        connection.sock.sendall(request * 3)
+        reader = connection.sock.makefile('rb')
+        for _ in range(3):
+            status = reader.readline().split()[1]
+            headers = {}
+            for line in iter(reader.readline, b'\r\n'):
+                name, _, value = line.decode().partition(':')
+                headers[name.lower()] = value.strip()
+            reader.read(int(headers['content-length']))
+            self.assertEqual(status, b'200')
+
+    def test_streamed_page_is_chunked_and_keeps_the_connection(self):
+        connection = self.connect()
+        for _ in range(2):
+            response, body = self.get(connection, '/api/assets?limit=10&fields=OwnerName')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+            self.assertIsInstance(json.loads(body), list)
+
+    def test_malformed_cursors_are_bad_requests(self):
+        connection = self.connect()
+        for cursor in ('!!!', encode_cursor([1, 2]), encode_cursor({'a': 1})):
+            for path in (f'/api/assets?cursor={cursor}', f'/api/search?q=ws&cursor={cursor}'):
+                response, _ = self.get(connection, path)
+                self.assertEqual(response.status, 400, path)
+        response, _ = self.get(connection)
+        self.assertEqual(response.status, 200)
+
+    def test_idle_connections_are_closed_after_timeout(self):
+        self.httpd.idle_timeout = 0.2
+        connection = self.connect()
+        self.get(connection)
+        time.sleep(0.6)
+        self.assertEqual(connection.sock.recv(1), b'')
+
+
+class CountingStore:
+    def __init__(self):
+        self.calls = 0
+
+    def latest(self):
+        self.calls += 1
+        return [{'Timestamp': f'2024-01-0{day}', 'AssetInformation': {'SerialNumber': f'S{day}'}}
+                for day in (3, 2, 1)]
+
+
+class LatestRecordsTest(unittest.TestCase):
+    def test_pages_share_one_latest_per_version(self):
+        store = CountingStore()
+        latest = server.LatestRecords(store)
+        page, cursor = server.paginate(latest.get(1), server.asset_sort_key, 2)
+        self.assertEqual([record['AssetInformation']['SerialNumber'] for record in page], ['S3', 'S2'])
+        page, cursor = server.paginate(latest.get(1), server.asset_sort_key, 2, cursor)
+        self.assertEqual([record['AssetInformation']['SerialNumber'] for record in page], ['S1'])
+        self.assertIsNone(cursor)
+        self.assertEqual(store.calls, 1)
+        latest.get(2)
+        self.assertEqual(store.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
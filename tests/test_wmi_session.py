@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+from wmi_session import FakeWmiConnection, WmiSession
+
+CLASSES = {
+    'Win32_BIOS': [{'SerialNumber': 'SYN0000001'}],
+    'Win32_ComputerSystem': [{'Manufacturer': 'Dell Inc.', 'Model': 'Latitude 5420', 'PartOfDomain': False}],
+}
+
+
+class FailingConnection:
+    def query(self, wql):
+        raise OSError('provider unavailable')
+
+
+class WmiSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+
+    def connect(self, namespace):
+        connection = FakeWmiConnection(CLASSES)
+        self.connections.append((namespace, connection))
+        return connection
+
+    def test_each_class_is_queried_once_per_session(self):
+        session = WmiSession(self.connect)
+        for _ in range(3):
+            self.assertEqual(session.query('Win32_BIOS')[0].SerialNumber, 'SYN0000001')
+            self.assertEqual(session.query('win32_bios', namespace='ROOT\\CIMV2')[0].SerialNumber, 'SYN0000001')
+        session.query('Win32_ComputerSystem')
+        self.assertEqual([calls for _, connection in self.connections for calls in connection.calls],
+                         ['Win32_BIOS', 'Win32_ComputerSystem'])
+        stats = session.stats()
+        self.assertEqual(stats['queries'], 2)
+        self.assertEqual(stats['cache_hits'], 5)
+        self.assertEqual([query['class_name'] for query in stats['by_class']], ['Win32_BIOS', 'Win32_ComputerSystem'])
+
+    def test_concurrent_callers_share_one_query(self):
+        session = WmiSession(self.connect)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(session.query('Win32_BIOS'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(len(connection.calls) for _, connection in self.connections), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_connections_are_kept_per_thread_and_namespace(self):
+        session = WmiSession(self.connect)
+        session.query('Win32_BIOS')
+        session.query('BatteryStaticData', namespace='root\\wmi')
+        thread = threading.Thread(target=session.query, args=('Win32_ComputerSystem',))
+        thread.start()
+        thread.join()
+        self.assertEqual(sorted(namespace for namespace, _ in self.connections),
+                         ['root\\cimv2', 'root\\cimv2', 'root\\wmi'])
+
+    def test_failed_queries_are_recorded_and_not_retried(self):
+        session = WmiSession(lambda namespace: FailingConnection())
+        self.assertEqual(session.query('Win32_Battery'), [])
+        self.assertEqual(session.query('Win32_Battery'), [])
+        stats = session.stats()
+        self.assertEqual(stats['queries'], 1)
+        self.assertEqual(stats['by_class'][0]['error'], 'provider unavailable')
+
+    def test_a_new_session_queries_again(self):
+        WmiSession(self.connect).query('Win32_BIOS')
+        WmiSession(self.connect).query('Win32_BIOS')
+        self.assertEqual(sum(len(connection.calls) for _, connection in self.connections), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()